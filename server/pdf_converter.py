@@ -4,20 +4,36 @@ import os
 import argparse
 import json
 
-def pdf_to_word(pdf_file_path, docx_file_path):
+def pdf_to_word(pdf_file_path, docx_file_path, options=None):
     """
     Convert PDF to DOCX using pdf2docx library
     Based on working code from user's Gradio app
+    page_selection option: only convert these pages
     """
     try:
         from pdf2docx import Converter
         print(f"Starting conversion of {pdf_file_path} to {docx_file_path}")
         
+        if options is None:
+            options = {}
+        
+        page_range = parse_page_selection(options.get('page_selection', 'all'))
+        
         # Create converter object
         cv = Converter(pdf_file_path)
         
-        # Convert PDF to DOCX with multi-processing
-        cv.convert(docx_file_path, multi_processing=True, start=0, end=None)
+        if page_range:
+            page_range = page_range.clip(len(cv.fitz_doc))
+            if not page_range:
+                raise ValueError("No selected pages exist in the document")
+        
+        if page_range and len(page_range.intervals) > 1:
+            # pdf2docx only multi-processes a continuous start/end range
+            cv.convert(docx_file_path, pages=[page_num - 1 for page_num in page_range])
+        else:
+            # Convert PDF to DOCX with multi-processing
+            start, end = page_range.intervals[0] if page_range else (1, None)
+            cv.convert(docx_file_path, multi_processing=True, start=start - 1, end=end)
         
         # Close the converter
         cv.close()
@@ -29,131 +45,77 @@ def pdf_to_word(pdf_file_path, docx_file_path):
         print(f"Error converting PDF to DOCX: {str(e)}")
         return False
 
-def pdf_to_excel(pdf_file_path, excel_file_path, page_selection='all'):
+def pdf_to_excel(pdf_file_path, excel_file_path, page_selection='all', options=None, session=None):
     """
     Convert PDF to Excel using pdfplumber, pandas, and openpyxl
     Advanced table extraction with multiple refinements and page selection
+    table_strategy option: 'all' (run every strategy, default) or 'adaptive' (same
+    tables, skipping the strategies that cannot add one)
+    engine option: 'pdfplumber' (default), 'pymupdf' (fitz find_tables) or 'auto'
+    write_only option: stream rows into a write-only workbook with shared named
+    styles, for very large extractions
+    output_format option: 'xlsx' (default), 'csv_zip', 'parquet', 'feather' or
+    'jsonl'; the non-xlsx formats are written without building a workbook
+    workers option: page extraction processes, 'auto' for one per core
+    session: a DocumentSession to read pages from and share caches with
     """
     try:
         import pdfplumber
         import pandas as pd
-        from openpyxl import Workbook
-        from openpyxl.styles import Font, Alignment, Border, Side
-        from openpyxl.utils import get_column_letter
+        
+        if options is None:
+            options = {}
+        
+        table_strategy = options.get('table_strategy', 'all')
+        engine = options.get('engine', 'pdfplumber')
+        if engine not in TABLE_ENGINES:
+            print(f"Warning: Unknown table engine '{engine}', using 'pdfplumber'")
+            engine = 'pdfplumber'
+        write_only = bool(options.get('write_only', False))
+        output_format = options.get('output_format', 'xlsx')
+        if output_format not in TABLE_OUTPUT_FORMATS:
+            print(f"Warning: Unknown output format '{output_format}', using 'xlsx'")
+            output_format = 'xlsx'
         
         print(f"Starting conversion of {pdf_file_path} to {excel_file_path}")
         print(f"Page selection: {page_selection}")
+        print(f"Table engine: {engine}")
+        print(f"Table strategy: {table_strategy}")
         
         # Parse page selection
         selected_pages = parse_page_selection(page_selection)
         print(f"Selected pages: {selected_pages}")
         
         # Extract tables and text from PDF with advanced detection
-        tables = []
-        text_data = []
-        
-        with pdfplumber.open(pdf_file_path) as pdf:
-            total_pages = len(pdf.pages)
-            print(f"Total pages in PDF: {total_pages}")
-            
-            for page_num, page in enumerate(pdf.pages):
-                current_page = page_num + 1
-                
-                # Skip pages not in selection
-                if selected_pages and current_page not in selected_pages:
-                    print(f"Skipping page {current_page} (not in selection)")
-                    continue
-                
-                print(f"Processing page {current_page}")
-                
-                # Advanced table extraction with multiple strategies
-                page_tables = []
-                
-                # Strategy 1: Extract tables with default settings
-                try:
-                    default_tables = page.extract_tables()
-                    if default_tables:
-                        page_tables.extend(default_tables)
-                        print(f"Strategy 1 found {len(default_tables)} tables")
-                except Exception as e:
-                    print(f"Strategy 1 failed: {str(e)}")
-                
-                # Strategy 2: Extract tables with custom settings for better detection
-                try:
-                    custom_tables = page.extract_tables({
-                        'vertical_strategy': 'text',
-                        'horizontal_strategy': 'text',
-                        'intersection_x_tolerance': 10,
-                        'intersection_y_tolerance': 10
-                    })
-                    if custom_tables:
-                        page_tables.extend(custom_tables)
-                        print(f"Strategy 2 found {len(custom_tables)} tables")
-                except Exception as e:
-                    print(f"Strategy 2 failed: {str(e)}")
-                
-                # Strategy 3: Extract tables with lines strategy (more robust)
-                try:
-                    lines_tables = page.extract_tables({
-                        'vertical_strategy': 'lines',
-                        'horizontal_strategy': 'lines'
-                    })
-                    if lines_tables:
-                        page_tables.extend(lines_tables)
-                        print(f"Strategy 3 found {len(lines_tables)} tables")
-                except Exception as e:
-                    print(f"Strategy 3 failed: {str(e)}")
-                
-                # Strategy 4: Extract tables with minimal settings
-                try:
-                    minimal_tables = page.extract_tables({
-                        'vertical_strategy': 'text',
-                        'horizontal_strategy': 'text'
-                    })
-                    if minimal_tables:
-                        page_tables.extend(minimal_tables)
-                        print(f"Strategy 4 found {len(minimal_tables)} tables")
-                except Exception as e:
-                    print(f"Strategy 4 failed: {str(e)}")
-                
-                # Remove duplicates and process tables
-                unique_tables = []
-                for table in page_tables:
-                    if table and len(table) > 0:
-                        # Clean and validate table
-                        cleaned_table = clean_table_data(table)
-                        if cleaned_table and len(cleaned_table) > 0:
-                            # Check if this table is unique (not a duplicate)
-                            if not is_duplicate_table(cleaned_table, unique_tables):
-                                unique_tables.append(cleaned_table)
-                
-                # Add unique tables to main list
-                for table_idx, table in enumerate(unique_tables):
-                    tables.append({
-                        'page': current_page,
-                        'table_index': table_idx + 1,
-                        'data': table,
-                        'rows': len(table),
-                        'cols': len(table[0]) if table else 0
-                    })
-                    print(f"Found table {table_idx + 1} on page {current_page} with {len(table)} rows and {len(table[0]) if table else 0} columns")
-                
-                # Extract text if no tables found
-                text = page.extract_text()
-                if text and text.strip():
-                    text_data.append({
-                        'Page': current_page,
-                        'Content': text.strip()
-                    })
+        tables, text_data = extract_pdf_tables(pdf_file_path, selected_pages, engine, table_strategy,
+                                               workers=get_worker_count(options), session=session)
         
         print(f"Found {len(tables)} unique tables and {len(text_data)} text sections")
         
+        if output_format != 'xlsx':
+            write_table_export(excel_file_path, tables, text_data, output_format)
+            print(f"Successfully created {output_format} file: {excel_file_path}")
+            return True
+        
+        from openpyxl import Workbook
+        from openpyxl.styles import Font, Alignment
+        
+        if write_only:
+            write_excel_streaming(excel_file_path, tables, text_data, page_selection)
+            print(f"Successfully created Excel file: {excel_file_path}")
+            return True
+        
         # Create Excel workbook
         wb = Workbook()
         
         # Remove default sheet
         wb.remove(wb.active)
         
+        # Shared style objects, created once rather than per cell
+        header_font = Font(bold=True, size=12)
+        header_alignment = Alignment(horizontal='center', vertical='center')
+        body_alignment = Alignment(horizontal='left', vertical='top')
+        
         # Process tables with advanced formatting
         if tables:
             for table_idx, table_info in enumerate(tables):
@@ -172,10 +134,10 @@ def pdf_to_excel(pdf_file_path, excel_file_path, page_selection='all'):
                         
                         # Apply cell formatting
                         if row_idx == 1:  # Header row
-                            cell.font = Font(bold=True, size=12)
-                            cell.alignment = Alignment(horizontal='center', vertical='center')
+                            cell.font = header_font
+                            cell.alignment = header_alignment
                         else:
-                            cell.alignment = Alignment(horizontal='left', vertical='top')
+                            cell.alignment = body_alignment
                 
                 # Add borders to table
                 add_table_borders(ws, len(table_data), len(table_data[0]) if table_data else 0)
@@ -185,36 +147,15 @@ def pdf_to_excel(pdf_file_path, excel_file_path, page_selection='all'):
                 
                 print(f"Added table {table_idx + 1} to sheet {ws.title} with {len(table_data)} rows")
         
+        message_fonts = {
+            'title': Font(bold=True, size=14, color="FF0000"),  # Red color for emphasis
+            'heading': Font(bold=True, size=12),
+        }
+        
         # If no tables found, create user-friendly message sheet
         if not tables:
             ws = wb.create_sheet("No_Tables_Found")
-            
-            # Add clear user-friendly message
-            ws['A1'] = "No Tables Found in Selected Pages"
-            ws['A1'].font = Font(bold=True, size=14, color="FF0000")  # Red color for emphasis
-            
-            ws['A3'] = "What this means:"
-            ws['A3'].font = Font(bold=True, size=12)
-            
-            ws['A4'] = f"• No tables found in the selected pages: {page_selection}"
-            ws['A5'] = "• The content might be text-only or image-based"
-            ws['A6'] = "• Tables might be embedded as images"
-            ws['A7'] = "• The layout might not be recognized as tables"
-            
-            ws['A9'] = "Suggestions:"
-            ws['A9'].font = Font(bold=True, size=12)
-            
-            ws['A10'] = "• Try selecting different pages"
-            ws['A11'] = "• Try a PDF with clear table borders"
-            ws['A12'] = "• Ensure tables have visible grid lines"
-            ws['A13'] = "• Check if tables are not just text with spaces"
-            ws['A14'] = "• Try using PDF to Word conversion instead"
-            
-            ws['A16'] = "Alternative:"
-            ws['A16'].font = Font(bold=True, size=12)
-            
-            ws['A17'] = "If you need the text content, try PDF to Word conversion"
-            ws['A18'] = "which can better handle text extraction and formatting."
+            write_message_rows(ws, no_tables_message(page_selection), message_fonts)
             
             # Auto-adjust column width
             ws.column_dimensions['A'].width = 60
@@ -230,9 +171,9 @@ def pdf_to_excel(pdf_file_path, excel_file_path, page_selection='all'):
             ws['B1'] = "Content"
             
             # Style headers
-            header_font = Font(bold=True)
-            ws['A1'].font = header_font
-            ws['B1'].font = header_font
+            text_header_font = Font(bold=True)
+            ws['A1'].font = text_header_font
+            ws['B1'].font = text_header_font
             
             # Add text data
             for row_idx, item in enumerate(text_data, start=2):
@@ -248,24 +189,7 @@ def pdf_to_excel(pdf_file_path, excel_file_path, page_selection='all'):
         # If still no data, create empty sheet with message
         if not tables and not text_data:
             ws = wb.create_sheet("No_Data_Found")
-            ws['A1'] = "No Extractable Data Found"
-            ws['A1'].font = Font(bold=True, size=14, color="FF0000")
-            
-            ws['A3'] = "The PDF appears to be:"
-            ws['A3'].font = Font(bold=True, size=12)
-            
-            ws['A4'] = "• Image-based (scanned document)"
-            ws['A5'] = "• Password protected"
-            ws['A6'] = "• Corrupted or unreadable"
-            ws['A7'] = "• Empty or contains no text"
-            
-            ws['A9'] = "Recommendations:"
-            ws['A9'].font = Font(bold=True, size=12)
-            
-            ws['A10'] = "• Use OCR software to extract text from images"
-            ws['A11'] = "• Check if the PDF is password protected"
-            ws['A12'] = "• Try a different PDF file"
-            ws['A13'] = "• Ensure the PDF is not corrupted"
+            write_message_rows(ws, NO_DATA_MESSAGE, message_fonts)
             
             ws.column_dimensions['A'].width = 50
             
@@ -282,6 +206,201 @@ def pdf_to_excel(pdf_file_path, excel_file_path, page_selection='all'):
         traceback.print_exc()
         return False
 
+# pdfplumber table settings tried by pdf_to_excel, in their original order
+TABLE_STRATEGIES = [
+    ('default', None),
+    ('text_tolerant', {
+        'vertical_strategy': 'text',
+        'horizontal_strategy': 'text',
+        'intersection_x_tolerance': 10,
+        'intersection_y_tolerance': 10
+    }),
+    ('lines', {
+        'vertical_strategy': 'lines',
+        'horizontal_strategy': 'lines'
+    }),
+    ('text', {
+        'vertical_strategy': 'text',
+        'horizontal_strategy': 'text'
+    }),
+]
+
+# Strategies that find tables from ruling edges (lines, rects, curves);
+# 'default' is pdfplumber's default settings, which are the 'lines' settings
+LINE_TABLE_STRATEGIES = ('default', 'lines')
+
+def choose_table_strategies(page):
+    """
+    The strategies of TABLE_STRATEGIES (in order) that can still add a table
+    to this page's deduplicated result, judging from cheap layout features
+    Skipped: everything on a page without characters (its tables are empty
+    and dropped by clean_table_data), the line strategies on a page without
+    ruling edges, and 'lines', which always repeats 'default'
+    """
+    if not page.chars:
+        # Nothing to put in a table
+        return []
+    
+    ruled = bool(page.lines or page.rects or page.curves)
+    return [name for name, _ in TABLE_STRATEGIES
+            if name != 'lines' and (ruled or name not in LINE_TABLE_STRATEGIES)]
+
+def extract_page_tables(page, strategy='all'):
+    """
+    Extract raw tables from a pdfplumber page
+    'all' runs every strategy and keeps all results (deduplicated later);
+    'adaptive' leaves out the strategies that cannot change the deduplicated
+    tables (see choose_table_strategies), so both give the same tables
+    """
+    settings_by_name = dict(TABLE_STRATEGIES)
+    # Log strategies by their historical numbers (1-4)
+    strategy_numbers = {name: number for number, (name, _) in enumerate(TABLE_STRATEGIES, start=1)}
+    
+    if strategy == 'adaptive':
+        names = choose_table_strategies(page)
+    else:
+        names = [name for name, _ in TABLE_STRATEGIES]
+    
+    page_tables = []
+    for name in names:
+        strategy_number = strategy_numbers[name]
+        try:
+            settings = settings_by_name[name]
+            found = page.extract_tables(settings) if settings else page.extract_tables()
+            if found:
+                page_tables.extend(found)
+                print(f"Strategy {strategy_number} found {len(found)} tables")
+        except Exception as e:
+            print(f"Strategy {strategy_number} failed: {str(e)}")
+    
+    return page_tables
+
+TABLE_ENGINES = ('pdfplumber', 'pymupdf', 'auto')
+
+def extract_fitz_page_tables(page):
+    """
+    Extract raw tables from a PyMuPDF page with page.find_tables()
+    """
+    try:
+        found = [table.extract() for table in page.find_tables().tables]
+    except Exception as e:
+        print(f"PyMuPDF table detection failed: {str(e)}")
+        return []
+    
+    if found:
+        print(f"PyMuPDF found {len(found)} tables")
+    return found
+
+def table_page_task(page, page_num, options, state):
+    """
+    extract_pdf_tables' work for one page (a fitz page for the pymupdf/auto
+    engines, a pdfplumber page otherwise): (unique tables, text or None)
+    """
+    engine = options.get('engine', 'pdfplumber')
+    table_strategy = options.get('table_strategy', 'all')
+    session = state.get('session')
+    if session is not None:
+        return session.cached(('tables', engine, table_strategy, page_num),
+                              lambda: extract_page_table_result(page, page_num, engine, table_strategy, state))
+    return extract_page_table_result(page, page_num, engine, table_strategy, state)
+
+def extract_page_table_result(page, page_num, engine, table_strategy, state):
+    print(f"Processing page {page_num}")
+    
+    page_tables = []
+    fallback_page = None
+    session = state.get('session')
+    if engine != 'pdfplumber':
+        page_tables = extract_fitz_page_tables(page)
+        library = 'fitz'
+    if engine == 'pdfplumber' or (engine == 'auto' and not page_tables):
+        if engine == 'auto':
+            if session is not None:
+                plumber_source = session.source('pdfplumber')
+            else:
+                if 'plumber_source' not in state:
+                    state['plumber_source'] = PdfPageSource(state['pdf_path']).open()
+                plumber_source = state['plumber_source']
+            page = fallback_page = plumber_source.page(page_num)
+        # Advanced table extraction with multiple strategies
+        page_tables = extract_page_tables(page, table_strategy)
+        library = 'pdfplumber'
+    
+    # Remove duplicates and process tables
+    unique_tables = []
+    deduplicator = TableDeduplicator()
+    for table in page_tables:
+        if table and len(table) > 0:
+            # Clean and validate table
+            cleaned_table = clean_table_data(table)
+            if cleaned_table and len(cleaned_table) > 0:
+                # Check if this table is unique (not a duplicate)
+                if deduplicator.add_if_unique(cleaned_table):
+                    unique_tables.append(cleaned_table)
+    
+    for table_idx, table in enumerate(unique_tables):
+        print(f"Found table {table_idx + 1} on page {page_num} with {len(table)} rows and {len(table[0]) if table else 0} columns")
+    
+    # Extract text if no tables found (the text sheet is only written
+    # when no page has tables)
+    if unique_tables:
+        result = unique_tables, None
+    else:
+        # Through the session cache, so a text conversion of the same
+        # document reuses it
+        text = page_text(page, page_num, {}, dict(state, library=library))
+        result = [], text.strip() if text and text.strip() else None
+    
+    if fallback_page is not None:
+        plumber_source.release(fallback_page)
+    return result
+
+def extract_pdf_tables(pdf_file_path, selected_pages=None, engine='pdfplumber', table_strategy='all', workers=1,
+                       session=None):
+    """
+    Extract the unique tables and, for pages without tables, the text of a PDF
+    Returns (tables, text_data) as used by pdf_to_excel
+    selected_pages is a PageRange (from parse_page_selection), None for every page
+    engine 'pymupdf' detects tables with fitz; 'auto' does the same but falls back
+    to pdfplumber (with table_strategy) on pages where fitz finds none
+    With a DocumentSession, pages are read from it and their results cached there
+    """
+    library = 'pdfplumber'
+    if engine in ('pymupdf', 'auto'):
+        try:
+            import fitz
+            if not hasattr(fitz.Page, 'find_tables'):
+                raise ImportError("this PyMuPDF version has no find_tables")
+            library = 'fitz'
+        except ImportError as e:
+            if engine == 'pymupdf':
+                raise
+            print(f"PyMuPDF tables unavailable ({str(e)}), using pdfplumber")
+            engine = 'pdfplumber'
+    
+    tables = []
+    text_data = []
+    page_options = {'engine': engine, 'table_strategy': table_strategy}
+    for page_num, (unique_tables, text) in map_pdf_pages(pdf_file_path, table_page_task, page_numbers=selected_pages,
+                                                         options=page_options, library=library, workers=workers,
+                                                         session=session):
+        # Add unique tables to main list
+        for table_idx, table in enumerate(unique_tables):
+            tables.append({
+                'page': page_num,
+                'table_index': table_idx + 1,
+                'data': table,
+                'rows': len(table),
+                'cols': len(table[0]) if table else 0
+            })
+        if text:
+            text_data.append({
+                'Page': page_num,
+                'Content': text
+            })
+    
+    return tables, text_data
+
 def clean_table_data(table):
     """
     Clean and validate table data
@@ -309,25 +428,59 @@ def clean_table_data(table):
     
     return cleaned_table
 
-def is_duplicate_table(new_table, existing_tables, similarity_threshold=0.8):
+class TableDeduplicator:
     """
-    Check if a table is a duplicate of existing tables
+    Index of kept tables for duplicate checks: a table is a duplicate when a
+    kept table has the same number of rows and
+    at least similarity_threshold of its rows are equal at the same position.
+    Exact copies are found with one set lookup; for near-duplicates each row
+    is looked up by (row count, position, content), so only tables that
+    share rows with the candidate are ever counted.
     """
-    if not existing_tables:
-        return False
     
-    for existing_table in existing_tables:
-        if len(new_table) == len(existing_table):
-            matching_rows = 0
-            for i, row in enumerate(new_table):
-                if i < len(existing_table) and row == existing_table[i]:
-                    matching_rows += 1
-            
-            similarity = matching_rows / len(new_table) if new_table else 0
-            if similarity >= similarity_threshold:
-                return True
+    def __init__(self, similarity_threshold=0.8):
+        self.similarity_threshold = similarity_threshold
+        self._fingerprints = set()
+        self._row_index = {}
+        self._count = 0
+    
+    @staticmethod
+    def _rows(table):
+        return [tuple(row) for row in table]
+    
+    def is_duplicate(self, table):
+        from collections import Counter
+        
+        if not table:
+            return False
+        
+        rows = self._rows(table)
+        if (len(rows), tuple(rows)) in self._fingerprints:
+            return True
+        
+        matches = Counter()
+        for i, row in enumerate(rows):
+            for table_id in self._row_index.get((len(rows), i, row), ()):
+                matches[table_id] += 1
+        
+        return any(count / len(rows) >= self.similarity_threshold for count in matches.values())
     
-    return False
+    def add(self, table):
+        rows = self._rows(table)
+        table_id = self._count
+        self._count += 1
+        self._fingerprints.add((len(rows), tuple(rows)))
+        for i, row in enumerate(rows):
+            self._row_index.setdefault((len(rows), i, row), []).append(table_id)
+    
+    def add_if_unique(self, table):
+        """
+        Keep the table unless it duplicates one already kept; True if it was kept
+        """
+        if self.is_duplicate(table):
+            return False
+        self.add(table)
+        return True
 
 def add_table_borders(worksheet, rows, cols):
     """
@@ -346,88 +499,495 @@ def add_table_borders(worksheet, rows, cols):
         for col in range(1, cols + 1):
             worksheet.cell(row=row, column=col).border = thin_border
 
+def compute_column_widths(table_data):
+    """
+    Column widths for a table, computed in one pass over the table data
+    Wide characters (W, M, m, w) count 1.5 and narrow ones (i, l) 0.8;
+    widths are kept between 8 and 50
+    """
+    if not table_data:
+        return []
+    
+    cols = len(table_data[0])
+    max_lengths = [0] * cols
+    for row in table_data:
+        for col, cell_value in enumerate(row[:cols]):
+            if cell_value:
+                text = str(cell_value)
+                # str.count runs in C, unlike a per-character Python loop
+                cell_length = (len(text)
+                               + 0.5 * sum(text.count(char) for char in 'WMmw')
+                               - 0.2 * (text.count('i') + text.count('l')))
+                if cell_length > max_lengths[col]:
+                    max_lengths[col] = cell_length
+    
+    return [min(max(max_length + 2, 8), 50) for max_length in max_lengths]
+
 def adjust_column_widths(worksheet, table_data):
     """
     Smart column width adjustment
     """
     from openpyxl.utils import get_column_letter
     
-    if not table_data:
-        return
+    for col, width in enumerate(compute_column_widths(table_data), start=1):
+        worksheet.column_dimensions[get_column_letter(col)].width = width
+
+def no_tables_message(page_selection):
+    """
+    Rows of the No_Tables_Found sheet as (text, style) pairs, None for a blank row
+    """
+    return [
+        ("No Tables Found in Selected Pages", 'title'),
+        None,
+        ("What this means:", 'heading'),
+        (f"• No tables found in the selected pages: {page_selection}", None),
+        ("• The content might be text-only or image-based", None),
+        ("• Tables might be embedded as images", None),
+        ("• The layout might not be recognized as tables", None),
+        None,
+        ("Suggestions:", 'heading'),
+        ("• Try selecting different pages", None),
+        ("• Try a PDF with clear table borders", None),
+        ("• Ensure tables have visible grid lines", None),
+        ("• Check if tables are not just text with spaces", None),
+        ("• Try using PDF to Word conversion instead", None),
+        None,
+        ("Alternative:", 'heading'),
+        ("If you need the text content, try PDF to Word conversion", None),
+        ("which can better handle text extraction and formatting.", None),
+    ]
+
+# Rows of the No_Data_Found sheet, in the no_tables_message format
+NO_DATA_MESSAGE = [
+    ("No Extractable Data Found", 'title'),
+    None,
+    ("The PDF appears to be:", 'heading'),
+    ("• Image-based (scanned document)", None),
+    ("• Password protected", None),
+    ("• Corrupted or unreadable", None),
+    ("• Empty or contains no text", None),
+    None,
+    ("Recommendations:", 'heading'),
+    ("• Use OCR software to extract text from images", None),
+    ("• Check if the PDF is password protected", None),
+    ("• Try a different PDF file", None),
+    ("• Ensure the PDF is not corrupted", None),
+]
+
+def write_message_rows(worksheet, rows, fonts):
+    """
+    Write message rows into column A of a normal worksheet
+    """
+    for row_idx, line in enumerate(rows, start=1):
+        if line is None:
+            continue
+        text, style = line
+        cell = worksheet.cell(row=row_idx, column=1, value=text)
+        if style:
+            cell.font = fonts[style]
+
+def add_excel_named_styles(workbook):
+    """
+    Register the named styles used by the streaming Excel writer
+    """
+    from openpyxl.styles import NamedStyle, Font, Alignment, Border, Side
     
-    for col in range(1, len(table_data[0]) + 1):
-        max_length = 0
-        for row in range(1, len(table_data) + 1):
-            cell_value = worksheet.cell(row=row, column=col).value
-            if cell_value:
-                # Count characters, considering some characters are wider
-                cell_length = len(str(cell_value))
-                # Adjust for special characters
-                for char in str(cell_value):
-                    if char in 'WMmw':
-                        cell_length += 0.5
-                    elif char in 'il':
-                        cell_length -= 0.2
-                
-                max_length = max(max_length, cell_length)
+    thin = Side(style='thin')
+    border = Border(left=thin, right=thin, top=thin, bottom=thin)
+    styles = [
+        NamedStyle(name='table_header', font=Font(bold=True, size=12), border=border,
+                   alignment=Alignment(horizontal='center', vertical='center')),
+        NamedStyle(name='table_cell', border=border,
+                   alignment=Alignment(horizontal='left', vertical='top')),
+        NamedStyle(name='message_title', font=Font(bold=True, size=14, color="FF0000")),
+        NamedStyle(name='message_heading', font=Font(bold=True, size=12)),
+        NamedStyle(name='text_header', font=Font(bold=True)),
+    ]
+    for style in styles:
+        workbook.add_named_style(style)
+
+def write_excel_streaming(excel_file_path, tables, text_data, page_selection='all'):
+    """
+    Write pdf_to_excel's sheets through a write-only workbook
+    Each row is written once with shared named styles and column widths come
+    from the table data, so memory stays bounded and time is linear in cells
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+    
+    wb = Workbook(write_only=True)
+    add_excel_named_styles(wb)
+    
+    def styled(ws, value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell.style = style
+        return cell
+    
+    def write_message(ws, rows):
+        for line in rows:
+            if line is None:
+                ws.append([])
+                continue
+            text, style = line
+            ws.append([styled(ws, text, f'message_{style}') if style else text])
+    
+    for table_idx, table_info in enumerate(tables):
+        ws = wb.create_sheet(table_export_name(table_info))
+        table_data = table_info['data']
+        
+        # Column widths have to be set before any row is written
+        for col, width in enumerate(compute_column_widths(table_data), start=1):
+            ws.column_dimensions[get_column_letter(col)].width = width
+        
+        for row_idx, row in enumerate(table_data):
+            style = 'table_header' if row_idx == 0 else 'table_cell'
+            ws.append([styled(ws, value, style) for value in row])
         
-        # Set column width with reasonable limits
-        adjusted_width = min(max(max_length + 2, 8), 50)
-        worksheet.column_dimensions[get_column_letter(col)].width = adjusted_width
+        print(f"Added table {table_idx + 1} to sheet {ws.title} with {len(table_data)} rows")
+    
+    if not tables:
+        ws = wb.create_sheet("No_Tables_Found")
+        ws.column_dimensions['A'].width = 60
+        write_message(ws, no_tables_message(page_selection))
+        print("No tables found - created user-friendly message sheet")
+    
+    if not tables and text_data:
+        ws = wb.create_sheet("Text_Content")
+        ws.column_dimensions['A'].width = 8
+        ws.column_dimensions['B'].width = 80
+        ws.append([styled(ws, "Page", 'text_header'), styled(ws, "Content", 'text_header')])
+        for item in text_data:
+            ws.append([item['Page'], item['Content']])
+        print("Added text content to sheet")
+    
+    if not tables and not text_data:
+        ws = wb.create_sheet("No_Data_Found")
+        ws.column_dimensions['A'].width = 50
+        write_message(ws, NO_DATA_MESSAGE)
+        print("Created empty sheet with detailed message")
+    
+    wb.save(excel_file_path)
 
-def parse_page_selection(page_selection):
+TABLE_OUTPUT_FORMATS = ('xlsx', 'csv_zip', 'parquet', 'feather', 'jsonl')
+
+def table_export_name(table_info):
     """
-    Parse page selection string into list of page numbers
-    Examples: "1,3-5,7" -> [1,3,4,5,7]
-             "all" or "" -> None (all pages)
+    Sheet/file base name of an extracted table
+    """
+    return f"Page_{table_info['page']}_Table_{table_info['table_index']}"
+
+def tables_to_dataframe(tables):
+    """
+    One long DataFrame of all tables: page, table_index and row_index columns,
+    then col_1..col_N padded with None for narrower tables
     """
-    if not page_selection or page_selection.lower() == 'all':
-        return None  # All pages
+    import pandas as pd
     
-    pages = set()
-    parts = page_selection.split(',')
+    width = max((max((len(row) for row in table['data']), default=0) for table in tables), default=0)
+    columns = ['page', 'table_index', 'row_index'] + [f'col_{col}' for col in range(1, width + 1)]
+    records = []
+    for table in tables:
+        for row_idx, row in enumerate(table['data']):
+            records.append([table['page'], table['table_index'], row_idx]
+                           + list(row) + [None] * (width - len(row)))
     
-    for part in parts:
-        part = part.strip()
-        if '-' in part:
-            # Handle range like "3-5"
-            try:
-                start, end = map(int, part.split('-'))
-                pages.update(range(start, end + 1))
-            except ValueError:
-                print(f"Invalid range format: {part}")
+    frame = pd.DataFrame(records, columns=columns)
+    return frame.astype({'page': 'int32', 'table_index': 'int32', 'row_index': 'int32'})
+
+def write_table_export(output_path, tables, text_data, output_format):
+    """
+    Write pdf_to_excel's extraction in a bulk format without openpyxl
+    csv_zip: one CSV per table in a ZIP; parquet/feather: one columnar file
+    (see tables_to_dataframe); jsonl: one JSON object per table
+    As in the workbook, page text is only written when no tables were found
+    """
+    import csv
+    import io
+    import zipfile
+    
+    if output_format == 'csv_zip':
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
+            for table in tables:
+                with zipf.open(f"{table_export_name(table)}.csv", 'w') as raw:
+                    with io.TextIOWrapper(raw, encoding='utf-8', newline='') as out:
+                        csv.writer(out).writerows(table['data'])
+            if not tables and text_data:
+                with zipf.open("Text_Content.csv", 'w') as raw:
+                    with io.TextIOWrapper(raw, encoding='utf-8', newline='') as out:
+                        writer = csv.writer(out)
+                        writer.writerow(['Page', 'Content'])
+                        writer.writerows([item['Page'], item['Content']] for item in text_data)
+    
+    elif output_format in ('parquet', 'feather'):
+        import pandas as pd
+        
+        if tables or not text_data:
+            frame = tables_to_dataframe(tables)
         else:
-            # Handle single page
+            frame = pd.DataFrame({
+                'page': [item['Page'] for item in text_data],
+                'content': [item['Content'] for item in text_data],
+            })
+        if output_format == 'parquet':
+            frame.to_parquet(output_path, index=False)
+        else:
+            frame.to_feather(output_path)
+    
+    elif output_format == 'jsonl':
+        with open(output_path, 'w', encoding='utf-8') as f:
+            for table in tables:
+                f.write(json.dumps({
+                    'page': table['page'],
+                    'table_index': table['table_index'],
+                    'rows': table['rows'],
+                    'cols': table['cols'],
+                    'data': table['data'],
+                }, ensure_ascii=False) + '\n')
+            if not tables:
+                for item in text_data:
+                    f.write(json.dumps({'page': item['Page'], 'content': item['Content']},
+                                       ensure_ascii=False) + '\n')
+    
+    else:
+        raise ValueError(f"Unsupported table output format: {output_format}")
+    
+    if tables:
+        print(f"Wrote {len(tables)} tables as {output_format}")
+    else:
+        print(f"No tables found - wrote {len(text_data)} text sections as {output_format}")
+
+class PageRange:
+    """
+    A set of 1-based page numbers stored as sorted, merged (start, end) intervals
+    "1-2000" is one interval rather than 2000 numbers; membership is a bisect
+    """
+    
+    def __init__(self, intervals=()):
+        merged = []
+        for start, end in sorted(intervals):
+            if start > end:
+                continue
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        self.intervals = merged
+        self._starts = [start for start, _ in merged]
+    
+    @staticmethod
+    def parse_part(part):
+        """
+        Parse one "5" or "3-5" part (hyphen or en dash) into (start, end)
+        Raises ValueError for anything that isn't numbers
+        """
+        import re
+        
+        bounds = re.split(r'[-–]', part.strip())
+        if len(bounds) == 1:
+            page_num = int(bounds[0])
+            return page_num, page_num
+        if len(bounds) == 2:
+            return int(bounds[0]), int(bounds[1])
+        raise ValueError(f"Invalid range format: {part}")
+    
+    @classmethod
+    def parse(cls, page_selection, total_pages=None, strict=False):
+        """
+        Parse a selection like "1,3-5,7"; "all" or "" give None (all pages)
+        strict raises ValueError with a user-facing message for the first bad
+        part (checking bounds when total_pages is given); otherwise bad parts are
+        reported and skipped, out-of-range pages are dropped and an empty
+        result is None, as parse_page_selection always did
+        """
+        if not page_selection or page_selection.strip().lower() == 'all':
+            return None
+        
+        intervals = []
+        for part in page_selection.split(','):
+            part = part.strip()
+            is_range = '-' in part or '–' in part
             try:
-                pages.add(int(part))
+                start, end = cls.parse_part(part)
             except ValueError:
-                print(f"Invalid page number: {part}")
+                if is_range:
+                    if strict:
+                        raise ValueError(f"Invalid range format: '{part}'. Use format like '1-3'")
+                    print(f"Invalid range format: {part}")
+                else:
+                    if strict:
+                        raise ValueError(f"Invalid page number: '{part}'. Use numbers only")
+                    print(f"Invalid page number: {part}")
+                continue
+            
+            if strict:
+                kind = 'page range' if is_range else 'page number'
+                if start < 1:
+                    raise ValueError(f"Invalid {kind} '{part}': page numbers must be 1 or greater")
+                if total_pages is not None and end > total_pages:
+                    raise ValueError(f"Invalid {kind} '{part}': page {end} exceeds total pages ({total_pages})")
+                if start > end:
+                    raise ValueError(f"Invalid page range '{part}': start page ({start}) is greater than end page ({end})")
+            
+            intervals.append((max(start, 1), end if total_pages is None else min(end, total_pages)))
+        
+        page_range = cls(intervals)
+        if not page_range:
+            if strict:
+                raise ValueError(f"No pages selected: '{page_selection}'")
+            return None
+        return page_range
+    
+    def clip(self, total_pages):
+        """
+        The pages of this range that exist in a document of total_pages pages
+        """
+        return PageRange((start, min(end, total_pages)) for start, end in self.intervals)
+    
+    def __contains__(self, page_num):
+        import bisect
+        
+        index = bisect.bisect_right(self._starts, page_num) - 1
+        return index >= 0 and page_num <= self.intervals[index][1]
+    
+    def __iter__(self):
+        for start, end in self.intervals:
+            yield from range(start, end + 1)
+    
+    def __len__(self):
+        return sum(end - start + 1 for start, end in self.intervals)
+    
+    def __bool__(self):
+        return bool(self.intervals)
+    
+    def __eq__(self, other):
+        return isinstance(other, PageRange) and self.intervals == other.intervals
+    
+    def __str__(self):
+        return ','.join(str(start) if start == end else f"{start}-{end}" for start, end in self.intervals)
+    
+    def __repr__(self):
+        return f"PageRange('{self}')"
+
+def parse_page_selection(page_selection):
+    """
+    Parse page selection string into a PageRange
+    Examples: "1,3-5,7" -> PageRange('1,3-5,7')
+             "all" or "" -> None (all pages)
+    """
+    return PageRange.parse(page_selection)
+
+RENDER_BACKENDS = ('poppler', 'pymupdf')
+
+def get_render_settings(options=None):
+    """
+    Read the rasterization options shared by every page-rendering conversion
+    render_backend: 'poppler' (pdf2image/pdftoppm, default) or 'pymupdf' (in-process fitz)
+    render_colorspace: 'rgb' (default) or 'gray'
+    render_clip: [x0, y0, x1, y1] in PDF points, optional
+    """
+    if options is None:
+        options = {}
+    
+    backend = options.get('render_backend', 'poppler')
+    if backend not in RENDER_BACKENDS:
+        print(f"Warning: Unknown render backend '{backend}', using 'poppler'")
+        backend = 'poppler'
+    
+    colorspace = options.get('render_colorspace', 'rgb')
+    if colorspace not in ('rgb', 'gray'):
+        print(f"Warning: Unknown render colorspace '{colorspace}', using 'rgb'")
+        colorspace = 'rgb'
+    
+    clip = options.get('render_clip')
+    if clip is not None:
+        clip = tuple(float(v) for v in clip)
+        if len(clip) != 4:
+            print(f"Warning: Ignoring render clip {clip}, expected [x0, y0, x1, y1]")
+            clip = None
+    
+    return {'backend': backend, 'colorspace': colorspace, 'clip': clip}
+
+def render_fitz_pages(document, first_page, last_page, dpi=200, colorspace='rgb', clip=None):
+    """
+    Render pages first_page..last_page (1-based, inclusive) of an open fitz document
+    straight from pixmaps into PIL images, without temp files or subprocesses
+    """
+    import fitz
+    from PIL import Image
+    
+    matrix = fitz.Matrix(dpi / 72, dpi / 72)
+    fitz_colorspace = fitz.csGRAY if colorspace == 'gray' else fitz.csRGB
+    mode = 'L' if colorspace == 'gray' else 'RGB'
+    
+    images = []
+    for page_index in range(first_page - 1, min(last_page, document.page_count)):
+        page = document[page_index]
+        pixmap = page.get_pixmap(matrix=matrix, colorspace=fitz_colorspace, alpha=False,
+                                 clip=fitz.Rect(clip) if clip else None)
+        images.append(Image.frombytes(mode, (pixmap.width, pixmap.height), pixmap.samples))
+        pixmap = None
+    
+    return images
+
+def render_pdf_pages(pdf_path, first_page=None, last_page=None, dpi=200, backend='poppler',
+                     colorspace='rgb', clip=None, thread_count=1):
+    """
+    Render a page range (1-based, inclusive; None means document start/end) to PIL images
+    """
+    if backend == 'pymupdf':
+        import fitz
+        
+        with fitz.open(pdf_path) as document:
+            return render_fitz_pages(document, first_page or 1, last_page or document.page_count,
+                                     dpi=dpi, colorspace=colorspace, clip=clip)
     
-    return sorted(list(pages)) if pages else None
+    from pdf2image import convert_from_path
+    
+    images = convert_from_path(pdf_path, dpi=dpi, first_page=first_page, last_page=last_page,
+                               grayscale=(colorspace == 'gray'), thread_count=thread_count)
+    if clip:
+        # pdftoppm has no clip in pdf2image, crop the render instead (points -> pixels)
+        scale = dpi / 72
+        box = tuple(int(round(v * scale)) for v in clip)
+        images = [image.crop(box) for image in images]
+    
+    return images
 
-def pdf_to_powerpoint(pdf_file_path, pptx_file_path):
+def pdf_to_powerpoint(pdf_file_path, pptx_file_path, options=None):
     """
     Convert PDF to PowerPoint using pdf2image and python-pptx
     Converts each PDF page to an image and creates a PowerPoint slide for each page
+    dpi option: slide image resolution (200 by default)
     """
     try:
-        from pdf2image import convert_from_path
         from pptx import Presentation
         from pptx.util import Inches
         from PIL import Image
         import tempfile
         import os
         
+        if options is None:
+            options = {}
+        
         print(f"Starting conversion of {pdf_file_path} to {pptx_file_path}")
         
+        # Only the selected page ranges are rendered
+        page_range = parse_page_selection(options.get('page_selection', 'all'))
+        intervals = page_range.intervals if page_range else [(None, None)]
+        
         # Convert PDF pages to images with high quality
         print("Converting PDF pages to images...")
-        images = convert_from_path(
-            pdf_file_path, 
-            dpi=200,  # High resolution for better quality
-            fmt='PNG',  # PNG format for better quality
-            thread_count=4  # Use multiple threads for faster processing
-        )
+        images = []
+        for first_page, last_page in intervals:
+            images.extend(render_pdf_pages(
+                pdf_file_path, 
+                first_page=first_page,
+                last_page=last_page,
+                dpi=options.get('dpi', 200),  # High resolution for better quality
+                thread_count=4,  # Use multiple threads for faster processing
+                **get_render_settings(options)
+            ))
         
         print(f"Converted {len(images)} pages to images")
         
@@ -490,148 +1050,848 @@ def pdf_to_powerpoint(pdf_file_path, pptx_file_path):
         traceback.print_exc()
         return False
 
-def pdf_to_powerpoint_text(pdf_file_path, pptx_file_path):
+def slide_text_page_task(page, page_num, options, state):
+    """
+    pdf_to_powerpoint_text's work for one page: its stripped text or None
+    """
+    print(f"Processing page {page_num}/{state['total_pages']}")
+    
+    # Extract text
+    text = page_text(page, page_num, options, state)
+    return text.strip() if text and text.strip() else None
+
+def pdf_to_powerpoint_text(pdf_file_path, pptx_file_path, options=None, session=None):
     """
     Alternative method: Convert PDF to PowerPoint using text extraction
     Creates text-based slides from PDF content
+    text_engine option: 'pdfplumber' (default), 'pypdf2' or 'pymupdf' (see TEXT_ENGINES);
+    text_mode option: 'plain' (default), 'blocks' or 'layout'
+    session: a DocumentSession to read pages from and share caches with
     """
     try:
-        import pdfplumber
         from pptx import Presentation
         from pptx.util import Inches
         from pptx.enum.text import PP_ALIGN
         
         print(f"Starting text-based conversion of {pdf_file_path} to {pptx_file_path}")
         
+        if options is None:
+            options = {}
+        
+        prs = Presentation()
+        
         # Extract text from PDF
-        with pdfplumber.open(pdf_file_path) as pdf:
-            prs = Presentation()
-            
-            for page_num, page in enumerate(pdf.pages):
-                print(f"Processing page {page_num + 1}/{len(pdf.pages)}")
+        page_range = parse_page_selection(options.get('page_selection', 'all'))
+        for page_num, text in map_pdf_pages(pdf_file_path, slide_text_page_task, page_numbers=page_range,
+                                            options=options,
+                                            library=get_text_library(options, 'pdfplumber'),
+                                            workers=get_worker_count(options), session=session):
+            if text:
+                # Add slide with title and content layout
+                slide_layout = prs.slide_layouts[1]  # Title and content
+                slide = prs.slides.add_slide(slide_layout)
                 
-                # Extract text
-                text = page.extract_text()
+                # Add title
+                title = slide.shapes.title
+                title.text = f"Page {page_num}"
                 
-                if text and text.strip():
-                    # Add slide with title and content layout
-                    slide_layout = prs.slide_layouts[1]  # Title and content
-                    slide = prs.slides.add_slide(slide_layout)
-                    
-                    # Add title
-                    title = slide.shapes.title
-                    title.text = f"Page {page_num + 1}"
-                    
-                    # Add content
-                    content = slide.placeholders[1]
-                    content.text = text.strip()
-                    
-                    print(f"Added text from page {page_num + 1} to slide {page_num + 1}")
-                else:
-                    # If no text, create blank slide with page number
-                    slide_layout = prs.slide_layouts[6]  # Blank layout
-                    slide = prs.slides.add_slide(slide_layout)
-                    
-                    # Add text box with page number
-                    left = Inches(1)
-                    top = Inches(1)
-                    width = Inches(8)
-                    height = Inches(1)
-                    
-                    textbox = slide.shapes.add_textbox(left, top, width, height)
-                    text_frame = textbox.text_frame
-                    text_frame.text = f"Page {page_num + 1} (No text content)"
-                    
-                    print(f"Added blank slide for page {page_num + 1}")
-            
-            # Save the presentation
-            prs.save(pptx_file_path)
-            print(f"Successfully created text-based PowerPoint file: {pptx_file_path}")
-            return True
-            
+                # Add content
+                content = slide.placeholders[1]
+                content.text = text
+                
+                print(f"Added text from page {page_num} to slide {page_num}")
+            else:
+                # If no text, create blank slide with page number
+                slide_layout = prs.slide_layouts[6]  # Blank layout
+                slide = prs.slides.add_slide(slide_layout)
+                
+                # Add text box with page number
+                left = Inches(1)
+                top = Inches(1)
+                width = Inches(8)
+                height = Inches(1)
+                
+                textbox = slide.shapes.add_textbox(left, top, width, height)
+                text_frame = textbox.text_frame
+                text_frame.text = f"Page {page_num} (No text content)"
+                
+                print(f"Added blank slide for page {page_num}")
+        
+        # Save the presentation
+        prs.save(pptx_file_path)
+        print(f"Successfully created text-based PowerPoint file: {pptx_file_path}")
+        return True
+        
     except Exception as e:
         print(f"Error in text-based PDF to PowerPoint conversion: {str(e)}")
         import traceback
         traceback.print_exc()
         return False
 
-def pdf_to_text(input_path, output_path, options=None):
+class PageRasterizer:
     """
-    Convert PDF to text file using pdfplumber with OCR support
+    Render pages of one PDF on demand, keeping recent renders in a small LRU
+    Every consumer in a conversion (OCR, image embedding) shares one instance,
+    so each (page, dpi) is rendered once. With read_ahead (for callers that
+    render every page, like image embedding) pages requested in order are
+    rendered in growing batches by a single pdftoppm run instead of one run
+    per page; without it only the requested page is rendered, as OCR of the
+    odd page without text needs.
     """
-    try:
-        import pdfplumber
-        import re
-        import pytesseract
-        from pdf2image import convert_from_path
-        from PIL import Image
-        import tempfile
-        import os
-        
-        if options is None:
-            options = {}
+    
+    def __init__(self, pdf_path, total_pages=None, cache_size=4, max_batch=4,
+                 backend='poppler', colorspace='rgb', clip=None, read_ahead=False):
+        from collections import OrderedDict
+        
+        self.pdf_path = pdf_path
+        self.total_pages = total_pages
+        self.backend = backend
+        self.colorspace = colorspace
+        self.clip = clip
+        self.read_ahead = read_ahead
+        self._document = None
+        self.max_batch = max(1, max_batch)
+        # A batch must fit in the cache or its pages are evicted before use
+        self.cache_size = max(cache_size, self.max_batch)
+        self._cache = OrderedDict()
+        self._last_requested = None
+        self._batch = 1
+    
+    def render(self, page_num, dpi=200):
+        """
+        Return the page (1-based) as a PIL image, or None if nothing was rendered
+        Callers must not modify the returned image in place
+        """
+        sequential = self._last_requested is not None and page_num == self._last_requested + 1
+        self._last_requested = page_num
+        
+        key = (page_num, dpi)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        
+        # Grow the batch while pages are read in order, fall back to single pages otherwise
+        # (pymupdf renders in-process, so batching only matters for poppler)
+        batching = self.read_ahead and sequential and self.backend == 'poppler'
+        self._batch = min(self._batch * 2, self.max_batch) if batching else 1
+        last_page = page_num + self._batch - 1
+        if self.total_pages:
+            last_page = min(last_page, self.total_pages)
+        
+        images = self._render_range(page_num, last_page, dpi)
+        for offset, image in enumerate(images):
+            self._store((page_num + offset, dpi), image)
+        
+        return self._cache.get(key)
+    
+    def render_range(self, first_page, last_page, dpi=200):
+        """
+        Render the pages first_page..last_page (1-based, inclusive) in one go,
+        bypassing the cache; returns the PIL images in page order
+        """
+        return self._render_range(first_page, last_page, dpi)
+    
+    def _render_range(self, first_page, last_page, dpi):
+        if self.backend == 'pymupdf':
+            import fitz
+            
+            # Keep one fitz document open for the rasterizer's lifetime
+            if self._document is None:
+                self._document = fitz.open(self.pdf_path)
+            return render_fitz_pages(self._document, first_page, last_page, dpi=dpi,
+                                     colorspace=self.colorspace, clip=self.clip)
+        
+        return render_pdf_pages(self.pdf_path, first_page, last_page, dpi=dpi, backend='poppler',
+                                colorspace=self.colorspace, clip=self.clip)
+    
+    def _store(self, key, image):
+        self._cache[key] = image
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def clear(self):
+        self._cache.clear()
+    
+    def close(self):
+        self.clear()
+        if self._document is not None:
+            self._document.close()
+            self._document = None
+
+PAGE_LIBRARIES = ('pdfplumber', 'pypdf2', 'fitz')
+
+class PdfPageSource:
+    """
+    A PDF opened once with one of the page libraries, pages addressed 1-based
+    Pages are pdfplumber pages, PyPDF2 pages or PyMuPDF pages depending on library
+    pdfplumber pages are built on demand instead of through pdf.pages, which keeps
+    every page (and its parsed layout) alive; release() drops a page's layout caches
+    """
+    
+    def __init__(self, pdf_path, library='pdfplumber', data=None):
+        if library not in PAGE_LIBRARIES:
+            raise ValueError(f"Unknown page library: {library}")
+        self.pdf_path = pdf_path
+        self.library = library
+        # File contents already in memory (DocumentSession), opened instead of the path
+        self.data = data
+        self._handle = None
+        self._file = None
+        self._pages = None
+        # pdfplumber only: pdfminer page objects and their doctops, filled as we go
+        self._page_objects = None
+        self._doctops = None
+        self._page_iter = None
+        self._page_count = None
+    
+    def open(self):
+        import io
         
-        use_ocr = options.get('ocr', True)
-        layout_mode = options.get('layout', 'formatted')  # Changed default to formatted
+        if self.library == 'pdfplumber':
+            import pdfplumber
+            from pdfminer.pdfpage import PDFPage
+            
+            self._handle = pdfplumber.open(io.BytesIO(self.data) if self.data is not None else self.pdf_path)
+            self._page_objects = []
+            self._doctops = [0]
+            self._page_iter = PDFPage.create_pages(self._handle.doc)
+        elif self.library == 'pypdf2':
+            import PyPDF2
+            
+            self._file = io.BytesIO(self.data) if self.data is not None else open(self.pdf_path, 'rb')
+            self._pages = PyPDF2.PdfReader(self._file).pages
+        else:
+            import fitz
+            
+            if self.data is not None:
+                self._handle = fitz.open(stream=self.data, filetype='pdf')
+            else:
+                self._handle = fitz.open(self.pdf_path)
+            self._pages = self._handle
+        return self
+    
+    @property
+    def page_count(self):
+        if self.library != 'pdfplumber':
+            return len(self._pages)
+        if self._page_count is None:
+            self._advance_to(None)
+            self._page_count = len(self._page_objects)
+        return self._page_count
+    
+    def _advance_to(self, page_num):
+        # Walk the page tree up to page_num (None for the end), keeping only
+        # the light pdfminer page objects
+        while page_num is None or len(self._page_objects) < page_num:
+            page_obj = next(self._page_iter, None)
+            if page_obj is None:
+                break
+            self._page_objects.append(page_obj)
+    
+    def page(self, page_num):
+        if self.library != 'pdfplumber':
+            return self._pages[page_num - 1]
+        
+        from pdfplumber.page import Page
+        
+        self._advance_to(page_num)
+        if not 1 <= page_num <= len(self._page_objects):
+            raise IndexError(f"Page {page_num} out of range")
+        
+        # Running doctop as pdf.pages computes it; building a Page to read its
+        # height doesn't parse its layout
+        while len(self._doctops) < page_num:
+            index = len(self._doctops)
+            previous = Page(self._handle, self._page_objects[index - 1], page_number=index,
+                            initial_doctop=self._doctops[-1])
+            self._doctops.append(self._doctops[-1] + previous.height)
+        
+        return Page(self._handle, self._page_objects[page_num - 1], page_number=page_num,
+                    initial_doctop=self._doctops[page_num - 1])
+    
+    def release(self, page):
+        """
+        Drop the cached layout objects (chars, lines, rects...) of a processed page
+        """
+        if self.library != 'pdfplumber':
+            return
+        close = getattr(page, 'close', None) or getattr(page, 'flush_cache', None)
+        if close is not None:
+            close()
+    
+    def close(self):
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._pages = None
+        self._page_objects = None
+        self._page_iter = None
+    
+    def __enter__(self):
+        return self.open()
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+# text_engine option -> PdfPageSource library
+TEXT_ENGINES = {'pdfplumber': 'pdfplumber', 'pypdf2': 'pypdf2', 'pymupdf': 'fitz'}
+TEXT_MODES = ('plain', 'blocks', 'layout')
+
+def get_text_library(options, default='pdfplumber'):
+    """
+    Read the text_engine option of a text-producing conversion, as a page library
+    (separate from engine, pdf_to_excel's table engine, so one options dict can
+    set both)
+    """
+    engine = (options or {}).get('text_engine', default)
+    if engine not in TEXT_ENGINES:
+        print(f"Warning: Unknown text engine '{engine}', using '{default}'")
+        engine = default
+    return TEXT_ENGINES[engine]
+
+def fitz_layout_text(page, line_tolerance=3):
+    """
+    Layout-preserving text of a PyMuPDF page: words are placed on a character
+    grid by their x position and big vertical gaps become blank lines
+    """
+    words = page.get_text('words', sort=True)
+    if not words:
+        return ''
+    
+    # Average character width sets the grid
+    char_width = sum(w[2] - w[0] for w in words) / max(sum(len(w[4]) for w in words), 1) or 5
+    
+    lines = []
+    for word in sorted(words, key=lambda w: (round(w[3]), w[0])):
+        if lines and abs(lines[-1]['bottom'] - word[3]) <= line_tolerance:
+            lines[-1]['words'].append(word)
+        else:
+            lines.append({'top': word[1], 'bottom': word[3], 'words': [word]})
+    
+    heights = sorted(line['bottom'] - line['top'] for line in lines)
+    line_height = heights[len(heights) // 2] or 10
+    
+    out = []
+    previous_bottom = None
+    for line in lines:
+        if previous_bottom is not None and line['top'] - previous_bottom > line_height:
+            out.append('')
+        previous_bottom = line['bottom']
+        
+        text = ''
+        for word in sorted(line['words'], key=lambda w: w[0]):
+            column = int(round((word[0] - page.rect.x0) / char_width))
+            text += ' ' * max(column - len(text), 1 if text else 0) + word[4]
+        out.append(text)
+    
+    return '\n'.join(out)
+
+def extract_page_text(page, library='pdfplumber', mode='plain'):
+    """
+    Text of one page through the page's library
+    mode 'plain' is each library's own extraction; 'blocks' separates text
+    blocks with blank lines and 'layout' keeps the horizontal layout. pdfplumber
+    has no blocks (plain is used) and PyPDF2 only does plain
+    """
+    if mode not in TEXT_MODES:
+        mode = 'plain'
+    
+    if library == 'fitz':
+        if mode == 'blocks':
+            blocks = page.get_text('blocks', sort=True)
+            # Block type 0 is text, 1 is an image
+            return '\n\n'.join(block[4].strip() for block in blocks if block[6] == 0 and block[4].strip())
+        if mode == 'layout':
+            return fitz_layout_text(page)
+        return page.get_text('text')
+    
+    if library == 'pdfplumber' and mode == 'layout':
+        return page.extract_text(layout=True)
+    return page.extract_text()
+
+# Below this many pages map_pdf_pages stays serial, process startup costs more than it saves
+PAGE_PARALLEL_MIN_PAGES = 8
+
+def get_worker_count(options=None):
+    """
+    Read the workers option: a process count, or 'auto' for one per core
+    """
+    workers = (options or {}).get('workers', 1)
+    if workers == 'auto':
+        workers = os.cpu_count() or 1
+    return max(1, int(workers))
+
+def get_page_rasterizer(state, options, read_ahead=False):
+    """
+    The PageRasterizer of a map_pdf_pages shard (or of its DocumentSession),
+    created on first use
+    read_ahead: the caller renders every page, so sequential pages are batched
+    (see PageRasterizer); any caller asking for it turns it on
+    """
+    if state.get('session') is not None:
+        rasterizer = state['session'].get_rasterizer(options)
+    else:
+        if 'rasterizer' not in state:
+            state['rasterizer'] = PageRasterizer(state['pdf_path'], total_pages=state['total_pages'],
+                                                 **get_render_settings(options))
+        rasterizer = state['rasterizer']
+    if read_ahead:
+        rasterizer.read_ahead = True
+    return rasterizer
+
+def close_page_state(state):
+    """
+    Close everything a page function cached in its shard state
+    A DocumentSession in the state outlives the shard and is left open
+    """
+    for key, value in state.items():
+        if key == 'session':
+            continue
+        close = getattr(value, 'close', None)
+        if callable(close):
+            close()
+
+def run_page_shard(pdf_path, library, page_func, page_numbers, options, total_pages):
+    """
+    Pool task: run page_func over one shard of pages, opening the PDF once
+    Each page's log output is captured and sent back for the parent to print in order
+    """
+    import contextlib
+    import io
+    
+    state = {'pdf_path': pdf_path, 'total_pages': total_pages, 'library': library}
+    results = []
+    try:
+        with PdfPageSource(pdf_path, library) as source:
+            for page_num in page_numbers:
+                log = io.StringIO()
+                page = source.page(page_num)
+                with contextlib.redirect_stdout(log):
+                    result = page_func(page, page_num, options, state)
+                source.release(page)
+                results.append((page_num, result, log.getvalue()))
+    finally:
+        close_page_state(state)
+    return results
+
+def run_source_pages(source, page_func, page_numbers, options, state):
+    """
+    Serial map_pdf_pages: run page_func page by page on an open PdfPageSource
+    """
+    on_page_done = options.get('on_page_done')
+    try:
+        for page_num in page_numbers:
+            page = source.page(page_num)
+            result = page_func(page, page_num, options, state)
+            source.release(page)
+            if on_page_done is not None:
+                on_page_done(page_num)
+            yield page_num, result
+    finally:
+        close_page_state(state)
+
+def map_pdf_pages(pdf_path, page_func, page_numbers=None, options=None, library='pdfplumber',
+                  workers=1, min_pages=PAGE_PARALLEL_MIN_PAGES, session=None):
+    """
+    Run page_func(page, page_num, options, state) over the pages of a PDF and
+    yield (page_num, result) in page order
+    page_numbers is a PageRange (from parse_page_selection), None for every
+    page; pages outside the document are skipped. A plain list of page numbers
+    is still accepted.
+    With workers > 1 the pages are split into contiguous shards run by a process
+    pool. Each shard opens the PDF once and has its own state dict (pdf_path,
+    total_pages, library and whatever page_func caches there, closed at the end
+    of the shard). page_func must be a module-level function with picklable results.
+    With a DocumentSession the pages run serially on the session's open document
+    and the state also holds the session, whose caches page_func can use.
+    on_page_done option: called with each page number as its result is ready
+    (serial runs only; run_preview times pages with it)
+    """
+    import math
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    
+    if options is None:
+        options = {}
+    
+    def select_pages(total_pages):
+        if page_numbers is None:
+            return list(range(1, total_pages + 1))
+        if isinstance(page_numbers, PageRange):
+            return list(page_numbers.clip(total_pages))
+        return [page_num for page_num in page_numbers if 1 <= page_num <= total_pages]
+    
+    if session is not None:
+        source = session.source(library)
+        state = {'pdf_path': pdf_path, 'total_pages': source.page_count, 'library': library, 'session': session}
+        yield from run_source_pages(source, page_func, select_pages(source.page_count), options, state)
+        return
+    
+    with PdfPageSource(pdf_path, library) as source:
+        total_pages = source.page_count
+        page_numbers = select_pages(total_pages)
+        
+        workers = min(workers, len(page_numbers))
+        if workers <= 1 or len(page_numbers) < min_pages:
+            state = {'pdf_path': pdf_path, 'total_pages': total_pages, 'library': library}
+            yield from run_source_pages(source, page_func, page_numbers, options, state)
+            return
+    
+    # A few shards per worker keeps the pool balanced and results flowing in order
+    shard_size = math.ceil(len(page_numbers) / (workers * 2))
+    shards = iter([page_numbers[i:i + shard_size] for i in range(0, len(page_numbers), shard_size)])
+    pending = deque()
+    print(f"Processing {len(page_numbers)} pages with {workers} workers")
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        def submit_next():
+            for shard in shards:
+                pending.append(executor.submit(run_page_shard, pdf_path, library, page_func,
+                                               shard, options, total_pages))
+                return
         
-        extracted_text = []
+        for _ in range(workers + 1):
+            submit_next()
         
-        with pdfplumber.open(input_path) as pdf:
-            total_pages = len(pdf.pages)
-            
-            for page_num, page in enumerate(pdf.pages, 1):
-                print(f"Processing page {page_num}/{total_pages}")
-                
-                # Extract text from the page
-                text = page.extract_text()
-                
-                if not text and use_ocr:
-                    # If no text found and OCR is enabled, try OCR
-                    print(f"Page {page_num}: No text found, attempting OCR...")
-                    try:
-                        # Convert PDF page to image for OCR
-                        images = convert_from_path(input_path, first_page=page_num, last_page=page_num)
-                        if images:
-                            # Get the first (and only) image
-                            image = images[0]
-                            
-                            # Perform OCR on the image
-                            ocr_text = pytesseract.image_to_string(image, lang='eng')
-                            
-                            if ocr_text.strip():
-                                text = ocr_text
-                                print(f"Page {page_num}: OCR successful, extracted {len(text)} characters")
-                            else:
-                                text = f"[OCR completed but no text found on page {page_num}]"
-                                print(f"Page {page_num}: OCR completed but no text found")
-                        else:
-                            text = f"[OCR failed - could not convert page {page_num} to image]"
-                            print(f"Page {page_num}: OCR failed - could not convert to image")
-                    except Exception as ocr_error:
-                        print(f"Page {page_num}: OCR error: {str(ocr_error)}")
-                        text = f"[OCR error on page {page_num}: {str(ocr_error)}]"
+        try:
+            while pending:
+                shard_results = pending.popleft().result()
+                submit_next()
+                for page_num, result, log in shard_results:
+                    sys.stdout.write(log)
+                    yield page_num, result
+        finally:
+            for future in pending:
+                future.cancel()
+
+def text_page_task(page, page_num, options, state):
+    """
+    pdf_to_text's work for one page: its text, OCR'd if needed, then formatted
+    """
+    import re
+    
+    use_ocr = options.get('ocr', True)
+    layout_mode = options.get('layout', 'formatted')  # Changed default to formatted
+    
+    print(f"Processing page {page_num}/{state['total_pages']}")
+    
+    # Extract text from the page
+    text = page_text(page, page_num, options, state)
+    
+    if not text and use_ocr:
+        # If no text found and OCR is enabled, try OCR
+        print(f"Page {page_num}: No text found, attempting OCR...")
+        try:
+            # Render PDF page for OCR
+            image = get_page_rasterizer(state, options).render(page_num)
+            if image is not None:
+                # Perform OCR on the image
+                ocr_text = ocr_image_text(image, 'eng', dpi=200)
                 
-                if text:
-                    if layout_mode == 'formatted':
-                        # Try to preserve some formatting
-                        text = re.sub(r'\n{3,}', '\n\n', text)  # Remove excessive line breaks
-                        text = re.sub(r' +', ' ', text)  # Normalize spaces
-                        # Keep paragraph breaks and basic formatting
-                        text = text.strip()
-                    else:
-                        # Simple text flow - remove extra whitespace
-                        text = re.sub(r'\s+', ' ', text).strip()
-                    
-                    extracted_text.append(text)
+                if ocr_text.strip():
+                    text = ocr_text
+                    print(f"Page {page_num}: OCR successful, extracted {len(text)} characters")
                 else:
-                    extracted_text.append(f"[Page {page_num}: No text content]")
+                    text = f"[OCR completed but no text found on page {page_num}]"
+                    print(f"Page {page_num}: OCR completed but no text found")
+            else:
+                text = f"[OCR failed - could not convert page {page_num} to image]"
+                print(f"Page {page_num}: OCR failed - could not convert to image")
+        except Exception as ocr_error:
+            print(f"Page {page_num}: OCR error: {str(ocr_error)}")
+            text = f"[OCR error on page {page_num}: {str(ocr_error)}]"
+    
+    if not text:
+        return f"[Page {page_num}: No text content]"
+    
+    if layout_mode == 'formatted':
+        # Try to preserve some formatting
+        text = re.sub(r'\n{3,}', '\n\n', text)  # Remove excessive line breaks
+        text = re.sub(r' +', ' ', text)  # Normalize spaces
+        # Keep paragraph breaks and basic formatting
+        return text.strip()
+    # Simple text flow - remove extra whitespace
+    return re.sub(r'\s+', ' ', text).strip()
+
+def ocr_missing_page_text(rasterizer, page_num):
+    """
+    OCR fallback for a page without a text layer: the OCR text or a placeholder
+    """
+    print(f"Page {page_num}: No text found, attempting OCR...")
+    try:
+        # Render PDF page for OCR
+        image = rasterizer.render(page_num)
+        if image is None:
+            return f"[OCR failed - could not convert page {page_num} to image]"
+        ocr_text = ocr_image_text(image, 'eng', dpi=200)
+        if ocr_text.strip():
+            print(f"Page {page_num}: OCR successful")
+            return ocr_text
+        return f"[OCR completed but no text found on page {page_num}]"
+    except Exception as ocr_error:
+        print(f"Page {page_num}: OCR error: {str(ocr_error)}")
+        return f"[OCR error on page {page_num}]"
+
+def html_page_task(page, page_num, options, state):
+    """
+    pdf_to_html's work for one page: the HTML parts of its page div
+    """
+    import base64
+    import io
+    
+    use_ocr = options.get('ocr', False)
+    embed_images = options.get('embedImages', True)
+    # OCR and image embedding share one render per page
+    rasterizer = get_page_rasterizer(state, options, read_ahead=embed_images)
+    
+    print(f"Processing page {page_num}/{state['total_pages']}")
+    
+    # Start page div
+    html_parts = [f'<div class="page">', f'<div class="page-number">Page {page_num}</div>']
+    
+    # Extract text from the page
+    text = page_text(page, page_num, options, state)
+    
+    if not text and use_ocr:
+        # If no text found and OCR is enabled, try OCR
+        text = ocr_missing_page_text(rasterizer, page_num)
+    
+    # Add text content
+    if text:
+        # Convert text to HTML paragraphs
+        paragraphs = text.split('\n\n')
+        for para in paragraphs:
+            if para.strip():
+                # Escape HTML characters
+                para_html = para.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+                html_parts.append(f'<p>{para_html}</p>')
+    else:
+        html_parts.append(f'<p>[No text content on page {page_num}]</p>')
+    
+    # Extract and embed images if enabled
+    if embed_images:
+        try:
+            # Render page to image (reuses the OCR render if there was one)
+            image = rasterizer.render(page_num)
+            if image is not None:
+                # Convert PIL image to base64
+                img_buffer = io.BytesIO()
+                image.save(img_buffer, format='PNG')
+                img_str = base64.b64encode(img_buffer.getvalue()).decode()
+                
+                # Add image to HTML
+                html_parts.append(f'<img src="data:image/png;base64,{img_str}" alt="Page {page_num}" />')
+                print(f"Page {page_num}: Image embedded")
+        except Exception as img_error:
+            print(f"Page {page_num}: Image embedding error: {str(img_error)}")
+            html_parts.append(f'<p>[Image embedding failed for page {page_num}]</p>')
+    
+    # End page div
+    html_parts.append('</div>')
+    return html_parts
+
+class DocumentSession:
+    """
+    One PDF shared by several conversions
+    The file is read once and each page library opens it from memory at most
+    once; the page tasks cache per-page text and tables in it (cached()), and
+    renders go through one shared PageRasterizer
+    Pass it as session= to the conversion functions, or use convert_multi
+    """
+    
+    def __init__(self, pdf_path):
+        self.pdf_path = pdf_path
+        with open(pdf_path, 'rb') as f:
+            self.data = f.read()
+        self._sources = {}
+        self._cache = {}
+        self._rasterizer = None
+    
+    def source(self, library='pdfplumber'):
+        """
+        The session's open PdfPageSource for a page library
+        """
+        if library not in self._sources:
+            self._sources[library] = PdfPageSource(self.pdf_path, library, data=self.data).open()
+        return self._sources[library]
+    
+    @property
+    def page_count(self):
+        library = next(iter(self._sources), 'pdfplumber')
+        return self.source(library).page_count
+    
+    def cached(self, key, compute):
+        """
+        The cached value for key, computed by compute() the first time
+        """
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+    
+    def get_rasterizer(self, options=None):
+        """
+        The session's PageRasterizer, set up from the first caller's render options
+        """
+        if self._rasterizer is None:
+            self._rasterizer = PageRasterizer(self.pdf_path, total_pages=self.page_count,
+                                              **get_render_settings(options))
+        return self._rasterizer
+    
+    def close(self):
+        for source in self._sources.values():
+            source.close()
+        self._sources = {}
+        self._cache = {}
+        if self._rasterizer is not None:
+            self._rasterizer.close()
+            self._rasterizer = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+def page_text(page, page_num, options, state):
+    """
+    Text of a page for a page task, through the session's cache when there is one
+    """
+    library = state['library']
+    mode = options.get('text_mode', 'plain')
+    session = state.get('session')
+    if session is None:
+        return extract_page_text(page, library, mode)
+    return session.cached(('text', library, mode, page_num), lambda: extract_page_text(page, library, mode))
+
+# Conversions that write their output page by page and can stream it
+STREAMING_CONVERSIONS = ('pdf-to-text', 'pdf-to-html')
+
+class ZipStreamOutput:
+    """
+    A binary stream (stdout) a ZIP is written onto; zipfile handles streams
+    that cannot seek. abort() drops everything written after it, so the ZIP of
+    a failed conversion never gets its central directory (ZipFile writes one
+    on close, even when garbage collected) and readers see it as incomplete
+    """
+    
+    def __init__(self, out):
+        self.out = out
+        self.aborted = False
+    
+    def write(self, data):
+        if not self.aborted:
+            self.out.write(data)
+        return len(data)
+    
+    def flush(self):
+        if not self.aborted:
+            self.out.flush()
+    
+    def abort(self):
+        self.aborted = True
+
+class StdoutTextStream:
+    """
+    Text output written straight to a binary stream (stdout) as UTF-8
+    framed: every write becomes one frame, a 4-byte big-endian length followed
+    by that many bytes; end() sends the zero-length frame that marks a
+    complete output (a failed conversion never sends it)
+    """
+    
+    def __init__(self, out, framed=False):
+        import struct
+        
+        self.out = out
+        self.framed = framed
+        self._header = struct.Struct('>I')
+    
+    def write(self, text):
+        data = text.encode('utf-8')
+        if self.framed:
+            if not data:
+                return 0
+            self.out.write(self._header.pack(len(data)))
+        self.out.write(data)
+        return len(text)
+    
+    def flush(self):
+        self.out.flush()
+    
+    def end(self):
+        if self.framed:
+            self.out.write(self._header.pack(0))
+        self.out.flush()
+    
+    def __str__(self):
+        return '<stdout>'
+
+def source_display_name(pdf_path, options):
+    """
+    The input's name for titles and summaries: the source_name option when
+    the PDF path is not the user's file (stdin, a preview's cut-down copy),
+    else the file name
+    """
+    return options.get('source_name') or os.path.basename(pdf_path)
+
+def open_text_output(output_path, stream=False):
+    """
+    Open output_path for writing text: pages go to output_path + '.part',
+    which replaces output_path once the with block completes, so a failed
+    conversion leaves no truncated file. A text stream (a StdoutTextStream)
+    is written to directly, and so is output_path with stream set, for
+    readers following the file as pages are flushed (a failed conversion
+    then leaves the pages written so far)
+    """
+    from contextlib import contextmanager, nullcontext
+    
+    if hasattr(output_path, 'write'):
+        return nullcontext(output_path)
+    if stream:
+        return open(output_path, 'w', encoding='utf-8')
+    
+    @contextmanager
+    def part_file():
+        part_path = output_path + '.part'
+        try:
+            with open(part_path, 'w', encoding='utf-8') as f:
+                yield f
+            os.replace(part_path, output_path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+    
+    return part_file()
+
+def pdf_to_text(input_path, output_path, options=None, session=None):
+    """
+    Convert PDF to text file using pdfplumber with OCR support
+    text_engine option: 'pdfplumber' (default), 'pypdf2' or 'pymupdf' (see TEXT_ENGINES);
+    text_mode option: 'plain' (default), 'blocks' or 'layout'
+    stream option: write output_path in place and flush it after every page
+    session: a DocumentSession to read pages from and share caches with
+    """
+    try:
+        if options is None:
+            options = {}
         
-        # Combine all text
-        full_text = '\n\n'.join(extracted_text)
+        stream = bool(options.get('stream', False))
+        page_range = parse_page_selection(options.get('page_selection', 'all'))
         
-        # Write to output file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(full_text)
+        # Write each page as soon as it is extracted
+        with open_text_output(output_path, stream) as f:
+            for index, (_, text) in enumerate(map_pdf_pages(input_path, text_page_task, page_numbers=page_range,
+                                                            options=options,
+                                                            library=get_text_library(options, 'pdfplumber'),
+                                                            workers=get_worker_count(options), session=session)):
+                # Pages are separated by a blank line
+                f.write(text if index == 0 else '\n\n' + text)
+                if stream:
+                    f.flush()
         
         print(f"Text extraction completed. Output saved to: {output_path}")
         return True
@@ -642,31 +1902,24 @@ def pdf_to_text(input_path, output_path, options=None):
         traceback.print_exc()
         return False
 
-def pdf_to_html(input_path, output_path, options=None):
+def pdf_to_html(input_path, output_path, options=None, session=None):
     """
     Convert PDF to HTML file using pdfplumber with image embedding support
+    text_engine option: 'pdfplumber' (default), 'pypdf2' or 'pymupdf' (see TEXT_ENGINES);
+    text_mode option: 'plain' (default), 'blocks' or 'layout'
+    stream option: write output_path in place and flush it after every page
+    session: a DocumentSession to read pages from and share caches with
     """
     try:
-        import pdfplumber
-        import re
-        import base64
-        import io
-        from PIL import Image
-        from pdf2image import convert_from_path
-        import pytesseract
-        
         if options is None:
             options = {}
         
-        use_ocr = options.get('ocr', False)
-        embed_images = options.get('embedImages', True)
         responsive = options.get('responsive', False)
-        
-        html_parts = []
+        stream = bool(options.get('stream', False))
         
         # HTML header with responsive design if enabled
         if responsive:
-            html_parts.append("""<!DOCTYPE html>
+            html_header = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -682,9 +1935,9 @@ def pdf_to_html(input_path, output_path, options=None):
         @media screen and (max-width: 768px) { body { margin: 10px; } }
     </style>
 </head>
-<body>""")
+<body>"""
         else:
-            html_parts.append("""<!DOCTYPE html>
+            html_header = """<!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
@@ -696,85 +1949,25 @@ def pdf_to_html(input_path, output_path, options=None):
         img { max-width: 800px; }
     </style>
 </head>
-<body>""")
-        
-        with pdfplumber.open(input_path) as pdf:
-            total_pages = len(pdf.pages)
-            
-            for page_num, page in enumerate(pdf.pages, 1):
-                print(f"Processing page {page_num}/{total_pages}")
-                
-                # Start page div
-                html_parts.append(f'<div class="page">')
-                html_parts.append(f'<div class="page-number">Page {page_num}</div>')
-                
-                # Extract text from the page
-                text = page.extract_text()
-                
-                if not text and use_ocr:
-                    # If no text found and OCR is enabled, try OCR
-                    print(f"Page {page_num}: No text found, attempting OCR...")
-                    try:
-                        # Convert PDF page to image for OCR
-                        images = convert_from_path(input_path, first_page=page_num, last_page=page_num)
-                        if images:
-                            image = images[0]
-                            ocr_text = pytesseract.image_to_string(image, lang='eng')
-                            if ocr_text.strip():
-                                text = ocr_text
-                                print(f"Page {page_num}: OCR successful")
-                            else:
-                                text = f"[OCR completed but no text found on page {page_num}]"
-                        else:
-                            text = f"[OCR failed - could not convert page {page_num} to image]"
-                    except Exception as ocr_error:
-                        print(f"Page {page_num}: OCR error: {str(ocr_error)}")
-                        text = f"[OCR error on page {page_num}]"
-                
-                # Add text content
-                if text:
-                    # Convert text to HTML paragraphs
-                    paragraphs = text.split('\n\n')
-                    for para in paragraphs:
-                        if para.strip():
-                            # Escape HTML characters
-                            para_html = para.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
-                            html_parts.append(f'<p>{para_html}</p>')
-                else:
-                    html_parts.append(f'<p>[No text content on page {page_num}]</p>')
-                
-                # Extract and embed images if enabled
-                if embed_images:
-                    try:
-                        # Convert page to image
-                        images = convert_from_path(input_path, first_page=page_num, last_page=page_num)
-                        if images:
-                            image = images[0]
-                            
-                            # Convert PIL image to base64
-                            img_buffer = io.BytesIO()
-                            image.save(img_buffer, format='PNG')
-                            img_str = base64.b64encode(img_buffer.getvalue()).decode()
-                            
-                            # Add image to HTML
-                            html_parts.append(f'<img src="data:image/png;base64,{img_str}" alt="Page {page_num}" />')
-                            print(f"Page {page_num}: Image embedded")
-                    except Exception as img_error:
-                        print(f"Page {page_num}: Image embedding error: {str(img_error)}")
-                        html_parts.append(f'<p>[Image embedding failed for page {page_num}]</p>')
-                
-                # End page div
-                html_parts.append('</div>')
-        
-        # HTML footer
-        html_parts.append("</body></html>")
+<body>"""
         
-        # Combine all HTML parts
-        full_html = '\n'.join(html_parts)
+        page_range = parse_page_selection(options.get('page_selection', 'all'))
         
-        # Write to output file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            f.write(full_html)
+        # Write the header, then each page as soon as it is converted
+        with open_text_output(output_path, stream) as f:
+            f.write(html_header)
+            if stream:
+                f.flush()
+            
+            for _, page_parts in map_pdf_pages(input_path, html_page_task, page_numbers=page_range, options=options,
+                                               library=get_text_library(options, 'pdfplumber'),
+                                               workers=get_worker_count(options), session=session):
+                f.write('\n' + '\n'.join(page_parts))
+                if stream:
+                    f.flush()
+            
+            # HTML footer
+            f.write('\n</body></html>')
         
         print(f"HTML conversion completed. Output saved to: {output_path}")
         return True
@@ -785,18 +1978,70 @@ def pdf_to_html(input_path, output_path, options=None):
         traceback.print_exc()
         return False
 
-def pdf_to_epub(pdf_file_path, epub_file_path, options=None):
+def epub_page_task(page, page_num, options, state):
+    """
+    pdf_to_epub's work for one page: (cleaned text or None, page images)
+    """
+    import base64
+    import io
+    from PIL import Image
+    
+    include_images = options.get('include_images', True)
+    image_quality = options.get('image_quality', 'medium')
+    # OCR and image extraction share one render per page
+    rasterizer = get_page_rasterizer(state, options, read_ahead=include_images)
+    
+    print(f"Processing page {page_num}/{state['total_pages']}")
+    
+    # Extract text from page
+    text = page_text(page, page_num, options, state)
+    
+    # If no text found and OCR is enabled, try OCR
+    if not text and options.get('ocr', False):
+        text = ocr_missing_page_text(rasterizer, page_num)
+    
+    # Extract images if enabled
+    page_images = []
+    if include_images:
+        try:
+            image = rasterizer.render(page_num)
+            if image is not None:
+                # Adjust image quality based on setting
+                if image_quality == 'low':
+                    image = image.resize((image.width // 2, image.height // 2), Image.Resampling.LANCZOS)
+                elif image_quality == 'high':
+                    # Keep original size for high quality
+                    pass
+                else:  # medium
+                    # Slight reduction for medium quality
+                    image = image.resize((int(image.width * 0.8), int(image.height * 0.8)), Image.Resampling.LANCZOS)
+                
+                # Convert to base64
+                img_buffer = io.BytesIO()
+                image.save(img_buffer, format='JPEG', quality=85)
+                img_str = base64.b64encode(img_buffer.getvalue()).decode()
+                
+                page_images.append({
+                    'data': img_str,
+                    'alt': f'Page {page_num}'
+                })
+                print(f"Page {page_num}: Image extracted")
+        except Exception as img_error:
+            print(f"Page {page_num}: Image extraction error: {str(img_error)}")
+    
+    # Clean and format text
+    cleaned_text = clean_text_for_epub(text, options) if text else None
+    return cleaned_text, page_images
+
+def pdf_to_epub(pdf_file_path, epub_file_path, options=None, session=None):
     """
     Convert PDF to EPUB format using pypdf2 and ebooklib with advanced options
+    text_engine option: 'pypdf2' (default), 'pdfplumber' or 'pymupdf' (see TEXT_ENGINES);
+    text_mode option: 'plain' (default), 'blocks' or 'layout'
+    session: a DocumentSession to read pages from and share caches with
     """
     try:
-        import PyPDF2
         from ebooklib import epub
-        import re
-        import html
-        import base64
-        import io
-        from PIL import Image
         
         print(f"Starting conversion of {pdf_file_path} to {epub_file_path}")
         
@@ -810,205 +2055,143 @@ def pdf_to_epub(pdf_file_path, epub_file_path, options=None):
         custom_title = options.get('custom_title')
         custom_author = options.get('custom_author')
         
-        book.set_identifier(f"pdf-conversion-{os.path.basename(pdf_file_path)}")
-        book.set_title(custom_title or f"Converted from {os.path.basename(pdf_file_path)}")
+        source_name = source_display_name(pdf_file_path, options)
+        book.set_identifier(f"pdf-conversion-{source_name}")
+        book.set_title(custom_title or f"Converted from {source_name}")
         book.set_language('en')
         book.add_author(custom_author or 'PDF Converter')
         
         # Extract text and images from PDF
         chapters = []
         chapter_titles = []
-        images = []
         
-        with open(pdf_file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            total_pages = len(pdf_reader.pages)
-            
-            print(f"Processing {total_pages} pages")
-            
-            # Determine chapter size (pages per chapter)
-            pages_per_chapter = options.get('pages_per_chapter', 10)
-            if pages_per_chapter <= 0:
-                pages_per_chapter = total_pages  # Single chapter
+        # Determine chapter size (pages per chapter), 0 or less for a single chapter
+        pages_per_chapter = options.get('pages_per_chapter', 10)
+        page_break_style = options.get('page_break_style', 'chapter')
+        
+        current_chapter_text = []
+        current_chapter_pages = []
+        
+        def finish_chapter():
+            # Create chapter content
+            chapter_content = '\n\n'.join(current_chapter_text)
             
-            current_chapter_text = []
-            current_chapter_pages = []
-            page_break_style = options.get('page_break_style', 'chapter')
-            include_images = options.get('include_images', True)
-            image_quality = options.get('image_quality', 'medium')
+            # Create chapter title
+            if len(current_chapter_pages) == 1:
+                chapter_title = f"Page {current_chapter_pages[0]}"
+            else:
+                chapter_title = f"Pages {current_chapter_pages[0]}-{current_chapter_pages[-1]}"
             
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                print(f"Processing page {page_num}/{total_pages}")
-                
-                # Extract text from page
-                text = page.extract_text()
-                
-                # If no text found and OCR is enabled, try OCR
-                if not text and options.get('ocr', False):
-                    print(f"Page {page_num}: No text found, attempting OCR...")
-                    try:
-                        from pdf2image import convert_from_path
-                        import pytesseract
-                        
-                        # Convert PDF page to image for OCR
-                        images_pdf = convert_from_path(pdf_file_path, first_page=page_num, last_page=page_num)
-                        if images_pdf:
-                            image = images_pdf[0]
-                            ocr_text = pytesseract.image_to_string(image, lang='eng')
-                            if ocr_text.strip():
-                                text = ocr_text
-                                print(f"Page {page_num}: OCR successful")
-                            else:
-                                text = f"[OCR completed but no text found on page {page_num}]"
-                        else:
-                            text = f"[OCR failed - could not convert page {page_num} to image]"
-                    except Exception as ocr_error:
-                        print(f"Page {page_num}: OCR error: {str(ocr_error)}")
-                        text = f"[OCR error on page {page_num}]"
-                
-                # Extract images if enabled
-                page_images = []
-                if include_images:
-                    try:
-                        from pdf2image import convert_from_path
-                        images_pdf = convert_from_path(pdf_file_path, first_page=page_num, last_page=page_num)
-                        if images_pdf:
-                            image = images_pdf[0]
-                            
-                            # Adjust image quality based on setting
-                            if image_quality == 'low':
-                                image = image.resize((image.width // 2, image.height // 2), Image.Resampling.LANCZOS)
-                            elif image_quality == 'high':
-                                # Keep original size for high quality
-                                pass
-                            else:  # medium
-                                # Slight reduction for medium quality
-                                image = image.resize((int(image.width * 0.8), int(image.height * 0.8)), Image.Resampling.LANCZOS)
-                            
-                            # Convert to base64
-                            img_buffer = io.BytesIO()
-                            image.save(img_buffer, format='JPEG', quality=85)
-                            img_str = base64.b64encode(img_buffer.getvalue()).decode()
-                            
-                            page_images.append({
-                                'data': img_str,
-                                'alt': f'Page {page_num}'
-                            })
-                            print(f"Page {page_num}: Image extracted")
-                    except Exception as img_error:
-                        print(f"Page {page_num}: Image extraction error: {str(img_error)}")
-                
-                if text:
-                    # Clean and format text
-                    cleaned_text = clean_text_for_epub(text, options)
-                    current_chapter_text.append(cleaned_text)
-                    current_chapter_pages.append(page_num)
-                    
-                    # Add images to chapter if any
-                    if page_images:
-                        for img in page_images:
-                            current_chapter_text.append(f'<img src="data:image/jpeg;base64,{img["data"]}" alt="{img["alt"]}" style="max-width: 100%; height: auto;" />')
-                
-                # Create new chapter based on page break style
-                should_create_chapter = False
-                if page_break_style == 'page':
-                    should_create_chapter = True
-                elif page_break_style == 'chapter':
-                    should_create_chapter = (len(current_chapter_pages) >= pages_per_chapter or page_num == total_pages)
-                else:  # none
-                    should_create_chapter = (page_num == total_pages)
-                
-                if should_create_chapter and current_chapter_text:
-                    # Create chapter content
-                    chapter_content = '\n\n'.join(current_chapter_text)
-                    
-                    # Create chapter title
-                    if len(current_chapter_pages) == 1:
-                        chapter_title = f"Page {current_chapter_pages[0]}"
-                    else:
-                        chapter_title = f"Pages {current_chapter_pages[0]}-{current_chapter_pages[-1]}"
-                    
-                    # Create EPUB chapter
-                    chapter = epub.EpubHtml(
-                        title=chapter_title,
-                        file_name=f'chapter_{len(chapters) + 1}.xhtml',
-                        content=f'<h1>{chapter_title}</h1>\n{chapter_content}'
-                    )
-                    
-                    chapters.append(chapter)
-                    chapter_titles.append(chapter_title)
-                    
-                    # Reset for next chapter
-                    current_chapter_text = []
-                    current_chapter_pages = []
-            
-            # Add chapters to book
-            for chapter in chapters:
-                book.add_item(chapter)
-            
-            # Create table of contents if enabled
-            if options.get('add_toc', True):
-                book.toc = [(epub.Section('Chapters'), chapters)]
-            
-            # Add default NCX and Nav files
-            book.add_item(epub.EpubNcx())
-            book.add_item(epub.EpubNav())
-            
-            # Define CSS style based on options
-            font_size_map = {'small': '12px', 'medium': '16px', 'large': '20px'}
-            line_spacing_map = {'tight': '1.2', 'normal': '1.5', 'loose': '1.8'}
-            
-            font_size = font_size_map.get(options.get('font_size', 'medium'), '16px')
-            line_spacing = line_spacing_map.get(options.get('line_spacing', 'normal'), '1.5')
-            
-            style = f'''
-            @namespace epub "http://www.idpf.org/2007/ops";
-            body {{ 
-                font-family: Arial, sans-serif; 
-                line-height: {line_spacing}; 
-                margin: 20px; 
-                font-size: {font_size};
-            }}
-            h1 {{ 
-                color: #333; 
-                border-bottom: 2px solid #333; 
-                padding-bottom: 10px; 
-                font-size: 1.5em;
-            }}
-            p {{ 
-                margin-bottom: 1em; 
-                text-align: justify; 
-            }}
-            img {{ 
-                max-width: 100%; 
-                height: auto; 
-                display: block; 
-                margin: 1em auto; 
-            }}
-            '''
-            
-            # Add CSS file
-            nav_css = epub.EpubItem(
-                uid="style_nav",
-                file_name="style/nav.css",
-                media_type="text/css",
-                content=style
+            # Create EPUB chapter
+            chapter = epub.EpubHtml(
+                title=chapter_title,
+                file_name=f'chapter_{len(chapters) + 1}.xhtml',
+                content=f'<h1>{chapter_title}</h1>\n{chapter_content}'
             )
-            book.add_item(nav_css)
-            
-            # Set CSS for chapters
-            for chapter in chapters:
-                chapter.add_item(nav_css)
             
-            # Create spine
-            book.spine = ['nav'] + chapters
+            chapters.append(chapter)
+            chapter_titles.append(chapter_title)
             
-            # Write EPUB file
-            epub.write_epub(epub_file_path, book)
+            # Reset for next chapter
+            current_chapter_text.clear()
+            current_chapter_pages.clear()
+        
+        page_range = parse_page_selection(options.get('page_selection', 'all'))
+        
+        for page_num, (cleaned_text, page_images) in map_pdf_pages(pdf_file_path, epub_page_task,
+                                                                   page_numbers=page_range, options=options,
+                                                                   library=get_text_library(options, 'pypdf2'),
+                                                                   workers=get_worker_count(options), session=session):
+            if cleaned_text is not None:
+                current_chapter_text.append(cleaned_text)
+                current_chapter_pages.append(page_num)
+                
+                # Add images to chapter if any
+                if page_images:
+                    for img in page_images:
+                        current_chapter_text.append(f'<img src="data:image/jpeg;base64,{img["data"]}" alt="{img["alt"]}" style="max-width: 100%; height: auto;" />')
             
-            print(f"EPUB conversion completed. Output saved to: {epub_file_path}")
-            return True
+            # Create new chapter based on page break style (the last
+            # chapter is finished after the loop)
+            should_create_chapter = False
+            if page_break_style == 'page':
+                should_create_chapter = True
+            elif page_break_style == 'chapter':
+                should_create_chapter = 0 < pages_per_chapter <= len(current_chapter_pages)
             
+            if should_create_chapter and current_chapter_text:
+                finish_chapter()
+        
+        if current_chapter_text:
+            finish_chapter()
+        
+        # Add chapters to book
+        for chapter in chapters:
+            book.add_item(chapter)
+        
+        # Create table of contents if enabled
+        if options.get('add_toc', True):
+            book.toc = [(epub.Section('Chapters'), chapters)]
+        
+        # Add default NCX and Nav files
+        book.add_item(epub.EpubNcx())
+        book.add_item(epub.EpubNav())
+        
+        # Define CSS style based on options
+        font_size_map = {'small': '12px', 'medium': '16px', 'large': '20px'}
+        line_spacing_map = {'tight': '1.2', 'normal': '1.5', 'loose': '1.8'}
+        
+        font_size = font_size_map.get(options.get('font_size', 'medium'), '16px')
+        line_spacing = line_spacing_map.get(options.get('line_spacing', 'normal'), '1.5')
+        
+        style = f'''
+        @namespace epub "http://www.idpf.org/2007/ops";
+        body {{ 
+            font-family: Arial, sans-serif; 
+            line-height: {line_spacing}; 
+            margin: 20px; 
+            font-size: {font_size};
+        }}
+        h1 {{ 
+            color: #333; 
+            border-bottom: 2px solid #333; 
+            padding-bottom: 10px; 
+            font-size: 1.5em;
+        }}
+        p {{ 
+            margin-bottom: 1em; 
+            text-align: justify; 
+        }}
+        img {{ 
+            max-width: 100%; 
+            height: auto; 
+            display: block; 
+            margin: 1em auto; 
+        }}
+        '''
+        
+        # Add CSS file
+        nav_css = epub.EpubItem(
+            uid="style_nav",
+            file_name="style/nav.css",
+            media_type="text/css",
+            content=style
+        )
+        book.add_item(nav_css)
+        
+        # Set CSS for chapters
+        for chapter in chapters:
+            chapter.add_item(nav_css)
+        
+        # Create spine
+        book.spine = ['nav'] + chapters
+        
+        # Write EPUB file
+        epub.write_epub(epub_file_path, book)
+        
+        print(f"EPUB conversion completed. Output saved to: {epub_file_path}")
+        return True
+        
     except Exception as e:
         print(f"Error in pdf_to_epub: {str(e)}")
         import traceback
@@ -1060,35 +2243,103 @@ def clean_text_for_epub(text, options=None):
         
         return '\n'.join(cleaned_paragraphs)
 
-def pdf_to_rtf(pdf_file_path, rtf_file_path, options=None):
+def rtf_page_task(page, page_num, options, state):
     """
-    Convert PDF to RTF format using pypdf2 and custom RTF generation
+    pdf_to_rtf's work for one page: its RTF parts, page break included
     """
-    try:
-        import PyPDF2
-        import re
-        import base64
-        import io
-        from PIL import Image
-        
-        print(f"Starting conversion of {pdf_file_path} to {rtf_file_path}")
-        
-        if options is None:
-            options = {}
-        
+    import io
+    from PIL import Image
+    
+    preserve_formatting = options.get('preserve_formatting', True)
+    include_images = options.get('include_images', False)
+    add_page_breaks = options.get('page_breaks', True)
+    # OCR and image extraction share one render per page
+    rasterizer = get_page_rasterizer(state, options, read_ahead=include_images)
+    
+    print(f"Processing page {page_num}/{state['total_pages']}")
+    
+    rtf_parts = []
+    
+    # Extract text from page
+    text = page_text(page, page_num, options, state)
+    
+    # If no text found and OCR is enabled, try OCR
+    if not text and options.get('ocr', False):
+        text = ocr_missing_page_text(rasterizer, page_num)
+    
+    # Process text
+    if text:
+        # Clean and format text
+        if preserve_formatting:
+            # Preserve more formatting
+            formatted_text = format_text_for_rtf_preserved(text)
+        else:
+            # Simple formatting
+            formatted_text = format_text_for_rtf_simple(text)
+        
+        rtf_parts.append(formatted_text)
+    
+    # Extract images if enabled
+    if include_images:
+        try:
+            image = rasterizer.render(page_num)
+            if image is not None:
+                # Resize image for RTF (RTF has size limitations)
+                max_width = 400
+                if image.width > max_width:
+                    ratio = max_width / image.width
+                    new_height = int(image.height * ratio)
+                    image = image.resize((max_width, new_height), Image.Resampling.LANCZOS)
+                
+                # Convert to JPEG for better RTF compatibility
+                img_buffer = io.BytesIO()
+                image.save(img_buffer, format='JPEG', quality=85)
+                img_data = img_buffer.getvalue()
+                
+                # Convert to hex for RTF (RTF uses hex encoding, not base64)
+                hex_data = img_data.hex()
+                
+                # Add image to RTF with proper format
+                rtf_parts.append('\\par')  # Add space before image
+                rtf_parts.append(f'{{\\*\\shppict{{\\pict\\jpegblip\\picwgoal{image.width * 15}\\pichgoal{image.height * 15}')
+                rtf_parts.append(hex_data)
+                rtf_parts.append('}}}')
+                rtf_parts.append('\\par')  # Add space after image
+                print(f"Page {page_num}: Image added to RTF (size: {image.width}x{image.height})")
+        except Exception as img_error:
+            print(f"Page {page_num}: Image extraction error: {str(img_error)}")
+            import traceback
+            traceback.print_exc()
+    
+    # Add page break if enabled and not the last page
+    if add_page_breaks and page_num < state['total_pages']:
+        rtf_parts.append('\\page')
+    
+    return rtf_parts
+
+def pdf_to_rtf(pdf_file_path, rtf_file_path, options=None, session=None):
+    """
+    Convert PDF to RTF format using pypdf2 and custom RTF generation
+    text_engine option: 'pypdf2' (default), 'pdfplumber' or 'pymupdf' (see TEXT_ENGINES);
+    text_mode option: 'plain' (default), 'blocks' or 'layout'
+    session: a DocumentSession to read pages from and share caches with
+    """
+    try:
+        print(f"Starting conversion of {pdf_file_path} to {rtf_file_path}")
+        
+        if options is None:
+            options = {}
+        
         # Parse page selection
         page_selection = options.get('page_selection', 'all')
         selected_pages = parse_page_selection(page_selection)
         
         # Get options
-        preserve_formatting = options.get('preserve_formatting', True)
-        include_images = options.get('include_images', False)
         font_size_map = {'small': '10', 'medium': '12', 'large': '14'}
         line_spacing_map = {'single': '1', 'normal': '1.15', 'double': '2'}
         
         font_size = font_size_map.get(options.get('font_size', 'medium'), '12')
         line_spacing = line_spacing_map.get(options.get('line_spacing', 'normal'), '1.15')
-        add_page_breaks = options.get('page_breaks', True)
         custom_title = options.get('custom_title', '')
         
         # RTF header
@@ -1106,95 +2357,10 @@ def pdf_to_rtf(pdf_file_path, rtf_file_path, options=None):
         rtf_content.append(f'\\f0\\fs{int(font_size) * 2}')
         rtf_content.append(f'\\sl{int(float(line_spacing) * 240)}')
         
-        with open(pdf_file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            total_pages = len(pdf_reader.pages)
-            
-            print(f"Processing {total_pages} pages")
-            
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                # Skip pages not in selection
-                if selected_pages and page_num not in selected_pages:
-                    continue
-                
-                print(f"Processing page {page_num}/{total_pages}")
-                
-                # Extract text from page
-                text = page.extract_text()
-                
-                # If no text found and OCR is enabled, try OCR
-                if not text and options.get('ocr', False):
-                    print(f"Page {page_num}: No text found, attempting OCR...")
-                    try:
-                        from pdf2image import convert_from_path
-                        import pytesseract
-                        
-                        # Convert PDF page to image for OCR
-                        images_pdf = convert_from_path(pdf_file_path, first_page=page_num, last_page=page_num)
-                        if images_pdf:
-                            image = images_pdf[0]
-                            ocr_text = pytesseract.image_to_string(image, lang='eng')
-                            if ocr_text.strip():
-                                text = ocr_text
-                                print(f"Page {page_num}: OCR successful")
-                            else:
-                                text = f"[OCR completed but no text found on page {page_num}]"
-                        else:
-                            text = f"[OCR failed - could not convert page {page_num} to image]"
-                    except Exception as ocr_error:
-                        print(f"Page {page_num}: OCR error: {str(ocr_error)}")
-                        text = f"[OCR error on page {page_num}]"
-                
-                # Process text
-                if text:
-                    # Clean and format text
-                    if preserve_formatting:
-                        # Preserve more formatting
-                        formatted_text = format_text_for_rtf_preserved(text)
-                    else:
-                        # Simple formatting
-                        formatted_text = format_text_for_rtf_simple(text)
-                    
-                    rtf_content.append(formatted_text)
-                
-                # Extract images if enabled
-                if include_images:
-                    try:
-                        from pdf2image import convert_from_path
-                        images_pdf = convert_from_path(pdf_file_path, first_page=page_num, last_page=page_num)
-                        if images_pdf:
-                            image = images_pdf[0]
-                            
-                            # Resize image for RTF (RTF has size limitations)
-                            max_width = 400
-                            if image.width > max_width:
-                                ratio = max_width / image.width
-                                new_height = int(image.height * ratio)
-                                image = image.resize((max_width, new_height), Image.Resampling.LANCZOS)
-                            
-                            # Convert to JPEG for better RTF compatibility
-                            img_buffer = io.BytesIO()
-                            image.save(img_buffer, format='JPEG', quality=85)
-                            img_data = img_buffer.getvalue()
-                            
-                            # Convert to hex for RTF (RTF uses hex encoding, not base64)
-                            hex_data = ''.join([f'{b:02x}' for b in img_data])
-                            
-                            # Add image to RTF with proper format
-                            rtf_content.append('\\par')  # Add space before image
-                            rtf_content.append(f'{{\\*\\shppict{{\\pict\\jpegblip\\picwgoal{image.width * 15}\\pichgoal{image.height * 15}')
-                            rtf_content.append(hex_data)
-                            rtf_content.append('}}}')
-                            rtf_content.append('\\par')  # Add space after image
-                            print(f"Page {page_num}: Image added to RTF (size: {image.width}x{image.height})")
-                    except Exception as img_error:
-                        print(f"Page {page_num}: Image extraction error: {str(img_error)}")
-                        import traceback
-                        traceback.print_exc()
-                
-                # Add page break if enabled and not the last page
-                if add_page_breaks and page_num < total_pages:
-                    rtf_content.append('\\page')
+        for _, page_parts in map_pdf_pages(pdf_file_path, rtf_page_task, page_numbers=selected_pages,
+                                           options=options, library=get_text_library(options, 'pypdf2'),
+                                           workers=get_worker_count(options), session=session):
+            rtf_content.extend(page_parts)
         
         # RTF footer
         rtf_content.append('}')
@@ -1269,14 +2435,102 @@ def format_text_for_rtf_preserved(text):
     
     return ''.join(formatted_lines)
 
+def get_page_size_points(pdf_page):
+    """
+    Displayed (width, height) of a PyPDF2 page in PDF points, honoring /Rotate
+    """
+    width = float(pdf_page.mediabox.width)
+    height = float(pdf_page.mediabox.height)
+    rotation = (pdf_page.get('/Rotate') or 0) % 360
+    if rotation in (90, 270):
+        width, height = height, width
+    return width, height
+
+def namespace_svg_ids(svg, prefix):
+    """
+    Prefix every id (and its #references) in an SVG fragment so several
+    page fragments can share one document without clashing
+    """
+    import re
+    
+    ids = set(re.findall(r'\bid="([^"]+)"', svg))
+    if not ids:
+        return svg
+    
+    def replace(match):
+        name = match.group(2)
+        return match.group(1) + (prefix + name if name in ids else name)
+    
+    return re.sub(r'(\bid="|#)([^"\)\s]+)', replace, svg)
+
+def size_svg_from_viewbox(svg):
+    """
+    Set the root <svg> element's width and height to its viewBox size in user
+    units; returns the SVG and that height
+    """
+    import re
+    
+    root = re.search(r'<svg\b[^>]*>', svg)
+    viewbox = re.search(r'viewBox="([^"]*)"', root.group(0))
+    _, _, box_width, box_height = (float(value) for value in viewbox.group(1).replace(',', ' ').split())
+    
+    tag = re.sub(r'\s(width|height)="[^"]*"', '', root.group(0))
+    tag = tag.replace('<svg', f'<svg width="{box_width:g}" height="{box_height:g}"', 1)
+    return svg[:root.start()] + tag + svg[root.end():], box_height
+
+def write_vector_svg_document(out, document, page_numbers, width, height, dpi, page_labels, text_as_path=True):
+    """
+    Stream an SVG document holding the real vector drawing of each page
+    Uses PyMuPDF's SVG export, so paths and text stay vectors and images
+    only appear where the PDF has images. Pages are scaled like the raster
+    mode: dpi/72, shrunk to fit the width/height box.
+    """
+    import re
+    import fitz
+    
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write('<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" version="1.1" width="100%" height="100%">\n')
+    
+    current_y = 0
+    
+    for i, page_num in enumerate(page_numbers):
+        print(f"Processing {page_labels[i]} (vector)")
+        page = document[page_num - 1]
+        
+        scale = dpi / 72
+        if page.rect.width > 0 and page.rect.height > 0:
+            scale = min(scale, width / page.rect.width, height / page.rect.height)
+        
+        page_svg = page.get_svg_image(matrix=fitz.Matrix(scale, scale), text_as_path=text_as_path)
+        # Drop the XML declaration so the page can be nested as an <svg> element
+        page_svg = re.sub(r'^\s*<\?xml[^>]*\?>\s*', '', page_svg)
+        # PyMuPDF sizes the page in pt; size it in user units from its viewBox
+        # instead, so it takes the same room as the offsets below count with
+        page_svg, page_height = size_svg_from_viewbox(page_svg)
+        label_id = page_labels[i].replace(" ", "_").lower()
+        
+        out.write(f'<g id="{label_id}" class="page" transform="translate(0, {current_y})">\n')
+        out.write(namespace_svg_ids(page_svg, f"{label_id}_"))
+        out.write('\n</g>\n')
+        
+        current_y += page_height + 20  # Add spacing between pages
+    
+    out.write('</svg>')
+
 def pdf_to_svg(pdf_file_path, svg_file_path, options=None):
     """
     Convert PDF to SVG using pdf2image
+    Only the selected pages are rendered, one at a time, at the DPI the
+    target width/height actually needs. svg_type 'vector' emits the pages'
+    real vector drawing through PyMuPDF instead of embedded PNGs.
     """
     try:
-        from pdf2image import convert_from_path
         import io
+        import math
+        import zipfile
+        from contextlib import contextmanager
         from PIL import Image
+        from PyPDF2 import PdfReader
         import os
         
         print(f"Starting conversion of {pdf_file_path} to {svg_file_path}")
@@ -1291,12 +2545,15 @@ def pdf_to_svg(pdf_file_path, svg_file_path, options=None):
         page_selection = options.get('page_selection', 'all')
         output_mode = options.get('output_mode', 'single')  # 'single', 'per_page', 'grouped'
         pages_per_svg = options.get('pages_per_svg', 1)  # For grouped mode
+        zip_output = options.get('zip_output', False) and output_mode in ('per_page', 'grouped')
+        svg_type = options.get('svg_type', 'raster')  # 'raster' or 'vector'
+        text_as_path = options.get('text_as_path', True)  # Vector mode: glyph outlines vs <text>
         
-        print(f"Conversion options: DPI={dpi}, Width={width}, Height={height}, Pages={page_selection}, Mode={output_mode}, PagesPerSVG={pages_per_svg}")
+        print(f"Conversion options: DPI={dpi}, Width={width}, Height={height}, Pages={page_selection}, Mode={output_mode}, PagesPerSVG={pages_per_svg}, Zip={zip_output}, Type={svg_type}")
         
-        # Convert PDF pages to images first to get total pages
-        pages = convert_from_path(pdf_file_path, dpi=dpi)
-        total_pages = len(pages)
+        # Read the page count and sizes without rendering anything
+        reader = PdfReader(pdf_file_path)
+        total_pages = len(reader.pages)
         print(f"Total pages in PDF: {total_pages}")
         
         # Validate page selection for SVG conversion only
@@ -1305,104 +2562,161 @@ def pdf_to_svg(pdf_file_path, svg_file_path, options=None):
             print(f"Page selection error: {error_message}")
             return False
         
-        # Filter pages if selection specified
         if selected_pages:
-            pages = [pages[i-1] for i in selected_pages if 1 <= i <= len(pages)]
             print(f"Selected pages: {selected_pages}")
+            page_numbers = list(selected_pages)
+        else:
+            page_numbers = list(range(1, total_pages + 1))
         
-        if not pages:
+        if not page_numbers:
             print("No pages to convert")
             return False
         
-        # Get base filename without extension
-        base_filename = os.path.splitext(os.path.basename(svg_file_path))[0]
-        output_dir = os.path.dirname(svg_file_path)
+        rasterizer = PageRasterizer(pdf_file_path, total_pages=total_pages, read_ahead=True,
+                                    **get_render_settings(options))
         
-        if output_mode == 'per_page':
-            # Create separate SVG file for each page
-            print(f"Creating {len(pages)} separate SVG files")
-            for i, page in enumerate(pages):
-                page_filename = f"{base_filename}_page_{i+1}.svg"
-                page_path = os.path.join(output_dir, page_filename)
-                
-                # Process single page
-                svg_content = create_svg_content([page], width, height, [f"Page {i+1}"])
-                
-                # Write SVG file
-                with open(page_path, 'w', encoding='utf-8') as f:
-                    f.write('\n'.join(svg_content))
-                
-                print(f"Created SVG file: {page_filename}")
-            
-            # Create a summary file that lists all created files
-            summary_path = os.path.join(output_dir, f"{base_filename}_summary.txt")
-            with open(summary_path, 'w', encoding='utf-8') as f:
-                f.write(f"PDF to SVG conversion summary\n")
-                f.write(f"Original PDF: {os.path.basename(pdf_file_path)}\n")
-                f.write(f"Total pages converted: {len(pages)}\n")
-                f.write(f"Output mode: Per-page SVG files\n\n")
-                f.write("Created files:\n")
-                for i in range(len(pages)):
-                    f.write(f"- {base_filename}_page_{i+1}.svg\n")
-            
-            print(f"Created summary file: {os.path.basename(summary_path)}")
-            return True
+        vector_document = None
+        archive = None
+        completed = False
+        # svg_file_path may also be a stream: a binary one (stdout) for ZIP
+        # output, a text one (StdoutTextStream) for a single SVG
+        streaming = hasattr(svg_file_path, 'write')
+        try:
+            def render_page(page_num):
+                # Pages larger than the target box are shrunk afterwards anyway,
+                # so render them at the resolution that just fills the box
+                page_width, page_height = get_page_size_points(reader.pages[page_num - 1])
+                render_dpi = dpi
+                if page_width > 0 and page_height > 0:
+                    fit_dpi = min(width * 72 / page_width, height * 72 / page_height)
+                    render_dpi = max(1, min(dpi, math.ceil(fit_dpi)))
+                return rasterizer.render(page_num, dpi=render_dpi)
             
-        elif output_mode == 'grouped':
-            # Group pages into multiple SVG files
-            total_groups = (len(pages) + pages_per_svg - 1) // pages_per_svg
-            print(f"Creating {total_groups} SVG files with {pages_per_svg} pages each")
+            if svg_type == 'vector':
+                import fitz
+                vector_document = fitz.open(pdf_file_path)
             
-            for group_idx in range(total_groups):
-                start_idx = group_idx * pages_per_svg
-                end_idx = min(start_idx + pages_per_svg, len(pages))
-                group_pages = pages[start_idx:end_idx]
-                
-                group_filename = f"{base_filename}_group_{group_idx + 1}.svg"
-                group_path = os.path.join(output_dir, group_filename)
+            def write_pages(f, numbers, page_labels):
+                if vector_document is not None:
+                    write_vector_svg_document(f, vector_document, numbers, width, height, dpi, page_labels, text_as_path)
+                else:
+                    write_svg_document(f, (render_page(n) for n in numbers), width, height, page_labels)
+            
+            if streaming:
+                base_filename = 'output'
+                zip_path = 'stdout'
+            else:
+                # Get base filename without extension
+                base_filename = os.path.splitext(os.path.basename(svg_file_path))[0]
+                output_dir = os.path.dirname(svg_file_path)
+                zip_path = os.path.join(output_dir, f"{base_filename}.zip")
+            
+            # per_page/grouped output can go straight into one ZIP instead of loose files
+            if zip_output:
+                zip_output_file = ZipStreamOutput(svg_file_path) if streaming else zip_path
+                archive = zipfile.ZipFile(zip_output_file, 'w', zipfile.ZIP_DEFLATED)
+            elif streaming and output_mode in ('per_page', 'grouped'):
+                raise ValueError("Several SVG files can only be streamed as a ZIP (zip_output)")
+            
+            @contextmanager
+            def open_output(filename):
+                if archive is not None:
+                    with archive.open(filename, 'w') as raw, io.TextIOWrapper(raw, encoding='utf-8') as f:
+                        yield f
+                else:
+                    with open(os.path.join(output_dir, filename), 'w', encoding='utf-8') as f:
+                        yield f
+            
+            if output_mode == 'per_page':
+                # Create separate SVG file for each page
+                print(f"Creating {len(page_numbers)} separate SVG files")
+                for i, page_num in enumerate(page_numbers):
+                    page_filename = f"{base_filename}_page_{i+1}.svg"
+                    
+                    # Stream single page into its SVG file
+                    with open_output(page_filename) as f:
+                        write_pages(f, [page_num], [f"Page {i+1}"])
+                    
+                    print(f"Created SVG file: {page_filename}")
                 
-                # Create page labels for this group
-                page_labels = [f"Page {start_idx + i + 1}" for i in range(len(group_pages))]
+                # Create a summary file that lists all created files
+                summary_filename = f"{base_filename}_summary.txt"
+                with open_output(summary_filename) as f:
+                    f.write(f"PDF to SVG conversion summary\n")
+                    f.write(f"Original PDF: {source_display_name(pdf_file_path, options)}\n")
+                    f.write(f"Total pages converted: {len(page_numbers)}\n")
+                    f.write(f"Output mode: Per-page SVG files\n\n")
+                    f.write("Created files:\n")
+                    for i in range(len(page_numbers)):
+                        f.write(f"- {base_filename}_page_{i+1}.svg\n")
                 
-                # Process group of pages
-                svg_content = create_svg_content(group_pages, width, height, page_labels)
+                print(f"Created summary file: {summary_filename}")
                 
-                # Write SVG file
-                with open(group_path, 'w', encoding='utf-8') as f:
-                    f.write('\n'.join(svg_content))
+            elif output_mode == 'grouped':
+                # Group pages into multiple SVG files
+                total_groups = (len(page_numbers) + pages_per_svg - 1) // pages_per_svg
+                print(f"Creating {total_groups} SVG files with {pages_per_svg} pages each")
                 
-                print(f"Created SVG file: {group_filename} (pages {start_idx + 1}-{end_idx})")
-            
-            # Create a summary file
-            summary_path = os.path.join(output_dir, f"{base_filename}_summary.txt")
-            with open(summary_path, 'w', encoding='utf-8') as f:
-                f.write(f"PDF to SVG conversion summary\n")
-                f.write(f"Original PDF: {os.path.basename(pdf_file_path)}\n")
-                f.write(f"Total pages: {len(pages)}\n")
-                f.write(f"Output mode: Grouped ({pages_per_svg} pages per SVG)\n")
-                f.write(f"Total SVG files created: {total_groups}\n\n")
-                f.write("Created files:\n")
                 for group_idx in range(total_groups):
                     start_idx = group_idx * pages_per_svg
-                    end_idx = min(start_idx + pages_per_svg, len(pages))
-                    f.write(f"- {base_filename}_group_{group_idx + 1}.svg (pages {start_idx + 1}-{end_idx})\n")
-            
-            print(f"Created summary file: {os.path.basename(summary_path)}")
-            return True
-            
-        else:
-            # Default: Single SVG file with all pages
-            print("Creating single SVG file with all pages")
-            page_labels = [f"Page {i+1}" for i in range(len(pages))]
-            svg_content = create_svg_content(pages, width, height, page_labels)
-            
-            # Write SVG file
-            with open(svg_file_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(svg_content))
+                    end_idx = min(start_idx + pages_per_svg, len(page_numbers))
+                    group_numbers = page_numbers[start_idx:end_idx]
+                    
+                    group_filename = f"{base_filename}_group_{group_idx + 1}.svg"
+                    
+                    # Create page labels for this group
+                    page_labels = [f"Page {start_idx + i + 1}" for i in range(len(group_numbers))]
+                    
+                    # Stream group of pages, rendering each only when it is written
+                    with open_output(group_filename) as f:
+                        write_pages(f, group_numbers, page_labels)
+                    
+                    print(f"Created SVG file: {group_filename} (pages {start_idx + 1}-{end_idx})")
+                
+                # Create a summary file
+                summary_filename = f"{base_filename}_summary.txt"
+                with open_output(summary_filename) as f:
+                    f.write(f"PDF to SVG conversion summary\n")
+                    f.write(f"Original PDF: {source_display_name(pdf_file_path, options)}\n")
+                    f.write(f"Total pages: {len(page_numbers)}\n")
+                    f.write(f"Output mode: Grouped ({pages_per_svg} pages per SVG)\n")
+                    f.write(f"Total SVG files created: {total_groups}\n\n")
+                    f.write("Created files:\n")
+                    for group_idx in range(total_groups):
+                        start_idx = group_idx * pages_per_svg
+                        end_idx = min(start_idx + pages_per_svg, len(page_numbers))
+                        f.write(f"- {base_filename}_group_{group_idx + 1}.svg (pages {start_idx + 1}-{end_idx})\n")
+                
+                print(f"Created summary file: {summary_filename}")
+                
+            else:
+                # Default: Single SVG file with all pages
+                print("Creating single SVG file with all pages")
+                page_labels = [f"Page {i+1}" for i in range(len(page_numbers))]
+                
+                # Stream SVG file, one page at a time
+                with open_text_output(svg_file_path) as f:
+                    write_pages(f, page_numbers, page_labels)
+                
+                print(f"Successfully converted {pdf_file_path} to {svg_file_path}")
+                print(f"SVG contains {len(page_numbers)} pages")
             
-            print(f"Successfully converted {pdf_file_path} to {svg_file_path}")
-            print(f"SVG contains {len(pages)} pages")
-            return True
+            if archive is not None:
+                archive.close()
+                print(f"Created ZIP file: {zip_path}")
+            completed = True
+        finally:
+            if archive is not None and not completed:
+                # Don't leave a half-written ZIP behind
+                if streaming:
+                    zip_output_file.abort()
+                archive.close()
+                if not streaming and os.path.exists(zip_path):
+                    os.remove(zip_path)
+            if vector_document is not None:
+                vector_document.close()
+            rasterizer.close()
+        return True
         
     except Exception as e:
         print(f"Error converting PDF to SVG: {str(e)}")
@@ -1415,59 +2729,42 @@ def validate_page_selection_for_svg(page_selection, total_pages):
     Validate page selection for SVG conversion only
     Returns: (pages_list, error_message) where error_message is None if valid
     """
-    if not page_selection or page_selection.lower() == 'all':
-        return None, None  # All pages
-    
-    pages = set()
-    parts = page_selection.split(',')
-    
-    for part in parts:
-        part = part.strip()
-        if '-' in part:
-            # Handle range like "3-5"
-            try:
-                start, end = map(int, part.split('-'))
-                if start < 1:
-                    return None, f"Invalid page range '{part}': page numbers must be 1 or greater"
-                if end > total_pages:
-                    return None, f"Invalid page range '{part}': page {end} exceeds total pages ({total_pages})"
-                if start > end:
-                    return None, f"Invalid page range '{part}': start page ({start}) is greater than end page ({end})"
-                pages.update(range(start, end + 1))
-            except ValueError:
-                return None, f"Invalid range format: '{part}'. Use format like '1-3'"
-        else:
-            # Handle single page
-            try:
-                page_num = int(part)
-                if page_num < 1:
-                    return None, f"Invalid page number '{part}': page numbers must be 1 or greater"
-                if page_num > total_pages:
-                    return None, f"Invalid page number '{part}': page {page_num} exceeds total pages ({total_pages})"
-                pages.add(page_num)
-            except ValueError:
-                return None, f"Invalid page number: '{part}'. Use numbers only"
+    try:
+        page_range = PageRange.parse(page_selection, total_pages, strict=True)
+    except ValueError as e:
+        return None, str(e)
+    return (list(page_range) if page_range else None), None
+
+def write_base64(out, data, chunk_size=3 * 64 * 1024):
+    """
+    Base64-encode bytes into a text stream in chunks, never holding the full encoded string
+    chunk_size must be a multiple of 3 so the chunks concatenate without padding
+    """
+    import base64
     
-    return sorted(list(pages)) if pages else None, None
+    view = memoryview(data)
+    for offset in range(0, len(view), chunk_size):
+        out.write(base64.b64encode(view[offset:offset + chunk_size]).decode('ascii'))
 
-def create_svg_content(pages, width, height, page_labels):
+def write_svg_document(out, pages, width, height, page_labels):
     """
-    Create SVG content from a list of pages
+    Stream an SVG document for an iterable of page images to a text file handle
+    Each page is resized, PNG-encoded and written as soon as it arrives, so
+    only one page's image and PNG bytes are in memory at a time
     """
     from PIL import Image
     import io
     
-    svg_content = []
-    svg_content.append('<?xml version="1.0" encoding="UTF-8"?>')
-    svg_content.append('<svg xmlns="http://www.w3.org/2000/svg" version="1.1" width="100%" height="100%">')
+    out.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+    out.write('<svg xmlns="http://www.w3.org/2000/svg" version="1.1" width="100%" height="100%">\n')
     
     # Add metadata
-    svg_content.append('<defs>')
-    svg_content.append('<style>')
-    svg_content.append('  .page { margin: 10px; }')
-    svg_content.append('  .page-image { max-width: 100%; height: auto; }')
-    svg_content.append('</style>')
-    svg_content.append('</defs>')
+    out.write('<defs>\n')
+    out.write('<style>\n')
+    out.write('  .page { margin: 10px; }\n')
+    out.write('  .page-image { max-width: 100%; height: auto; }\n')
+    out.write('</style>\n')
+    out.write('</defs>\n')
     
     current_y = 0
     
@@ -1482,23 +2779,21 @@ def create_svg_content(pages, width, height, page_labels):
             page = page.resize((new_width, new_height), Image.Resampling.LANCZOS)
             print(f"Resized {page_labels[i]} to {new_width}x{new_height}")
         
-        # Convert image to base64
         img_buffer = io.BytesIO()
         page.save(img_buffer, format='PNG')
-        img_data = img_buffer.getvalue()
-        import base64
-        base64_data = base64.b64encode(img_data).decode('utf-8')
         
         # Add page as SVG element
-        svg_content.append(f'<g id="{page_labels[i].replace(" ", "_").lower()}" class="page" transform="translate(0, {current_y})">')
-        svg_content.append(f'<image x="0" y="0" width="{page.width}" height="{page.height}" class="page-image"')
-        svg_content.append(f'href="data:image/png;base64,{base64_data}"/>')
-        svg_content.append('</g>')
+        out.write(f'<g id="{page_labels[i].replace(" ", "_").lower()}" class="page" transform="translate(0, {current_y})">\n')
+        out.write(f'<image x="0" y="0" width="{page.width}" height="{page.height}" class="page-image"\n')
+        out.write('href="data:image/png;base64,')
+        write_base64(out, img_buffer.getbuffer())
+        out.write('"/>\n')
+        out.write('</g>\n')
         
         current_y += page.height + 20  # Add spacing between pages
+        img_buffer = None
     
-    svg_content.append('</svg>')
-    return svg_content
+    out.write('</svg>')
 
 def merge_pdfs(output_path, input_paths):
     """
@@ -1550,7 +2845,8 @@ def merge_pdfs(output_path, input_paths):
 def split_pdf(input_path, output_zip_path, options=None):
     """
     Splits a PDF into multiple files based on specified ranges or settings.
-    The output is a ZIP file containing the split PDFs.
+    The output is a ZIP file containing the split PDFs; output_zip_path may
+    also be a writable binary stream (stdout).
     """
     try:
         import signal
@@ -1564,10 +2860,9 @@ def split_pdf(input_path, output_zip_path, options=None):
         signal.alarm(240)  # 4 minutes
         
         try:
+            import io
             import PyPDF2
             import zipfile
-            import tempfile
-            import re
 
             if options is None:
                 options = {}
@@ -1578,21 +2873,31 @@ def split_pdf(input_path, output_zip_path, options=None):
             pdf_reader = PyPDF2.PdfReader(input_path)
             total_pages = len(pdf_reader.pages)
             
-            # Create a temporary directory to store the split PDF files before zipping
-            with tempfile.TemporaryDirectory() as temp_dir:
-                split_file_paths = []
-
+            # The parts go straight into the ZIP (a path, or a binary stream
+            # such as stdout), which is opened with the first part
+            streaming = hasattr(output_zip_path, 'write')
+            zip_name = 'stdout' if streaming else output_zip_path
+            zip_output_file = ZipStreamOutput(output_zip_path) if streaming else output_zip_path
+            state = {'zipf': None, 'parts': 0}
+            
+            def add_part(filename, pdf_writer):
+                # PdfWriter seeks in its output, so each part is built in memory first
+                buffer = io.BytesIO()
+                pdf_writer.write(buffer)
+                if state['zipf'] is None:
+                    state['zipf'] = zipfile.ZipFile(zip_output_file, 'w')
+                state['zipf'].writestr(filename, buffer.getvalue())
+                state['parts'] += 1
+            
+            try:
                 if split_mode == 'all':
                     # Split every page into a separate file
                     for i in range(total_pages):
                         pdf_writer = PyPDF2.PdfWriter()
                         pdf_writer.add_page(pdf_reader.pages[i])
-                        output_filename = os.path.join(temp_dir, f'page_{i + 1}.pdf')
-                        with open(output_filename, 'wb') as out_f:
-                            pdf_writer.write(out_f)
-                        split_file_paths.append(output_filename)
+                        add_part(f'page_{i + 1}.pdf', pdf_writer)
                     print(f"Split PDF into {total_pages} separate pages.")
-
+                
                 elif split_mode == 'ranges':
                     # Split by custom page ranges
                     if not page_ranges_str:
@@ -1604,43 +2909,36 @@ def split_pdf(input_path, output_zip_path, options=None):
                         pdf_writer = PyPDF2.PdfWriter()
                         
                         # Parse individual pages and ranges (e.g., "1-3" or "5")
-                        pages_in_group = set()
-                        parts = re.split(r'[-–]', group) # Handles hyphen and en-dash
-                        if len(parts) == 1:
-                            page_num = int(parts[0])
-                            if 1 <= page_num <= total_pages:
-                                pages_in_group.add(page_num)
-                        elif len(parts) == 2:
-                            start, end = int(parts[0]), int(parts[1])
-                            for page_num in range(start, end + 1):
-                                if 1 <= page_num <= total_pages:
-                                    pages_in_group.add(page_num)
-
+                        start, end = PageRange.parse_part(group)
+                        pages_in_group = PageRange([(max(start, 1), end)]).clip(total_pages)
+                        
                         if not pages_in_group:
                             continue # Skip empty or invalid groups
-
+                        
                         # Add sorted pages to the writer
-                        for page_num in sorted(list(pages_in_group)):
+                        for page_num in pages_in_group:
                             pdf_writer.add_page(pdf_reader.pages[page_num - 1])
                         
-                        output_filename = os.path.join(temp_dir, f'split_group_{i + 1}.pdf')
-                        with open(output_filename, 'wb') as out_f:
-                            pdf_writer.write(out_f)
-                        split_file_paths.append(output_filename)
-                    print(f"Split PDF into {len(split_file_paths)} files based on ranges.")
-
+                        add_part(f'split_group_{i + 1}.pdf', pdf_writer)
+                    print(f"Split PDF into {state['parts']} files based on ranges.")
+                
                 else:
                     raise ValueError(f"Unsupported split mode: {split_mode}")
-
-                # Zip the created PDF files
-                if split_file_paths:
-                    with zipfile.ZipFile(output_zip_path, 'w') as zipf:
-                        for file_path in split_file_paths:
-                            zipf.write(file_path, os.path.basename(file_path))
-                    print(f"Created ZIP file with split PDFs at: {output_zip_path}")
-                else:
+                
+                if not state['parts']:
                     raise ValueError("No valid pages were selected for splitting.")
-
+                state['zipf'].close()
+                print(f"Created ZIP file with split PDFs at: {zip_name}")
+            except BaseException:
+                # Don't leave a half-written ZIP behind
+                if state['zipf'] is not None:
+                    if streaming:
+                        zip_output_file.abort()
+                    state['zipf'].close()
+                    if not streaming and os.path.exists(output_zip_path):
+                        os.remove(output_zip_path)
+                raise
+            
             return True
         finally:
             # Cancel the alarm
@@ -1836,16 +3134,13 @@ def validate_page_operations(page_operations, total_pages):
         except ValueError:
             errors.append("Invalid rotation format. Use 'page:angle' (e.g., 2:90,3:180)")
     
-    # Validate delete pages
+    # Validate delete pages (numbers or ranges, e.g. 4,5 or 4-6)
     delete_pages = page_operations.get('delete_pages', '')
     if delete_pages:
         try:
-            page_numbers = [int(x.strip()) for x in delete_pages.split(',')]
-            for page_num in page_numbers:
-                if page_num < 1 or page_num > total_pages:
-                    errors.append(f"Page {page_num} does not exist for deletion (PDF has {total_pages} pages)")
-        except ValueError:
-            errors.append("Invalid delete pages format. Use comma-separated numbers (e.g., 4,5)")
+            PageRange.parse(delete_pages, total_pages, strict=True)
+        except ValueError as e:
+            errors.append(f"Invalid delete pages: {str(e)}")
     
     return len(errors) == 0, errors
 
@@ -1855,7 +3150,7 @@ def reorder_pages_pdf(input_path, output_path, page_operations):
     page_operations format: {
         "page_order": "1,3,2,4",  # Optional: reorder pages
         "rotate_pages": "2:90,3:180",  # Optional: rotate specific pages
-        "delete_pages": "4,5"  # Optional: delete specific pages
+        "delete_pages": "4,5"  # Optional: delete specific pages or ranges ("4-6")
     }
     """
     try:
@@ -1864,8 +3159,9 @@ def reorder_pages_pdf(input_path, output_path, page_operations):
         print(f"Starting PDF page organization: {input_path} -> {output_path}")
         print(f"Page operations: {page_operations}")
         
-        # Get total pages first
-        total_pages = get_pdf_page_count(input_path)
+        # Read the original PDF once, for the page count and the pages
+        reader = PdfReader(input_path)
+        total_pages = len(reader.pages)
         if total_pages == 0:
             return False
         
@@ -1878,9 +3174,6 @@ def reorder_pages_pdf(input_path, output_path, page_operations):
             print(f"Validation errors: {error_message}")
             raise ValueError(error_message)
         
-        # Read the original PDF
-        reader = PdfReader(input_path)
-        
         # Parse page operations
         page_order = page_operations.get('page_order', '')
         rotate_pages = page_operations.get('rotate_pages', '')
@@ -1906,14 +3199,10 @@ def reorder_pages_pdf(input_path, output_path, page_operations):
             pages_to_include = list(range(total_pages))
         
         # Parse pages to delete
-        pages_to_delete = set()
+        pages_to_delete = PageRange()
         if delete_pages:
-            try:
-                delete_indices = [int(x.strip()) - 1 for x in delete_pages.split(',')]
-                pages_to_delete = set(delete_indices)
-                print(f"Deleting pages: {delete_pages}")
-            except ValueError:
-                print("Invalid delete pages format, skipping deletion")
+            pages_to_delete = PageRange.parse(delete_pages) or PageRange()
+            print(f"Deleting pages: {pages_to_delete}")
         
         # Parse pages to rotate
         rotate_map = {}
@@ -1932,7 +3221,7 @@ def reorder_pages_pdf(input_path, output_path, page_operations):
         # Process pages
         final_pages = []
         for page_index in pages_to_include:
-            if page_index in pages_to_delete:
+            if page_index + 1 in pages_to_delete:
                 print(f"Skipping deleted page {page_index + 1}")
                 continue
             
@@ -1979,143 +3268,752 @@ def reorder_pages_pdf(input_path, output_path, page_operations):
         traceback.print_exc()
         return False
 
-def ocr_pdf(input_path, output_path, options=None):
+def page_runs(page_numbers, max_length):
     """
-    Perform OCR on PDF to make scanned documents searchable and selectable
+    Split page numbers into runs of consecutive pages, each at most max_length long
     """
-    try:
-        import pytesseract
-        from pdf2image import convert_from_path
-        from PIL import Image, ImageEnhance
-        import fitz  # PyMuPDF
-        import json
-        import os
-        
-        # Set TESSDATA_PREFIX environment variable for Linux installation
-        # In Docker container, tesseract is installed in the default location
-        os.environ['TESSDATA_PREFIX'] = '/usr/share/tessdata'
-        
-        # Debug: Check if tesseract and language data are available
-        import subprocess
+    run = []
+    for page_num in page_numbers:
+        if run and (page_num != run[-1] + 1 or len(run) >= max_length):
+            yield run
+            run = []
+        run.append(page_num)
+    if run:
+        yield run
+
+def render_page_run(rasterizer, run, dpi):
+    """
+    Render a run of consecutive pages with one render call (one pdftoppm
+    launch with poppler); yields (page_num, image), None for a page that
+    did not render
+    """
+    images = rasterizer.render_range(run[0], run[-1], dpi)
+    for index, page_num in enumerate(run):
+        yield page_num, images[index] if index < len(images) else None
+        # Let go of each page as soon as it has been handed over
+        if index < len(images):
+            images[index] = None
+
+def iter_rendered_pages(pdf_path, page_numbers, dpi=200, lookahead=2, render_settings=None):
+    """
+    Yield (page_num, image) for each page
+    With the poppler backend and lookahead > 0 a background thread renders
+    runs of up to lookahead consecutive pages per pdftoppm launch ahead of
+    the consumer; the queue is bounded, so memory stays flat at about two
+    runs of pages. PyMuPDF is not safe to drive from two threads, so it
+    renders inline, one page at a time.
+    """
+    import queue
+    import threading
+    
+    render_settings = render_settings or {}
+    rasterizer = PageRasterizer(pdf_path, cache_size=1, max_batch=1, **render_settings)
+    
+    def render(page_num):
+        image = rasterizer.render(page_num, dpi=dpi)
+        # The consumer (or the queue) becomes the only holder of the image
+        rasterizer.clear()
+        return image
+    
+    if lookahead <= 0 or rasterizer.backend == 'pymupdf':
         try:
-            # Check tesseract version
-            result = subprocess.run(['tesseract', '--version'], capture_output=True, text=True, timeout=10)
-            print(f"Tesseract version: {result.stdout.split()[1] if result.stdout else 'Unknown'}")
-            
-            # Check if language data exists
-            if os.path.exists('/usr/share/tessdata/eng.traineddata'):
-                print("English language data found at /usr/share/tessdata/eng.traineddata")
-            else:
-                print("WARNING: English language data not found at /usr/share/tessdata/eng.traineddata")
-                # List what's in the tessdata directory
-                if os.path.exists('/usr/share/tessdata'):
-                    files = os.listdir('/usr/share/tessdata')
-                    print(f"Files in /usr/share/tessdata: {files}")
-                else:
-                    print("TESSDATA directory does not exist")
-                    
-        except Exception as e:
-            print(f"Error checking tesseract installation: {e}")
-        
-        print(f"Starting OCR processing of {input_path}")
-        
-        if options is None:
-            options = {}
-        
-        # Parse options if it's a JSON string
-        if isinstance(options, str):
+            for page_num in page_numbers:
+                yield page_num, render(page_num)
+        finally:
+            rasterizer.close()
+        return
+    
+    pages_queue = queue.Queue(maxsize=lookahead)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item):
+        while not stop.is_set():
             try:
-                options = json.loads(options)
-            except json.JSONDecodeError as e:
-                print(f"Error parsing options JSON: {e}")
-                options = {}
-        
-        # Get OCR options
-        language = options.get('language', 'eng')
-        confidence = options.get('confidence', 0.7)
-        preserve_layout = options.get('preserve_layout', True)
-        extract_images = options.get('extract_images', True)
-        
-        print(f"OCR settings: language={language}, confidence={confidence}, preserve_layout={preserve_layout}")
+                pages_queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def produce():
+        try:
+            for run in page_runs(page_numbers, lookahead):
+                for page_num, image in render_page_run(rasterizer, run, dpi):
+                    if not put((page_num, image, None)):
+                        return
+                    image = None
+        except Exception as e:
+            put((None, None, e))
+        finally:
+            put(done)
+    
+    producer = threading.Thread(target=produce, daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = pages_queue.get()
+            if item is done:
+                break
+            page_num, image, error = item
+            if error is not None:
+                raise error
+            yield page_num, image
+    finally:
+        stop.set()
+        # Unblock a producer waiting on a full queue, then let it finish
+        while not pages_queue.empty():
+            pages_queue.get_nowait()
+        producer.join()
+        rasterizer.close()
+
+class OcrCache:
+    """
+    On-disk OCR result cache keyed by a hash of the page pixels plus language,
+    DPI and tesseract config. Each entry holds the results computed for that
+    page ("text" from image_to_string, "data" word boxes from image_to_data).
+    Entry updates and the running size in .size happen under a lock file, so
+    several worker processes can share one cache directory; the directory is
+    private to its owner (mode 0700) since it holds the text of every page.
+    """
+    
+    def __init__(self, cache_dir, max_bytes):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        # Also fails (and disables the cache) on a directory someone else created
+        os.chmod(cache_dir, 0o700)
+        self._lock_path = os.path.join(cache_dir, '.lock')
+        self._size_path = os.path.join(cache_dir, '.size')
+    
+    def make_key(self, image, language, dpi, config):
+        import hashlib
         
-        # Convert PDF pages to images with higher DPI for better accuracy
-        print("Converting PDF pages to images...")
-        images = convert_from_path(input_path, dpi=350)  # Good balance of quality and speed
+        digest = hashlib.sha256()
+        digest.update(f"{image.mode}|{image.size}|{language}|{dpi}|{config}|".encode('utf-8'))
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+    
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+    
+    def _read(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    def _lock(self):
+        """
+        Open and exclusively lock the cache's lock file; closing it unlocks
+        """
+        import fcntl
         
-        # Create new PDF with OCR text
-        doc = fitz.open()
+        lock_file = os.fdopen(os.open(self._lock_path, os.O_RDWR | os.O_CREAT, 0o600), 'r+')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except Exception:
+            lock_file.close()
+            raise
+        return lock_file
+    
+    def _file_size(self, path):
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+    
+    def _read_total(self):
+        try:
+            with open(self._size_path) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            # First write (or a damaged size file): measure once
+            return sum(size for _, size, _ in self._scan()[0])
+    
+    def _write_total(self, total):
+        with open(self._size_path, 'w') as f:
+            f.write(str(max(0, total)))
+    
+    def _scan(self):
+        """
+        (mtime, size, path) of every entry, and the paths of temp files
+        """
+        entries = []
+        temp_paths = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith('.tmp'):
+                    temp_paths.append(path)
+                    continue
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries, temp_paths
+    
+    def get(self, key, kind):
+        entry = self._read(key)
+        if not entry or kind not in entry:
+            return None
+        try:
+            # Touch the entry so eviction sees it as recently used
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return entry[kind]
+    
+    def put(self, key, kind, value):
+        import tempfile
         
-        for page_num, image in enumerate(images):
-            print(f"Processing page {page_num + 1} with OCR...")
-            
-            # Simple image enhancement for better OCR accuracy
-            enhanced_image = enhance_image_simple(image)
-            
-            # Perform OCR with optimized configuration
-            ocr_config = f'--oem 3 --psm 6 -l {language}'
-            
-            # Check if language data exists and set tessdata directory accordingly
-            tessdata_dir = '/usr/share/tessdata'
-            if not os.path.exists(f'{tessdata_dir}/{language}.traineddata'):
-                print(f"Warning: {language}.traineddata not found in {tessdata_dir}")
-                # Try alternative locations
-                alternative_dirs = ['/usr/local/share/tessdata', '/opt/tesseract/share/tessdata']
-                for alt_dir in alternative_dirs:
-                    if os.path.exists(f'{alt_dir}/{language}.traineddata'):
-                        tessdata_dir = alt_dir
-                        print(f"Found language data in {alt_dir}")
-                        break
-                else:
-                    print("Warning: Language data not found in any standard location")
-                    # Try without specifying tessdata directory
-                    tessdata_dir = None
-            
-            if tessdata_dir:
-                ocr_config += f' --tessdata-dir {tessdata_dir}'
-            
-            print(f"Using OCR config: {ocr_config}")
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+        
+        # Merge under the lock so concurrent "text" and "data" puts for one
+        # page both end up in the entry
+        with self._lock():
+            entry = self._read(key) or {}
+            entry[kind] = value
+            old_size = self._file_size(path)
+            # Before writing: the first put measures the directory, this entry included
+            total = self._read_total()
             
-            # Get OCR data with positioning
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
             try:
-                ocr_data = pytesseract.image_to_data(enhanced_image, config=ocr_config, output_type=pytesseract.Output.DICT)
-            except Exception as ocr_error:
-                print(f"OCR error with config '{ocr_config}': {ocr_error}")
-                # Try with simpler config
-                print("Trying with simpler OCR config...")
-                ocr_data = pytesseract.image_to_data(enhanced_image, lang=language, output_type=pytesseract.Output.DICT)
-            
-            # Create new page with same dimensions as original
-            page = doc.new_page(width=image.width, height=image.height)
-            
-            if preserve_layout:
-                # Simple text positioning and filtering
-                for i, conf in enumerate(ocr_data['conf']):
-                    if conf > confidence * 100:  # Convert confidence to percentage
-                        x = ocr_data['left'][i]
-                        y = ocr_data['top'][i]
-                        w = ocr_data['width'][i]
-                        h = ocr_data['height'][i]
-                        word = ocr_data['text'][i].strip()
-                        
-                        if word and h > 5:  # Basic filtering
-                            # Calculate font size based on word height
-                            font_size = max(8, min(14, h * 0.7))
-                            page.insert_text((x, y + h), word, fontsize=font_size)
-            
-            # Add image if extract_images is enabled
-            if extract_images:
-                # Convert PIL image to fitz image using JPEG
-                import io
-                img_buffer = io.BytesIO()
-                image.save(img_buffer, format='JPEG', quality=95)
-                img_data = img_buffer.getvalue()
-                page.insert_image(fitz.Rect(0, 0, image.width, image.height), stream=img_data)
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(entry, f)
+                os.replace(temp_path, path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
             
-            print(f"Completed OCR for page {page_num + 1}")
-        
+            total += self._file_size(path) - old_size
+            if total > self.max_bytes:
+                total = self._evict_locked()
+            self._write_total(total)
+    
+    def evict(self):
+        """
+        Remove temp files left by puts that died, recount the size and drop
+        least recently used entries once the cache outgrows max_bytes
+        get_ocr_cache runs it when it opens the cache
+        """
+        with self._lock():
+            self._write_total(self._evict_locked())
+    
+    def _evict_locked(self):
+        entries, temp_paths = self._scan()
+        # Puts write their temp file under the lock, so any seen here is
+        # from a put that died before renaming it
+        for path in temp_paths:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+        
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return total
+        
+        # Trim to 90% so we don't evict again on the very next write
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+        return total
+
+# Lazily created process-wide cache, False once it turned out to be disabled
+_OCR_CACHE = None
+
+def get_ocr_cache():
+    """
+    The shared OCR cache, off unless enabled through the environment:
+    PDF_CONVERTER_OCR_CACHE_MB (default: 0, disabled; the size limit in MB)
+    PDF_CONVERTER_OCR_CACHE_DIR (default: <tmp>/pdf_converter_ocr_cache)
+    """
+    global _OCR_CACHE
+    
+    if _OCR_CACHE is None:
+        import tempfile
+        
+        _OCR_CACHE = False
+        try:
+            max_mb = float(os.environ.get('PDF_CONVERTER_OCR_CACHE_MB', 0))
+            cache_dir = os.environ.get('PDF_CONVERTER_OCR_CACHE_DIR') or \
+                os.path.join(tempfile.gettempdir(), 'pdf_converter_ocr_cache')
+            if max_mb > 0:
+                cache = OcrCache(cache_dir, int(max_mb * 1024 * 1024))
+                cache.evict()
+                _OCR_CACHE = cache
+        except Exception as e:
+            print(f"OCR cache disabled: {str(e)}")
+    
+    return _OCR_CACHE or None
+
+def cached_ocr(kind, image, language, dpi, config, run_ocr):
+    """
+    Return the cached OCR result for this page image, running run_ocr() on a miss
+    Cache failures never fail the OCR itself
+    """
+    cache = get_ocr_cache()
+    key = None
+    if cache is not None:
+        try:
+            key = cache.make_key(image, language, dpi, config)
+            result = cache.get(key, kind)
+            if result is not None:
+                print("OCR cache hit")
+                return result
+        except Exception as e:
+            print(f"OCR cache lookup failed: {str(e)}")
+            key = None
+    
+    result = run_ocr()
+    
+    if key is not None:
+        try:
+            cache.put(key, kind, result)
+        except Exception as e:
+            print(f"OCR cache write failed: {str(e)}")
+    
+    return result
+
+def ocr_image_text(image, language='eng', dpi=None):
+    """
+    Plain-text OCR of a page image (image_to_string), through the OCR cache
+    """
+    import pytesseract
+    
+    return cached_ocr('text', image, language, dpi, '',
+                      lambda: pytesseract.image_to_string(image, lang=language))
+
+def get_ocr_config(language):
+    """
+    Build the tesseract config for a language, locating its traineddata once
+    """
+    ocr_config = f'--oem 3 --psm 6 -l {language}'
+    
+    # Check if language data exists and set tessdata directory accordingly
+    tessdata_dir = '/usr/share/tessdata'
+    if not os.path.exists(f'{tessdata_dir}/{language}.traineddata'):
+        print(f"Warning: {language}.traineddata not found in {tessdata_dir}")
+        # Try alternative locations
+        alternative_dirs = ['/usr/local/share/tessdata', '/opt/tesseract/share/tessdata']
+        for alt_dir in alternative_dirs:
+            if os.path.exists(f'{alt_dir}/{language}.traineddata'):
+                tessdata_dir = alt_dir
+                print(f"Found language data in {alt_dir}")
+                break
+        else:
+            print("Warning: Language data not found in any standard location")
+            # Try without specifying tessdata directory
+            tessdata_dir = None
+    
+    if tessdata_dir:
+        ocr_config += f' --tessdata-dir {tessdata_dir}'
+    
+    return ocr_config
+
+def ocr_image_data(image, language, ocr_config, dpi=None):
+    """
+    Run tesseract on an image and return the word boxes (image_to_data dict),
+    through the OCR cache
+    """
+    import pytesseract
+    
+    def run_ocr():
+        try:
+            return pytesseract.image_to_data(image, config=ocr_config, output_type=pytesseract.Output.DICT)
+        except Exception as ocr_error:
+            print(f"OCR error with config '{ocr_config}': {ocr_error}")
+            # Try with simpler config
+            print("Trying with simpler OCR config...")
+            return pytesseract.image_to_data(image, lang=language, output_type=pytesseract.Output.DICT)
+    
+    return cached_ocr('data', image, language, dpi, ocr_config, run_ocr)
+
+def encode_page_jpeg(image, quality=95):
+    """
+    JPEG-encode a rendered page for embedding in the OCR output
+    """
+    import io
+    
+    img_buffer = io.BytesIO()
+    image.save(img_buffer, format='JPEG', quality=quality)
+    return img_buffer.getvalue()
+
+def page_needs_ocr(page, min_text_chars=20, min_image_coverage=0.1):
+    """
+    Probe a fitz page: True when it has no usable text layer but is mostly image
+    Born-digital pages (text) and blank/vector-only pages (no images) don't need OCR
+    """
+    import fitz
+    
+    if len(page.get_text('text').strip()) >= min_text_chars:
+        return False
+    
+    page_area = abs(page.rect)
+    if not page_area:
+        return False
+    
+    covered = 0
+    for info in page.get_image_info():
+        bbox = fitz.Rect(info['bbox']) & page.rect
+        if not bbox.is_empty:
+            covered += abs(bbox)
+    
+    return covered / page_area >= min_image_coverage
+
+def add_ocr_page(doc, image_size, ocr_data, image_stream=None, confidence=0.7, preserve_layout=True, page_size=None):
+    """
+    Append a page built from a rendered page's size, its OCR word boxes and
+    (optionally) its JPEG bytes to a fitz document
+    page_size (points) scales the page to the original page's size instead of
+    one point per rendered pixel
+    """
+    import fitz
+    
+    image_width, image_height = image_size
+    width, height = page_size or image_size
+    scale_x = width / image_width
+    scale_y = height / image_height
+    
+    # Create new page with same dimensions as original
+    page = doc.new_page(width=width, height=height)
+    
+    if preserve_layout:
+        # Simple text positioning and filtering
+        for i, conf in enumerate(ocr_data['conf']):
+            if float(conf) > confidence * 100:  # Convert confidence to percentage
+                x = ocr_data['left'][i]
+                y = ocr_data['top'][i]
+                w = ocr_data['width'][i]
+                h = ocr_data['height'][i]
+                word = ocr_data['text'][i].strip()
+                
+                if word and h > 5:  # Basic filtering
+                    # Calculate font size based on word height
+                    font_size = max(8, min(14, h * 0.7)) * scale_y
+                    page.insert_text((x * scale_x, (y + h) * scale_y), word, fontsize=font_size)
+    
+    # Add image if extract_images is enabled
+    if image_stream is not None:
+        page.insert_image(fitz.Rect(0, 0, width, height), stream=image_stream)
+    
+    return page
+
+def add_ocr_text_layer(page, image_size, ocr_data, confidence=0.7, font=None):
+    """
+    Overlay invisible OCR text (render mode 3) on an existing fitz page
+    Word boxes are scaled from rendered pixels to PDF points and all words
+    are written with a single TextWriter call instead of one call per word
+    """
+    import fitz
+    
+    if font is None:
+        font = fitz.Font('helv')
+    
+    image_width, image_height = image_size
+    # Renders show the page as displayed, i.e. with its rotation applied
+    scale_x = page.rect.width / image_width
+    scale_y = page.rect.height / image_height
+    
+    writer = fitz.TextWriter(page.rect)
+    words = 0
+    for i, conf in enumerate(ocr_data['conf']):
+        if float(conf) <= confidence * 100:
+            continue
+        word = ocr_data['text'][i].strip()
+        if not word:
+            continue
+        
+        x = ocr_data['left'][i] * scale_x
+        y = ocr_data['top'][i] * scale_y
+        w = ocr_data['width'][i] * scale_x
+        h = ocr_data['height'][i] * scale_y
+        
+        # Size the word so its selection box matches the word on the image
+        unit_length = font.text_length(word, fontsize=1)
+        font_size = min(h, w / unit_length) if unit_length > 0 else h
+        if font_size <= 0:
+            continue
+        
+        writer.append((x, y + h), word, font=font, fontsize=font_size)
+        words += 1
+    
+    if words:
+        # Words were placed in displayed coordinates; map them back onto the unrotated page
+        morph = (fitz.Point(0, 0), page.derotation_matrix) if page.rotation else None
+        writer.write_text(page, render_mode=3, morph=morph)
+    
+    return words
+
+def ocr_rendered_page(image, language, ocr_config, extract_images=True, dpi=None):
+    """
+    Enhance and OCR one rendered page
+    Returns (image_size, ocr_data, jpeg_bytes_or_None)
+    """
+    # Simple image enhancement for better OCR accuracy
+    enhanced_image = enhance_image_simple(image)
+    
+    # Get OCR data with positioning
+    ocr_data = ocr_image_data(enhanced_image, language, ocr_config, dpi)
+    
+    image_stream = encode_page_jpeg(image) if extract_images else None
+    return image.size, ocr_data, image_stream
+
+def iter_ocr_pages(input_path, page_numbers, dpi, language, ocr_config, extract_images=True,
+                   lookahead=2, render_settings=None):
+    """
+    Yield (page_num, image_size, ocr_data, jpeg_bytes) in page order, one page at a time
+    """
+    pages = iter_rendered_pages(input_path, page_numbers, dpi=dpi, lookahead=lookahead,
+                                render_settings=render_settings)
+    for page_num, image in pages:
+        print(f"Processing page {page_num} with OCR...")
+        if image is None:
+            raise RuntimeError(f"Could not render page {page_num}")
+        yield (page_num,) + ocr_rendered_page(image, language, ocr_config, extract_images, dpi)
+
+# Per-process state of an OCR pool worker, set up by init_ocr_worker
+OCR_WORKER_STATE = {}
+
+def init_ocr_worker(pdf_path, render_settings):
+    """
+    Pool initializer: one tesseract thread per worker and one open document per worker
+    """
+    # Tesseract's OpenMP threads would oversubscribe the cores the pool already uses
+    os.environ['OMP_THREAD_LIMIT'] = '1'
+    # Runs of pages go through render_range, which bypasses the cache
+    OCR_WORKER_STATE['rasterizer'] = PageRasterizer(pdf_path, cache_size=1, max_batch=1,
+                                                    **(render_settings or {}))
+
+def ocr_page_worker(run, dpi, language, ocr_config, extract_images):
+    """
+    Render (in one go), enhance and OCR a run of consecutive pages inside a pool worker
+    The pages travel back as JPEG bytes rather than pickled PIL images
+    """
+    results = []
+    for page_num, image in render_page_run(OCR_WORKER_STATE['rasterizer'], run, dpi):
+        if image is None:
+            raise RuntimeError(f"Could not render page {page_num}")
+        results.append((page_num,) + ocr_rendered_page(image, language, ocr_config, extract_images, dpi))
+        image = None
+    return results
+
+def iter_ocr_pages_parallel(input_path, page_numbers, dpi, language, ocr_config, extract_images=True,
+                            workers=2, lookahead=2, render_settings=None):
+    """
+    Fan pages out to a process pool and yield results in page order
+    Each task is a run of up to lookahead consecutive pages, rendered with one
+    pdftoppm launch; at most workers + 1 runs are in flight, so memory stays bounded
+    """
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor
+    
+    run_iter = page_runs(page_numbers, max(lookahead, 1))
+    pending = deque()
+    
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_ocr_worker,
+                             initargs=(input_path, render_settings)) as executor:
+        def submit_next():
+            for run in run_iter:
+                pending.append(executor.submit(ocr_page_worker, run, dpi, language,
+                                               ocr_config, extract_images))
+                return
+        
+        for _ in range(workers + 1):
+            submit_next()
+        
+        try:
+            while pending:
+                results = pending.popleft().result()
+                submit_next()
+                for result in results:
+                    print(f"Processing page {result[0]} with OCR...")
+                    yield result
+        finally:
+            for future in pending:
+                future.cancel()
+
+def ocr_pdf(input_path, output_path, options=None):
+    """
+    Perform OCR on PDF to make scanned documents searchable and selectable
+    Pages stream through render -> enhance -> OCR -> append one at a time and
+    the output is flushed to disk in batches, so peak memory does not grow
+    with the page count
+    page_selection option: only these pages are OCR'd and written to the output
+    """
+    try:
+        import pytesseract
+        from PIL import Image, ImageEnhance
+        import fitz  # PyMuPDF
+        import json
+        import os
+        
+        # Set TESSDATA_PREFIX environment variable for Linux installation
+        # In Docker container, tesseract is installed in the default location
+        os.environ['TESSDATA_PREFIX'] = '/usr/share/tessdata'
+        
+        # Debug: Check if tesseract and language data are available
+        import subprocess
+        try:
+            # Check tesseract version
+            result = subprocess.run(['tesseract', '--version'], capture_output=True, text=True, timeout=10)
+            print(f"Tesseract version: {result.stdout.split()[1] if result.stdout else 'Unknown'}")
+            
+            # Check if language data exists
+            if os.path.exists('/usr/share/tessdata/eng.traineddata'):
+                print("English language data found at /usr/share/tessdata/eng.traineddata")
+            else:
+                print("WARNING: English language data not found at /usr/share/tessdata/eng.traineddata")
+                # List what's in the tessdata directory
+                if os.path.exists('/usr/share/tessdata'):
+                    files = os.listdir('/usr/share/tessdata')
+                    print(f"Files in /usr/share/tessdata: {files}")
+                else:
+                    print("TESSDATA directory does not exist")
+                    
+        except Exception as e:
+            print(f"Error checking tesseract installation: {e}")
+        
+        print(f"Starting OCR processing of {input_path}")
+        
+        if options is None:
+            options = {}
+        
+        # Parse options if it's a JSON string
+        if isinstance(options, str):
+            try:
+                options = json.loads(options)
+            except json.JSONDecodeError as e:
+                print(f"Error parsing options JSON: {e}")
+                options = {}
+        
+        # Get OCR options
+        language = options.get('language', 'eng')
+        confidence = options.get('confidence', 0.7)
+        preserve_layout = options.get('preserve_layout', True)
+        extract_images = options.get('extract_images', True)
+        dpi = options.get('dpi', 350)  # Good balance of quality and speed
+        lookahead = options.get('lookahead', 2)  # Pages rendered ahead of OCR
+        flush_every = options.get('flush_every', 16)  # Pages kept in memory before saving
+        workers = get_worker_count(options)  # OCR processes, 'auto' for one per core
+        # Hybrid mode: only OCR image-only pages, copy pages with a text layer unchanged
+        skip_text_pages = options.get('skip_text_pages', options.get('hybrid', False))
+        min_text_chars = options.get('min_text_chars', 20)
+        on_page_done = options.get('on_page_done')  # Called as each OCR'd page is done
+        # 'rebuild' makes new pages from the renders, 'sandwich' overlays
+        # invisible text on the original pages
+        output_type = options.get('output_type', 'rebuild')
+        sandwich = output_type == 'sandwich'
+        if sandwich:
+            # The original page content stays, no need to ship page images around
+            extract_images = False
+        
+        print(f"OCR settings: language={language}, confidence={confidence}, preserve_layout={preserve_layout}")
+        
+        total_pages = get_pdf_page_count(input_path)
+        if total_pages == 0:
+            print("Error: Could not read any pages from the input PDF")
+            return False
+        
+        ocr_config = get_ocr_config(language)
+        print(f"Using OCR config: {ocr_config}")
+        
+        # Create new PDF with OCR text
+        doc = fitz.open()
+        saved_pages = 0
+        
+        page_range = parse_page_selection(options.get('page_selection', 'all'))
+        page_numbers = list(page_range.clip(total_pages)) if page_range else list(range(1, total_pages + 1))
+        if not page_numbers:
+            print("Error: None of the selected pages exist in the input PDF")
+            return False
+        ocr_page_numbers = page_numbers
+        source = fitz.open(input_path) if sandwich else None
+        page_sizes = {}
+        if skip_text_pages:
+            # Probe each page's text layer and image coverage before rendering anything
+            source = source or fitz.open(input_path)
+            ocr_page_numbers = []
+            for page_num in page_numbers:
+                source_page = source[page_num - 1]
+                if page_needs_ocr(source_page, min_text_chars):
+                    ocr_page_numbers.append(page_num)
+                    page_sizes[page_num] = (source_page.rect.width, source_page.rect.height)
+            print(f"Hybrid mode: {len(ocr_page_numbers)} of {len(page_numbers)} pages need OCR")
+        
+        render_settings = get_render_settings(options)
+        workers = max(1, min(workers, len(ocr_page_numbers)))
+        print(f"Streaming {len(ocr_page_numbers)} pages through OCR (workers={workers}, lookahead={lookahead})...")
+        
+        if workers > 1:
+            ocr_pages = iter_ocr_pages_parallel(input_path, ocr_page_numbers, dpi, language, ocr_config,
+                                                extract_images, workers, lookahead, render_settings)
+        else:
+            ocr_pages = iter_ocr_pages(input_path, ocr_page_numbers, dpi, language, ocr_config,
+                                       extract_images, lookahead, render_settings)
+        
+        ocr_set = set(ocr_page_numbers)
+        
+        if sandwich:
+            # Add the text layer to the source document and save it as the output
+            for page_num in page_numbers:
+                if page_num in ocr_set:
+                    _, image_size, ocr_data, _ = next(ocr_pages)
+                    words = add_ocr_text_layer(source[page_num - 1], image_size, ocr_data, confidence)
+                    print(f"Completed OCR for page {page_num} ({words} words)")
+                    if on_page_done is not None:
+                        on_page_done(page_num)
+            
+            if len(page_numbers) < total_pages:
+                # Only the selected pages go to the output
+                source.select([page_num - 1 for page_num in page_numbers])
+            source.save(output_path, garbage=1, deflate=True)
+            source.close()
+            doc.close()
+            
+            print(f"Successfully created OCR-processed PDF: {output_path}")
+            return True
+        
+        for page_num in page_numbers:
+            if page_num not in ocr_set:
+                # Keep the original page, vectors and text layer included
+                doc.insert_pdf(source, from_page=page_num - 1, to_page=page_num - 1)
+                print(f"Page {page_num}: has a text layer, copied without OCR")
+            else:
+                # Results arrive in page order, so pages are appended as they come
+                _, image_size, ocr_data, image_stream = next(ocr_pages)
+                # Hybrid output keeps OCR'd pages at the original page size so they match the copies
+                add_ocr_page(doc, image_size, ocr_data, image_stream, confidence, preserve_layout,
+                             page_size=page_sizes.get(page_num))
+                image_stream = None
+                
+                print(f"Completed OCR for page {page_num}")
+                if on_page_done is not None:
+                    on_page_done(page_num)
+            
+            # Flush finished pages to disk so the document doesn't grow in memory
+            if flush_every and doc.page_count >= flush_every and page_num != page_numbers[-1]:
+                saved_pages = flush_ocr_document(doc, output_path, saved_pages)
+                doc = fitz.open()
+        
         # Save the OCR-processed PDF
-        doc.save(output_path)
-        doc.close()
+        flush_ocr_document(doc, output_path, saved_pages)
+        if source is not None:
+            source.close()
         
         print(f"Successfully created OCR-processed PDF: {output_path}")
         return True
@@ -2126,11 +4024,34 @@ def ocr_pdf(input_path, output_path, options=None):
         traceback.print_exc()
         return False
 
+def flush_ocr_document(doc, output_path, saved_pages):
+    """
+    Write the pages of an in-memory fitz document to output_path and close it
+    The first flush creates the file; later ones append incrementally, so
+    only the pages since the last flush are ever held in memory
+    Returns the number of pages now on disk
+    """
+    import fitz
+    
+    if saved_pages == 0:
+        doc.save(output_path, garbage=1, deflate=True)
+        saved_pages = doc.page_count
+    elif doc.page_count:
+        with fitz.open(output_path) as target:
+            target.insert_pdf(doc)
+            target.saveIncr()
+            saved_pages = target.page_count
+    
+    doc.close()
+    return saved_pages
+
 def enhance_image_simple(image):
     """
     Simple image enhancement using only PIL for better OCR accuracy
     """
     try:
+        from PIL import ImageEnhance
+        
         # Convert to grayscale if not already
         if image.mode != 'L':
             image = image.convert('L')
@@ -2149,12 +4070,1075 @@ def enhance_image_simple(image):
         print(f"Error in image enhancement: {e}")
         return image
 
+def get_peak_rss_mb(who=None):
+    """
+    Peak resident set size in MB of this process, or of its waited-for children
+    """
+    import resource
+    
+    if who is None:
+        who = resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is KB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def benchmark_render_worker(pdf_path, backend, dpi, page_count, result_queue):
+    """
+    Render page_count pages through PageRasterizer in a fresh process and report timings
+    """
+    import resource
+    import time
+    
+    rasterizer = PageRasterizer(pdf_path, total_pages=page_count, backend=backend, read_ahead=True)
+    try:
+        started = time.time()
+        for page_num in range(1, page_count + 1):
+            rasterizer.render(page_num, dpi=dpi)
+        elapsed = time.time() - started
+    finally:
+        rasterizer.close()
+    
+    result_queue.put({
+        'backend': backend,
+        'pages': page_count,
+        'dpi': dpi,
+        'seconds': round(elapsed, 3),
+        'pages_per_sec': round(page_count / elapsed, 2) if elapsed > 0 else None,
+        'peak_rss_mb': round(get_peak_rss_mb(), 1),
+        # pdftoppm runs as subprocesses, its memory is not part of our own RSS
+        'peak_child_rss_mb': round(get_peak_rss_mb(resource.RUSAGE_CHILDREN), 1),
+    })
+
+def wait_for_worker_result(process, result_queue, poll_interval=1.0):
+    """
+    The result a worker process puts on result_queue; raises RuntimeError as
+    soon as the process has exited without one (crashed, killed, out of memory)
+    """
+    import queue
+    
+    while True:
+        try:
+            return result_queue.get(timeout=poll_interval)
+        except queue.Empty:
+            if process.is_alive():
+                continue
+        # The process is gone; a result it put just before exiting may still be in flight
+        try:
+            return result_queue.get(timeout=poll_interval)
+        except queue.Empty:
+            raise RuntimeError(f"worker exited with code {process.exitcode} before reporting")
+
+def benchmark_render_backends(pdf_path, dpi=200, max_pages=None):
+    """
+    Compare the poppler and pymupdf render backends on pages/sec and peak RSS
+    Each backend runs in its own freshly spawned process so memory numbers don't mix
+    """
+    import multiprocessing
+    
+    total_pages = get_pdf_page_count(pdf_path)
+    if total_pages == 0:
+        return []
+    page_count = min(total_pages, max_pages) if max_pages else total_pages
+    
+    context = multiprocessing.get_context('spawn')
+    results = []
+    for backend in RENDER_BACKENDS:
+        print(f"Benchmarking {backend} on {page_count} pages at {dpi} DPI...")
+        result_queue = context.Queue()
+        process = context.Process(target=benchmark_render_worker,
+                                  args=(pdf_path, backend, dpi, page_count, result_queue))
+        process.start()
+        try:
+            results.append(wait_for_worker_result(process, result_queue))
+        except Exception as e:
+            print(f"Benchmark for {backend} failed: {str(e)}")
+        finally:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+            result_queue.close()
+    
+    print(json.dumps(results, indent=2))
+    return results
+
+def table_cell_agreement(tables_a, tables_b):
+    """
+    Fraction of cells on which two table extractions agree
+    Tables are paired by (page, table_index) and cells by position; a cell
+    present in only one of the extractions counts as a disagreement
+    """
+    def cells(tables):
+        found = {}
+        for table in tables:
+            for row_idx, row in enumerate(table['data']):
+                for col_idx, value in enumerate(row):
+                    found[(table['page'], table['table_index'], row_idx, col_idx)] = value
+        return found
+    
+    cells_a = cells(tables_a)
+    cells_b = cells(tables_b)
+    positions = cells_a.keys() | cells_b.keys()
+    if not positions:
+        return 1.0
+    agreed = sum(1 for position in positions if cells_a.get(position) == cells_b.get(position))
+    return agreed / len(positions)
+
+def expand_pdf_corpus(pdf_paths):
+    """
+    Benchmark corpus: the given PDF files plus the PDFs inside given directories
+    """
+    corpus = []
+    for path in pdf_paths:
+        if os.path.isdir(path):
+            corpus.extend(sorted(os.path.join(path, name) for name in os.listdir(path)
+                                 if name.lower().endswith('.pdf')))
+        else:
+            corpus.append(path)
+    return corpus
+
+def benchmark_table_engines(pdf_paths, max_pages=None):
+    """
+    Compare the pdfplumber and pymupdf table engines on speed and cell-level agreement
+    pdf_paths may mix PDF files and directories of PDFs (the corpus)
+    """
+    import contextlib
+    import io
+    import time
+    
+    corpus = expand_pdf_corpus(pdf_paths)
+    selected_pages = list(range(1, max_pages + 1)) if max_pages else None
+    results = []
+    for pdf_path in corpus:
+        print(f"Benchmarking table engines on {pdf_path}...")
+        result = {'file': pdf_path}
+        extracted = {}
+        for engine in ('pdfplumber', 'pymupdf'):
+            started = time.time()
+            try:
+                # Keep the per-page extraction logs out of the report
+                with contextlib.redirect_stdout(io.StringIO()):
+                    tables, _ = extract_pdf_tables(pdf_path, selected_pages, engine)
+            except Exception as e:
+                print(f"Benchmark for {engine} failed: {str(e)}")
+                continue
+            result[f'{engine}_seconds'] = round(time.time() - started, 3)
+            result[f'{engine}_tables'] = len(tables)
+            extracted[engine] = tables
+        
+        if len(extracted) == 2:
+            result['cell_agreement'] = round(table_cell_agreement(extracted['pdfplumber'], extracted['pymupdf']), 4)
+        results.append(result)
+    
+    compared = [result for result in results if 'cell_agreement' in result]
+    summary = {
+        'files': len(results),
+        'pdfplumber_seconds': round(sum(result['pdfplumber_seconds'] for result in compared), 3),
+        'pymupdf_seconds': round(sum(result['pymupdf_seconds'] for result in compared), 3),
+        'mean_cell_agreement': (round(sum(result['cell_agreement'] for result in compared) / len(compared), 4)
+                                if compared else None),
+    }
+    
+    print(json.dumps({'results': results, 'summary': summary}, indent=2))
+    return results
+
+def benchmark_text_engines(pdf_paths, max_pages=None, text_mode='plain'):
+    """
+    Compare the text engines on pages/sec over a corpus of PDF files or directories
+    """
+    import time
+    
+    totals = {engine: {'pages': 0, 'seconds': 0.0} for engine in TEXT_ENGINES}
+    results = []
+    for pdf_path in expand_pdf_corpus(pdf_paths):
+        print(f"Benchmarking text engines on {pdf_path}...")
+        result = {'file': pdf_path}
+        for engine, library in TEXT_ENGINES.items():
+            try:
+                started = time.time()
+                with PdfPageSource(pdf_path, library) as source:
+                    page_count = min(source.page_count, max_pages) if max_pages else source.page_count
+                    for page_num in range(1, page_count + 1):
+                        page = source.page(page_num)
+                        extract_page_text(page, library, text_mode)
+                        source.release(page)
+                elapsed = time.time() - started
+            except Exception as e:
+                print(f"Benchmark for {engine} failed: {str(e)}")
+                continue
+            result[f'{engine}_pages_per_sec'] = round(page_count / elapsed, 2) if elapsed > 0 else None
+            totals[engine]['pages'] += page_count
+            totals[engine]['seconds'] += elapsed
+        results.append(result)
+    
+    summary = {
+        engine: round(total['pages'] / total['seconds'], 2) if total['seconds'] > 0 else None
+        for engine, total in totals.items()
+    }
+    
+    print(json.dumps({'text_mode': text_mode, 'results': results, 'pages_per_sec': summary}, indent=2))
+    return results
+
+# Modules that dominate interpreter startup for a conversion; serve mode
+# imports them once so every job after the first skips this cost.
+HEAVY_MODULES = [
+    'pdfplumber',
+    'pdfminer.high_level',
+    'fitz',
+    'PIL.Image',
+    'PIL.ImageEnhance',
+    'pdf2image',
+    'pytesseract',
+    'openpyxl',
+    'pandas',
+    'pdf2docx',
+    'PyPDF2',
+    'pptx',
+    'ebooklib.epub',
+]
+
+def preload_modules():
+    """
+    Import the heavy conversion libraries up front
+    Missing optional libraries are skipped, the job that needs them reports the error
+    """
+    import importlib
+    
+    loaded = []
+    for module_name in HEAVY_MODULES:
+        try:
+            importlib.import_module(module_name)
+            loaded.append(module_name)
+        except Exception as e:
+            print(f"Preload skipped {module_name}: {str(e)}")
+    
+    print(f"Preloaded modules: {', '.join(loaded)}")
+    return loaded
+
+# convert_multi targets (output extension: conversion), in the order they run.
+# xlsx goes first: the table pass caches the text of the pages without tables
+MULTI_TARGETS = {
+    'xlsx': lambda pdf_path, output_path, options, session: pdf_to_excel(
+        pdf_path, output_path, options.get('page_selection', 'all'), options, session=session),
+    'txt': pdf_to_text,
+    'html': pdf_to_html,
+    'epub': pdf_to_epub,
+    'rtf': pdf_to_rtf,
+}
+
+def convert_multi(pdf_path, output_base, targets, options=None):
+    """
+    Convert one PDF to several formats from a single DocumentSession, writing
+    <output_base>.<target> for each target (see MULTI_TARGETS)
+    The text_engine option defaults to pdfplumber for every target so the text
+    conversions share one set of parsed pages with each other and with the
+    table pass (whose engine option also defaults to pdfplumber)
+    Returns True if every target was written
+    """
+    if options is None:
+        options = {}
+    if isinstance(targets, str):
+        targets = [target.strip() for target in targets.split(',') if target.strip()]
+    
+    unknown = [target for target in targets if target not in MULTI_TARGETS]
+    if unknown or not targets:
+        raise ValueError(f"Unknown multi targets {unknown}, expected some of {list(MULTI_TARGETS)}")
+    
+    options = dict(options)
+    options.setdefault('text_engine', 'pdfplumber')
+    
+    results = {}
+    with DocumentSession(pdf_path) as session:
+        print(f"Converting {pdf_path} ({session.page_count} pages) to {', '.join(targets)}")
+        for target in MULTI_TARGETS:
+            if target not in targets:
+                continue
+            output_path = f"{output_base}.{target}"
+            print(f"Writing {output_path}")
+            results[target] = bool(MULTI_TARGETS[target](pdf_path, output_path, options, session=session))
+    
+    failed = [target for target, success in results.items() if not success]
+    if failed:
+        print(f"Failed targets: {', '.join(failed)}")
+    return not failed
+
+# Conversions a preview runs on a cut-down copy of the PDF; the others either
+# address pages of the original (split ranges, reorder operations) or are a
+# single cheap pass, and run in full
+PREVIEW_CONVERSIONS = ('pdf-to-word', 'pdf-to-excel', 'pdf-to-powerpoint', 'pdf-to-powerpoint-text',
+                       'pdf-to-text', 'pdf-to-html', 'pdf-to-epub', 'pdf-to-rtf', 'pdf-to-svg',
+                       'compress-pdf', 'ocr-pdf', 'multi')
+
+# Pages in a preview, and its latency budget in seconds
+PREVIEW_PAGES = 3
+PREVIEW_BUDGET = 15
+
+# Reduced-quality settings of a preview, over the job's own options
+PREVIEW_OPTIONS = {
+    'dpi': 100,
+    'table_strategy': 'adaptive',
+    'embedImages': False,
+    'include_images': False,
+    'extract_images': False,
+    'image_quality': 'low',
+    'workers': 1,
+}
+
+def select_preview_pages(page_numbers, count, sample=False):
+    """
+    The pages of a preview: the first count of page_numbers, or with sample
+    count pages spread evenly from the first to the last
+    """
+    if count >= len(page_numbers) or not sample:
+        return page_numbers[:count]
+    if count == 1:
+        return page_numbers[:1]
+    step = (len(page_numbers) - 1) / (count - 1)
+    return [page_numbers[round(i * step)] for i in range(count)]
+
+def run_preview(conversion_type, pdf_path, output_path, options, password=''):
+    """
+    Run a conversion on a few pages at reduced quality within a latency budget
+    preview option: True for PREVIEW_PAGES pages, or a page count
+    preview_sample option: spread the pages over the document instead of
+    taking the first ones
+    preview_budget option: seconds before the preview is abandoned (PREVIEW_BUDGET)
+    The preview pages are converted once. Conversions that report their pages
+    (on_page_done) give the first page's time, which carries the one-off
+    cost (imports, setup), apart from the per-page cost of the rest; for the
+    others per_page is the preview's average, setup included.
+    Returns the preview report (also printed as a "Preview report:" JSON line)
+    with the estimated full-job time at the preview settings
+    """
+    import shutil
+    import signal
+    import threading
+    import time
+    
+    preview = options.get('preview')
+    count = PREVIEW_PAGES if preview is True else max(1, int(preview))
+    budget = float(options.get('preview_budget', PREVIEW_BUDGET))
+    
+    # The preview's options address the cut-down PDF, whose pages are all selected
+    preview_options = {key: value for key, value in options.items()
+                       if key not in ('preview', 'preview_sample', 'preview_budget', 'page_selection')}
+    preview_options.update(PREVIEW_OPTIONS)
+    preview_options.setdefault('source_name', os.path.basename(pdf_path))
+    page_done_times = []
+    preview_options['on_page_done'] = lambda page_num: page_done_times.append(time.time())
+    
+    timed_out = []
+    
+    def budget_exceeded(signum, frame):
+        timed_out.append(True)
+        raise TimeoutError(f"Preview exceeded its {budget:g}s budget")
+    
+    # SIGALRM only works on the main thread (CLI and serve jobs run there)
+    use_alarm = hasattr(signal, 'setitimer') and threading.current_thread() is threading.main_thread()
+    
+    report = {'success': False, 'timed_out': False}
+    temp_dir = memory_temp_dir()
+    try:
+        if use_alarm:
+            previous_handler = signal.signal(signal.SIGALRM, budget_exceeded)
+            signal.setitimer(signal.ITIMER_REAL, budget)
+        try:
+            from PyPDF2 import PdfReader, PdfWriter
+            
+            started = time.time()
+            reader = PdfReader(pdf_path)
+            if reader.is_encrypted and not (password and reader.decrypt(password)):
+                raise ValueError("The PDF is encrypted and the password does not open it")
+            total_pages = len(reader.pages)
+            page_range = parse_page_selection(options.get('page_selection', 'all'))
+            job_pages = list(page_range.clip(total_pages)) if page_range else list(range(1, total_pages + 1))
+            if not job_pages:
+                raise ValueError("No pages selected")
+            preview_pages = select_preview_pages(job_pages, count, bool(options.get('preview_sample', False)))
+            print(f"Preview of {conversion_type}: pages {preview_pages} of {len(job_pages)} "
+                  f"(budget {budget:g}s)")
+            
+            preview_path = os.path.join(temp_dir, 'preview.pdf')
+            writer = PdfWriter()
+            for page_num in preview_pages:
+                writer.add_page(reader.pages[page_num - 1])
+            with open(preview_path, 'wb') as f:
+                writer.write(f)
+            split_time = time.time() - started
+            
+            started = time.time()
+            success = run_conversion(conversion_type, preview_path, output_path, preview_options, password=password)
+            if timed_out:
+                raise TimeoutError(f"Preview exceeded its {budget:g}s budget")
+            if not success:
+                raise RuntimeError(f"{conversion_type} failed on the preview pages")
+            preview_time = time.time() - started
+            
+            # One report per page: the gaps after the first page are the per-page cost
+            page_times_measured = len(preview_pages) > 1 and len(page_done_times) == len(preview_pages)
+            if page_times_measured:
+                first_page_time = page_done_times[0] - started
+                page_cost = (page_done_times[-1] - page_done_times[0]) / (len(preview_pages) - 1)
+            else:
+                first_page_time = preview_time / len(preview_pages)
+                page_cost = first_page_time
+            
+            report.update({
+                'success': True,
+                'preview_pages': preview_pages,
+                'total_pages': len(job_pages),
+                'split_time': round(split_time, 3),
+                'preview_time': round(preview_time, 3),
+                # The one-off cost of the conversion (imports, setup) and its first page
+                'first_page_time': round(first_page_time, 3),
+                'per_page': round(page_cost, 3),
+                # False: per_page is the preview's average, setup included
+                'per_page_measured': page_times_measured,
+                # At the preview settings below (lower dpi, one worker, ...),
+                # not the job's own
+                'estimated_full_time_at_preview_settings':
+                    round(preview_time + page_cost * (len(job_pages) - len(preview_pages)), 1),
+                'preview_settings': PREVIEW_OPTIONS,
+            })
+        finally:
+            if use_alarm:
+                signal.setitimer(signal.ITIMER_REAL, 0)
+                signal.signal(signal.SIGALRM, previous_handler)
+    except Exception as e:
+        print(f"Preview failed: {str(e)}")
+        if not timed_out:
+            import traceback
+            traceback.print_exc()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    
+    report['timed_out'] = bool(timed_out)
+    print(f"Preview report: {json.dumps(report)}")
+    return report
+
+# Every conversion_type run_conversion dispatches
+CONVERSION_TYPES = ('pdf-to-word', 'pdf-to-excel', 'pdf-to-powerpoint', 'pdf-to-powerpoint-text',
+                    'pdf-to-text', 'pdf-to-html', 'pdf-to-epub', 'pdf-to-rtf', 'pdf-to-svg',
+                    'split-pdf', 'compress-pdf', 'protect-pdf', 'ocr-pdf', 'merge-pdf',
+                    'get_page_count', 'multi')
+
+def run_conversion(conversion_type, pdf_path, output_path=None, options=None, page_selection='all', password='', input_paths=None):
+    """
+    Dispatch a conversion to the matching function
+    Returns the function's result (True/False, or the page count for get_page_count),
+    or with the preview option the preview report (see run_preview);
+    an unknown conversion type is reported and returns False
+    """
+    if options is None:
+        options = {}
+    
+    # The page_selection argument (--page-selection) reaches every conversion
+    # through its options, unless the options carry their own
+    if page_selection and page_selection != 'all' and 'page_selection' not in options:
+        options = dict(options, page_selection=page_selection)
+    
+    if options.get('preview'):
+        if conversion_type in PREVIEW_CONVERSIONS:
+            return run_preview(conversion_type, pdf_path, output_path, options, password)
+        print(f"Preview is not available for {conversion_type}, running the full conversion")
+        options = {key: value for key, value in options.items() if not key.startswith('preview')}
+    
+    if conversion_type == 'pdf-to-word':
+        return pdf_to_word(pdf_path, output_path, options)
+    elif conversion_type == 'pdf-to-excel':
+        return pdf_to_excel(pdf_path, output_path, options.get('page_selection', page_selection), options)
+    elif conversion_type == 'pdf-to-powerpoint':
+        return pdf_to_powerpoint(pdf_path, output_path, options)
+    elif conversion_type == 'pdf-to-powerpoint-text':
+        return pdf_to_powerpoint_text(pdf_path, output_path, options)
+    elif conversion_type == 'pdf-to-text':
+        return pdf_to_text(pdf_path, output_path, options)
+    elif conversion_type == 'pdf-to-html':
+        return pdf_to_html(pdf_path, output_path, options)
+    elif conversion_type == 'pdf-to-epub':
+        return pdf_to_epub(pdf_path, output_path, options)
+    elif conversion_type == 'pdf-to-rtf':
+        return pdf_to_rtf(pdf_path, output_path, options)
+    elif conversion_type == 'pdf-to-svg':
+        return pdf_to_svg(pdf_path, output_path, options)
+    elif conversion_type == 'split-pdf':
+        return split_pdf(pdf_path, output_path, options)
+    elif conversion_type == 'compress-pdf':
+        return compress_pdf(pdf_path, output_path, options)
+    elif conversion_type == 'protect-pdf':
+        return protect_pdf(pdf_path, output_path, password)
+    elif conversion_type in ('reorder-pages', 'organize_pdf'):
+        return reorder_pages_pdf(pdf_path, output_path, options)
+    elif conversion_type == 'ocr-pdf':
+        return ocr_pdf(pdf_path, output_path, options)
+    elif conversion_type == 'merge-pdf':
+        return merge_pdfs(output_path, input_paths or [])
+    elif conversion_type == 'get_page_count':
+        return get_pdf_page_count(pdf_path)
+    elif conversion_type == 'multi':
+        # output_path is the base name, the targets come from the options
+        return convert_multi(pdf_path, output_path, options.get('targets', []), options)
+    else:
+        print(f"Error: Unknown conversion type {conversion_type}")
+        return False
+
+# Command-line stand-in for stdin (input PDF) or stdout (output file)
+STDIO_PATH = '-'
+
+# What a PDF read from stdin is called in titles and summaries
+STDIN_SOURCE_NAME = 'stdin.pdf'
+
+# Spool file extension of each conversion's output when it goes to stdout
+STDIO_OUTPUT_EXTENSIONS = {
+    'pdf-to-word': '.docx',
+    'pdf-to-excel': '.xlsx',
+    'pdf-to-powerpoint': '.pptx',
+    'pdf-to-powerpoint-text': '.pptx',
+    'pdf-to-text': '.txt',
+    'pdf-to-html': '.html',
+    'pdf-to-epub': '.epub',
+    'pdf-to-rtf': '.rtf',
+    'pdf-to-svg': '.svg',
+    'split-pdf': '.zip',
+}
+
+# Largest PDF accepted on stdin, in MB (PDF_CONVERTER_MAX_STDIN_MB, 0 = no limit)
+MAX_STDIN_MB = 512
+
+def get_stdin_limit():
+    """
+    The stdin PDF size limit in bytes, 0 for none
+    """
+    max_mb = float(os.environ.get('PDF_CONVERTER_MAX_STDIN_MB', MAX_STDIN_MB))
+    return int(max_mb * 1024 * 1024) if max_mb > 0 else 0
+
+def stdout_output_kind(conversion_type, options):
+    """
+    How a conversion's output reaches stdout: 'text' (written page by page
+    through a StdoutTextStream), 'zip' (a ZIP streamed onto the binary stdout)
+    or 'spool' (written to a StdoutSpool file and copied out when complete;
+    the PDF and Office writers seek back into their output)
+    """
+    if options.get('preview'):
+        # The preview runs the conversion several times, into files
+        return 'spool'
+    if conversion_type in STREAMING_CONVERSIONS:
+        return 'text'
+    if conversion_type == 'split-pdf':
+        return 'zip'
+    if conversion_type == 'pdf-to-svg':
+        return 'zip' if options.get('output_mode', 'single') in ('per_page', 'grouped') else 'text'
+    return 'spool'
+
+def memory_temp_dir():
+    """
+    A new temporary directory, on tmpfs (/dev/shm) where there is one
+    """
+    import tempfile
+    
+    if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+        return tempfile.mkdtemp(prefix='pdf_converter_', dir='/dev/shm')
+    return tempfile.mkdtemp(prefix='pdf_converter_')
+
+class MemoryPdfInput:
+    """
+    A PDF read from a stream (stdin by default) into memory, with a path the
+    PDF libraries, page workers and subprocesses (gs, pdftoppm) can open
+    Uses an anonymous memory file (memfd) on Linux, a file in memory_temp_dir()
+    elsewhere. Input over max_bytes (default: get_stdin_limit()) is refused
+    """
+    
+    def __init__(self, stream=None, max_bytes=None, chunk_size=1024 * 1024):
+        stream = stream or sys.stdin.buffer
+        if max_bytes is None:
+            max_bytes = get_stdin_limit()
+        self.size = 0
+        self._fd = None
+        self._temp_dir = None
+        
+        if hasattr(os, 'memfd_create') and os.path.isdir(f'/proc/{os.getpid()}/fd'):
+            self._fd = os.memfd_create('input.pdf', 0)
+            # Through the pid rather than /proc/self so child processes can open it too
+            self.path = f'/proc/{os.getpid()}/fd/{self._fd}'
+        else:
+            self._temp_dir = memory_temp_dir()
+            self.path = os.path.join(self._temp_dir, 'input.pdf')
+        
+        try:
+            with open(self.path, 'wb') as sink:
+                while True:
+                    chunk = stream.read(chunk_size)
+                    if not chunk:
+                        break
+                    self.size += len(chunk)
+                    if max_bytes and self.size > max_bytes:
+                        raise ValueError(f"PDF on stdin exceeds the limit of {max_bytes} bytes "
+                                         f"(PDF_CONVERTER_MAX_STDIN_MB)")
+                    sink.write(chunk)
+            if not self.size:
+                raise ValueError("No PDF data on stdin")
+        except Exception:
+            self.close()
+            raise
+    
+    def close(self):
+        import shutil
+        
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+class StdoutSpool:
+    """
+    Output path for a conversion whose output goes to stdout
+    The conversion writes to a file in memory_temp_dir() (the PDF and Office
+    writers seek back into their output) and send() copies it out once the
+    conversion succeeded; text and ZIP output skip it (stdout_output_kind)
+    """
+    
+    def __init__(self, conversion_type):
+        self._temp_dir = memory_temp_dir()
+        self.path = os.path.join(self._temp_dir, 'output' + STDIO_OUTPUT_EXTENSIONS.get(conversion_type, '.pdf'))
+    
+    def send(self, out, chunk_size=1024 * 1024):
+        """
+        Copy the output to the binary stream out, returns the bytes sent
+        A conversion that wrote one file under another name (SVG ZIP output)
+        sends that file
+        """
+        import shutil
+        
+        path = self.path
+        if not os.path.exists(path):
+            written = os.listdir(self._temp_dir)
+            if len(written) != 1:
+                raise ValueError(f"Conversion wrote {len(written)} files, stdout takes exactly one")
+            path = os.path.join(self._temp_dir, written[0])
+        
+        with open(path, 'rb') as f:
+            shutil.copyfileobj(f, out, chunk_size)
+        out.flush()
+        return os.path.getsize(path)
+    
+    def close(self):
+        import shutil
+        
+        if self._temp_dir is not None:
+            shutil.rmtree(self._temp_dir, ignore_errors=True)
+            self._temp_dir = None
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+def handle_job(job):
+    """
+    Run a single serve-mode job and build its JSON-serializable reply
+    Job format: {"id", "conversion_type", "pdf_path", "output_path", "options",
+                 "page_selection", "password", "input_paths"}
+    Everything the conversion prints is captured into the reply's "log" field;
+    a preview job's report goes into its "preview" field
+    """
+    import io
+    import time
+    import traceback
+    from contextlib import redirect_stdout, redirect_stderr
+    
+    reply = {'id': job.get('id'), 'success': False}
+    conversion_type = job.get('conversion_type')
+    
+    if conversion_type == 'ping':
+        reply['success'] = True
+        return reply
+    if conversion_type not in CONVERSION_TYPES:
+        reply['error'] = f"Unknown conversion type {conversion_type}"
+        return reply
+    
+    options = job.get('options') or {}
+    if isinstance(options, str):
+        try:
+            options = json.loads(options) if options.strip() else {}
+        except ValueError as e:
+            reply['error'] = f"Invalid options: {str(e)}"
+            return reply
+    
+    log_buffer = io.StringIO()
+    started = time.time()
+    try:
+        with redirect_stdout(log_buffer), redirect_stderr(log_buffer):
+            result = run_conversion(
+                conversion_type,
+                job.get('pdf_path'),
+                job.get('output_path'),
+                options,
+                page_selection=job.get('page_selection', 'all'),
+                password=job.get('password', ''),
+                input_paths=job.get('input_paths')
+            )
+        if conversion_type == 'get_page_count':
+            reply['result'] = result
+            reply['success'] = result > 0
+        elif isinstance(result, dict):
+            # A preview's report
+            reply['preview'] = result
+            reply['success'] = result['success']
+        else:
+            reply['success'] = bool(result)
+    except Exception as e:
+        reply['error'] = str(e)
+        log_buffer.write(traceback.format_exc())
+    
+    reply['elapsed'] = round(time.time() - started, 3)
+    reply['log'] = log_buffer.getvalue()
+    return reply
+
+def serve_job_stream(lines, write, after_job=None):
+    """
+    Read JSON-lines jobs from an iterable of lines and write one JSON reply per job
+    Jobs run one at a time on the calling (main) thread, which the SIGALRM
+    timeouts in merge_pdfs and split_pdf rely on
+    after_job, if given, is called after each reply
+    Returns False when a shutdown job was received, True at the end of the lines
+    """
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        
+        try:
+            job = json.loads(line)
+            if not isinstance(job, dict):
+                raise ValueError("Job must be a JSON object")
+        except ValueError as e:
+            reply = {'id': None, 'success': False, 'error': f"Invalid job: {str(e)}"}
+        else:
+            if job.get('conversion_type') == 'shutdown':
+                write(json.dumps({'id': job.get('id'), 'success': True}) + '\n')
+                return False
+            reply = handle_job(job)
+        
+        write(json.dumps(reply) + '\n')
+        
+        if after_job is not None:
+            after_job()
+    
+    return True
+
+def serve(socket_path=None):
+    """
+    Long-lived worker mode: preload the heavy libraries once, then accept
+    JSON-lines jobs on stdin (replies on stdout) or on a Unix socket
+    """
+    from contextlib import redirect_stdout
+    
+    # stdout carries the replies in stdin mode, keep startup logging off it
+    with redirect_stdout(sys.stderr):
+        preload_modules()
+    
+    if not socket_path:
+        out = sys.stdout
+        
+        def write_reply(data):
+            out.write(data)
+            out.flush()
+        
+        print("Serving jobs on stdin", file=sys.stderr)
+        serve_job_stream(sys.stdin, write_reply)
+        return True
+    
+    import socketserver
+    
+    class JobHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            def write_reply(data):
+                self.wfile.write(data.encode('utf-8'))
+                self.wfile.flush()
+            
+            if not serve_job_stream(self.rfile, write_reply):
+                self.server.shutdown_requested = True
+    
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    
+    server = socketserver.UnixStreamServer(socket_path, JobHandler)
+    server.shutdown_requested = False
+    print(f"Serving jobs on unix socket {socket_path}", file=sys.stderr)
+    try:
+        while not server.shutdown_requested:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+    
+    return True
+
+# Exit code a pool worker uses to ask the supervisor to stop the whole pool
+POOL_EXIT_SHUTDOWN = 3
+
+def get_process_rss_mb():
+    """
+    Current resident set size of this process in MB
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except Exception:
+        # Not Linux: fall back to the peak RSS (KB on Linux, bytes on macOS)
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def pool_worker_loop(listener, max_jobs=100, max_rss_mb=1024):
+    """
+    Accept connections on the shared listening socket and serve their jobs
+    Returns once the worker has run max_jobs jobs or grown past max_rss_mb,
+    so the supervisor can replace it with a fresh fork. The limits take
+    effect when the client closes its connection: jobs a client has already
+    sent are always answered. SIGTERM lets the running job finish and reply,
+    then the worker exits.
+    """
+    import signal
+    
+    class StopWorker(Exception):
+        pass
+    
+    state = {'jobs': 0, 'recycle': False, 'busy': False, 'stopping': False}
+    
+    def stop_worker(signum, frame):
+        state['stopping'] = True
+        if not state['busy']:
+            # Idle in accept() or waiting for the next job
+            raise StopWorker()
+    
+    def job_lines(rfile):
+        for line in rfile:
+            if line.strip():
+                state['busy'] = True
+            yield line
+    
+    def after_job():
+        state['jobs'] += 1
+        state['busy'] = False
+        if not state['recycle']:
+            rss_mb = get_process_rss_mb()
+            if max_jobs and state['jobs'] >= max_jobs:
+                print(f"Worker {os.getpid()} recycling after {state['jobs']} jobs", file=sys.stderr)
+                state['recycle'] = True
+            elif max_rss_mb and rss_mb > max_rss_mb:
+                print(f"Worker {os.getpid()} recycling at {rss_mb:.0f} MB RSS", file=sys.stderr)
+                state['recycle'] = True
+        if state['stopping']:
+            raise StopWorker()
+    
+    signal.signal(signal.SIGTERM, stop_worker)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+    try:
+        while not state['recycle']:
+            conn, _ = listener.accept()
+            with conn, conn.makefile('rb') as rfile, conn.makefile('wb') as wfile:
+                def write_reply(data):
+                    wfile.write(data.encode('utf-8'))
+                    wfile.flush()
+                
+                if not serve_job_stream(job_lines(rfile), write_reply, after_job):
+                    return POOL_EXIT_SHUTDOWN
+    except StopWorker:
+        pass
+    
+    return 0
+
+def serve_pool(socket_path, workers=4, max_jobs=100, max_rss_mb=1024):
+    """
+    Pre-forked worker pool: preload the heavy libraries once in the supervisor,
+    then fork workers that share the warm module state copy-on-write and
+    accept jobs on the same Unix socket. Workers exit after max_jobs jobs or
+    once their RSS passes max_rss_mb and are replaced with a fresh fork.
+    """
+    import gc
+    import signal
+    import socket
+    import time
+    from contextlib import redirect_stdout
+    
+    with redirect_stdout(sys.stderr):
+        preload_modules()
+    
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(128)
+    
+    # Keep the preloaded objects out of the collector so the workers' GC
+    # passes don't touch (and copy) the shared pages
+    gc.freeze()
+    
+    children = {}
+    state = {'stopping': False}
+    
+    def spawn_worker():
+        # Hold SIGTERM until the child has its own handler and the parent has
+        # recorded the child, so stop_pool neither runs in nor misses it
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+        try:
+            pid = os.fork()
+            if pid == 0:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                exit_code = 1
+                try:
+                    exit_code = pool_worker_loop(listener, max_jobs, max_rss_mb)
+                except Exception:
+                    import traceback
+                    traceback.print_exc()
+                finally:
+                    sys.stdout.flush()
+                    sys.stderr.flush()
+                    os._exit(exit_code)
+            children[pid] = time.time()
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+    
+    def stop_pool(signum=None, frame=None):
+        # Workers finish the job they are running, then exit
+        state['stopping'] = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+    
+    signal.signal(signal.SIGTERM, stop_pool)
+    signal.signal(signal.SIGINT, stop_pool)
+    
+    print(f"Serving jobs on unix socket {socket_path} with {workers} workers "
+          f"(max_jobs={max_jobs}, max_rss_mb={max_rss_mb})", file=sys.stderr)
+    
+    try:
+        for _ in range(workers):
+            spawn_worker()
+        
+        while children:
+            pid, status = os.wait()
+            started = children.pop(pid, None)
+            if started is None:
+                continue
+            
+            exit_code = os.waitstatus_to_exitcode(status)
+            if exit_code == POOL_EXIT_SHUTDOWN and not state['stopping']:
+                print("Shutdown requested, stopping pool", file=sys.stderr)
+                stop_pool()
+            
+            # Don't fork in a tight loop if workers die right after starting
+            if not state['stopping'] and time.time() - started < 1:
+                time.sleep(1)
+            # stop_pool may have run during the sleep
+            if not state['stopping']:
+                spawn_worker()
+    finally:
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+    
+    return True
+
 def main():
     # Check for special commands that don't use argparse
     if len(sys.argv) > 1:
         command = sys.argv[1]
         
-        if command == 'organize_pdf':
+        if command == 'serve':
+            serve_parser = argparse.ArgumentParser(description='Serve conversion jobs as JSON lines')
+            serve_parser.add_argument('--socket', default=None,
+                                      help='Unix socket path to listen on (default: stdin/stdout)')
+            serve_parser.add_argument('--workers', type=int, default=1,
+                                      help='Number of pre-forked workers (requires --socket)')
+            serve_parser.add_argument('--max-jobs', type=int, default=100,
+                                      help='Recycle a pool worker after this many jobs (0 = never)')
+            serve_parser.add_argument('--max-rss-mb', type=int, default=1024,
+                                      help='Recycle a pool worker once its RSS exceeds this many MB (0 = never)')
+            serve_args = serve_parser.parse_args(sys.argv[2:])
+            
+            if serve_args.workers > 1:
+                if not serve_args.socket:
+                    print("Error: --workers requires --socket", file=sys.stderr)
+                    sys.exit(1)
+                success = serve_pool(serve_args.socket, serve_args.workers,
+                                     serve_args.max_jobs, serve_args.max_rss_mb)
+            else:
+                success = serve(serve_args.socket)
+            sys.exit(0 if success else 1)
+        
+        elif command == 'benchmark-render':
+            bench_parser = argparse.ArgumentParser(description='Benchmark the page render backends')
+            bench_parser.add_argument('pdf_path', help='Path to input PDF file')
+            bench_parser.add_argument('--dpi', type=int, default=200, help='Render resolution')
+            bench_parser.add_argument('--max-pages', type=int, default=None,
+                                      help='Only render the first N pages')
+            bench_args = bench_parser.parse_args(sys.argv[2:])
+            
+            results = benchmark_render_backends(bench_args.pdf_path, bench_args.dpi, bench_args.max_pages)
+            sys.exit(0 if results else 1)
+        
+        elif command == 'benchmark-tables':
+            bench_parser = argparse.ArgumentParser(description='Benchmark the table extraction engines')
+            bench_parser.add_argument('pdf_paths', nargs='+', help='PDF files or directories of PDFs')
+            bench_parser.add_argument('--max-pages', type=int, default=None,
+                                      help='Only extract the first N pages of each PDF')
+            bench_args = bench_parser.parse_args(sys.argv[2:])
+            
+            results = benchmark_table_engines(bench_args.pdf_paths, bench_args.max_pages)
+            sys.exit(0 if results else 1)
+        
+        elif command == 'benchmark-text':
+            bench_parser = argparse.ArgumentParser(description='Benchmark the text extraction engines')
+            bench_parser.add_argument('pdf_paths', nargs='+', help='PDF files or directories of PDFs')
+            bench_parser.add_argument('--max-pages', type=int, default=None,
+                                      help='Only extract the first N pages of each PDF')
+            bench_parser.add_argument('--mode', choices=TEXT_MODES, default='plain',
+                                      help='Text mode to extract with')
+            bench_args = bench_parser.parse_args(sys.argv[2:])
+            
+            results = benchmark_text_engines(bench_args.pdf_paths, bench_args.max_pages, bench_args.mode)
+            sys.exit(0 if results else 1)
+        
+        elif command == 'multi':
+            multi_parser = argparse.ArgumentParser(description='Convert one PDF to several formats in one pass')
+            multi_parser.add_argument('pdf_path', help='Path to input PDF file')
+            multi_parser.add_argument('output_base', help='Output path without extension')
+            multi_parser.add_argument('--targets', default='txt,html,epub,xlsx',
+                                      help=f"Comma-separated targets ({', '.join(MULTI_TARGETS)})")
+            multi_parser.add_argument('--options', default='{}',
+                                      help='JSON string of options for the conversions')
+            multi_parser.add_argument('--page-selection', default='all',
+                                      help='Page selection (e.g., "1,3-5,7" or "all")')
+            multi_args = multi_parser.parse_args(sys.argv[2:])
+            
+            options = json.loads(multi_args.options) if multi_args.options.strip() else {}
+            if multi_args.page_selection != 'all':
+                options.setdefault('page_selection', multi_args.page_selection)
+            
+            success = convert_multi(multi_args.pdf_path, multi_args.output_base, multi_args.targets, options)
+            sys.exit(0 if success else 1)
+        
+        elif command == 'organize_pdf':
             input_path = sys.argv[2]
             output_path = sys.argv[3]
             
@@ -2179,25 +5163,37 @@ def main():
         output_path = sys.argv[2]
         input_paths = sys.argv[3:]
         
-        print(f"Python script received conversion_type: merge-pdf")
-        print(f"Python script received output_path: {output_path}")
-        print(f"Python script received input_paths: {', '.join(input_paths)}")
+        from contextlib import ExitStack, redirect_stdout
         
-        success = merge_pdfs(output_path, input_paths)
-        if success:
-            print("Merge completed successfully")
-            sys.exit(0)
-        else:
-            print("Merge failed")
-            sys.exit(1)
+        stdout = sys.stdout.buffer
+        with ExitStack() as stack:
+            spool = None
+            if output_path == STDIO_PATH:
+                # stdout carries the merged PDF, the log goes to stderr
+                stack.enter_context(redirect_stdout(sys.stderr))
+                spool = stack.enter_context(StdoutSpool('merge-pdf'))
+            
+            print(f"Python script received conversion_type: merge-pdf")
+            print(f"Python script received output_path: {output_path}")
+            print(f"Python script received input_paths: {', '.join(input_paths)}")
+            
+            success = merge_pdfs(spool.path if spool else output_path, input_paths)
+            if success and spool is not None:
+                spool.send(stdout)
+            
+            if success:
+                print("Merge completed successfully")
+            else:
+                print("Merge failed")
+        sys.exit(0 if success else 1)
 
     parser = argparse.ArgumentParser(description='Convert PDF to DOCX or Excel')
     parser.add_argument('conversion_type', choices=['pdf-to-word', 'pdf-to-excel', 'pdf-to-powerpoint', 'pdf-to-powerpoint-text', 'pdf-to-text', 'pdf-to-html', 'pdf-to-epub', 'pdf-to-rtf', 'pdf-to-svg', 'split-pdf', 'compress-pdf', 'protect-pdf', 'reorder-pages', 'ocr-pdf'],
                        help='Type of conversion to perform')
-    parser.add_argument('pdf_path', help='Path to input PDF file')
-    parser.add_argument('output_path', help='Path to output file')
+    parser.add_argument('pdf_path', help='Path to input PDF file, or - to read it from stdin')
+    parser.add_argument('output_path', help='Path to output file, or - to write it to stdout')
     parser.add_argument('--page-selection', default='all', 
-                       help='Page selection for Excel conversion (e.g., "1,3-5,7" or "all")')
+                       help='Page selection (e.g., "1,3-5,7" or "all")')
     parser.add_argument('--options', default='{}',
                        help='JSON string of options for conversion')
     parser.add_argument('--password', default='',
@@ -2205,6 +5201,23 @@ def main():
     
     args = parser.parse_args()
     
+    from contextlib import ExitStack, redirect_stdout
+    
+    stdout = sys.stdout.buffer
+    with ExitStack() as stack:
+        if args.output_path == STDIO_PATH:
+            # stdout carries the output file, the log goes to stderr
+            stack.enter_context(redirect_stdout(sys.stderr))
+        
+        success = run_cli_conversion(args, stack, stdout)
+    
+    sys.exit(0 if success else 1)
+
+def run_cli_conversion(args, stack, stdout):
+    """
+    The conversion of a main() command line, with - paths read from stdin and
+    written to stdout (through the binary stream stdout)
+    """
     # Debug information
     print(f"Python script received conversion_type: {args.conversion_type}")
     print(f"Python script received pdf_path: {args.pdf_path}")
@@ -2213,7 +5226,6 @@ def main():
     print(f"Python script received options: {args.options}")
     print(f"Python script received password: {args.password}")
     print(f"Current working directory: {os.getcwd()}")
-    print(f"File exists check result: {os.path.exists(args.pdf_path)}")
     
     # Parse options if provided
     options = {}
@@ -2224,62 +5236,77 @@ def main():
         except json.JSONDecodeError as e:
             print(f"Warning: Could not parse options JSON: {e}")
     
-    # List files in the directory
-    try:
-        dir_path = os.path.dirname(args.pdf_path)
-        print(f"Files in directory {dir_path}:")
-        if os.path.exists(dir_path):
-            for file in os.listdir(dir_path):
-                print(f"  - {file}")
-        else:
-            print(f"Directory {dir_path} does not exist")
-    except Exception as e:
-        print(f"Error listing directory: {e}")
+    pdf_path = args.pdf_path
+    if pdf_path == STDIO_PATH:
+        try:
+            pdf_input = stack.enter_context(MemoryPdfInput())
+        except ValueError as e:
+            print(f"Error: {str(e)}")
+            return False
+        pdf_path = pdf_input.path
+        # The memfd path would otherwise end up in titles and summaries
+        options.setdefault('source_name', STDIN_SOURCE_NAME)
+        print(f"Read {pdf_input.size} bytes of PDF from stdin")
+    else:
+        print(f"File exists check result: {os.path.exists(pdf_path)}")
+        
+        # List files in the directory
+        try:
+            dir_path = os.path.dirname(pdf_path)
+            print(f"Files in directory {dir_path}:")
+            if os.path.exists(dir_path):
+                for file in os.listdir(dir_path):
+                    print(f"  - {file}")
+            else:
+                print(f"Directory {dir_path} does not exist")
+        except Exception as e:
+            print(f"Error listing directory: {e}")
+        
+        # Check if input file exists
+        if not os.path.exists(pdf_path):
+            print(f"Error: Input file {pdf_path} does not exist")
+            return False
     
-    # Check if input file exists
-    if not os.path.exists(args.pdf_path):
-        print(f"Error: Input file {args.pdf_path} does not exist")
-        sys.exit(1)
+    output_path = args.output_path
+    spool = None
+    text_stream = None
+    if output_path == STDIO_PATH:
+        output_kind = stdout_output_kind(args.conversion_type, options)
+        if args.conversion_type == 'pdf-to-svg':
+            # Several SVG files only fit on stdout as one ZIP
+            options['zip_output'] = True
+        
+        if output_kind == 'text':
+            # Pages go to stdout as they are converted, length-prefixed with
+            # stream_frames so the reader can forward them chunk by chunk
+            text_stream = output_path = StdoutTextStream(stdout, framed=bool(options.get('stream_frames', False)))
+        elif output_kind == 'zip':
+            # zipfile writes to unseekable streams (entries get data descriptors)
+            output_path = stdout
+        else:
+            spool = stack.enter_context(StdoutSpool(args.conversion_type))
+            output_path = spool.path
     
     # Perform conversion based on type
-    if args.conversion_type == 'pdf-to-word':
-        success = pdf_to_word(args.pdf_path, args.output_path)
-    elif args.conversion_type == 'pdf-to-excel':
-        success = pdf_to_excel(args.pdf_path, args.output_path, args.page_selection)
-    elif args.conversion_type == 'pdf-to-powerpoint':
-        success = pdf_to_powerpoint(args.pdf_path, args.output_path)
-    elif args.conversion_type == 'pdf-to-powerpoint-text':
-        success = pdf_to_powerpoint_text(args.pdf_path, args.output_path)
-    elif args.conversion_type == 'pdf-to-text':
-        success = pdf_to_text(args.pdf_path, args.output_path, options)
-    elif args.conversion_type == 'pdf-to-html':
-        success = pdf_to_html(args.pdf_path, args.output_path, options)
-    elif args.conversion_type == 'pdf-to-epub':
-        success = pdf_to_epub(args.pdf_path, args.output_path, options)
-    elif args.conversion_type == 'pdf-to-rtf':
-        success = pdf_to_rtf(args.pdf_path, args.output_path, options)
-    elif args.conversion_type == 'pdf-to-svg':
-        success = pdf_to_svg(args.pdf_path, args.output_path, options)
-    elif args.conversion_type == 'split-pdf':
-        success = split_pdf(args.pdf_path, args.output_path, options)
-    elif args.conversion_type == 'compress-pdf':
-        success = compress_pdf(args.pdf_path, args.output_path, options)
-    elif args.conversion_type == 'protect-pdf':
-        success = protect_pdf(args.pdf_path, args.output_path, args.password)
-    elif args.conversion_type == 'reorder-pages':
-        success = reorder_pages_pdf(args.pdf_path, args.output_path, options)
-    elif args.conversion_type == 'ocr-pdf':
-        success = ocr_pdf(args.pdf_path, args.output_path, options)
-    else:
-        print(f"Error: Unknown conversion type {args.conversion_type}")
-        sys.exit(1)
+    success = run_conversion(args.conversion_type, pdf_path, output_path, options,
+                             page_selection=args.page_selection, password=args.password)
+    if isinstance(success, dict):
+        # A preview's report, already printed
+        success = success['success']
+    
+    if success and spool is not None:
+        sent = spool.send(stdout)
+        print(f"Wrote {sent} bytes to stdout")
+    if success and text_stream is not None:
+        text_stream.end()
+    if success:
+        stdout.flush()
     
     if success:
         print("Conversion completed successfully")
-        sys.exit(0)
     else:
         print("Conversion failed")
-        sys.exit(1)
+    return success
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,66 @@
+import os
+import subprocess
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+
+def make_text_pdf(path, pages, lines_per_page=40):
+    """
+    Write a PDF of pages text-only A4 pages
+    """
+    import fitz
+
+    doc = fitz.open()
+    for page_num in range(1, pages + 1):
+        page = doc.new_page(width=595, height=842)
+        text = '\n'.join(f"Page {page_num} line {line}: quarterly revenue and operating costs"
+                         for line in range(1, lines_per_page + 1))
+        page.insert_text((50, 60), text, fontsize=9)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_scan_pdf(path, pages, dpi=100):
+    """
+    Write a PDF of pages A4 pages that are each one grayscale image of text,
+    like a scanner produces (no text layer)
+    """
+    import fitz
+
+    source = fitz.open()
+    page = source.new_page(width=595, height=842)
+    page.insert_text((60, 100), "Scanned invoice 2024\nTotal due: 1,234.56 EUR", fontsize=20)
+    image = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY).tobytes('png')
+    source.close()
+
+    doc = fitz.open()
+    for _ in range(pages):
+        doc.new_page(width=595, height=842).insert_image(fitz.Rect(0, 0, 595, 842), stream=image)
+    doc.save(path, deflate=True)
+    doc.close()
+    return path
+
+
+def peak_rss_mb(code):
+    """
+    Peak RSS in MB of a fresh Python process running code with the server
+    directory importable; a fresh process keeps the measurements independent
+    """
+    script = (
+        "import resource, sys\n"
+        f"sys.path.insert(0, {SERVER_DIR!r})\n"
+        f"{code}\n"
+        "print('PEAK_RSS_KB', resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+    )
+    result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, timeout=1800)
+    assert result.returncode == 0, result.stderr
+    for line in result.stdout.splitlines():
+        if line.startswith('PEAK_RSS_KB'):
+            return int(line.split()[1]) / 1024
+    raise AssertionError(f"No RSS reported:\n{result.stdout}\n{result.stderr}")
@@ -0,0 +1,120 @@
+"""
+Regenerate the table regression PDFs in this directory (needs PyMuPDF)
+
+    python tests/fixtures/make_table_fixtures.py
+"""
+import os
+
+import fitz
+
+FIXTURES_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BALANCE_SHEET = [
+    ['Item', '2023', '2022', 'Change'],
+    ['Cash and equivalents', '12,450', '10,210', '21.9%'],
+    ['Trade receivables', '8,932', '9,104', '-1.9%'],
+    ['Inventories', '5,118', '4,870', '5.1%'],
+    ['Total current assets', '26,500', '24,184', '9.6%'],
+    ['Property and equipment', '40,210', '38,992', '3.1%'],
+    ['Total assets', '66,710', '63,176', '5.6%'],
+]
+
+INCOME_STATEMENT = [
+    ['Quarter', 'Revenue', 'Costs', 'Margin'],
+    ['Q1', '4,100', '3,020', '26.3%'],
+    ['Q2', '4,480', '3,150', '29.7%'],
+    ['Q3', '4,390', '3,310', '24.6%'],
+    ['Q4', '5,020', '3,540', '29.5%'],
+]
+
+
+def draw_table(page, rows, x0, y0, col_widths, row_height=18, ruled=True, filled_cells=False):
+    """
+    Draw rows as a table at (x0, y0): with ruling lines, as filled cell
+    rectangles, or as bare text columns (ruled=False)
+    """
+    y = y0
+    for row_index, row in enumerate(rows):
+        x = x0
+        for col_index, cell in enumerate(row):
+            rect = fitz.Rect(x, y, x + col_widths[col_index], y + row_height)
+            if filled_cells:
+                fill = (0.85, 0.85, 0.85) if row_index == 0 else (0.96, 0.96, 0.96)
+                page.draw_rect(rect, color=(0, 0, 0), fill=fill, width=0.5)
+            page.insert_text((x + 3, y + row_height - 5), cell, fontsize=9)
+            x += col_widths[col_index]
+        y += row_height
+
+    if ruled and not filled_cells:
+        x1 = x0 + sum(col_widths)
+        for row_index in range(len(rows) + 1):
+            page.draw_line((x0, y0 + row_index * row_height), (x1, y0 + row_index * row_height), width=0.5)
+        x = x0
+        for width in col_widths + [0]:
+            page.draw_line((x, y0), (x, y0 + len(rows) * row_height), width=0.5)
+            x += width
+    return y
+
+
+def paragraph(page, y, text):
+    page.insert_textbox(fitz.Rect(50, y, 545, y + 60), text, fontsize=10)
+    return y + 60
+
+
+def make_ruled_grid(path):
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    draw_table(page, BALANCE_SHEET, 50, 80, [200, 90, 90, 80])
+    draw_table(page, INCOME_STATEMENT, 50, 300, [100, 120, 120, 100])
+    doc.save(path)
+
+
+def make_rect_cells(path):
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    draw_table(page, INCOME_STATEMENT, 60, 100, [100, 110, 110, 90], filled_cells=True)
+    doc.save(path)
+
+
+def make_borderless(path):
+    doc = fitz.open()
+    page = doc.new_page(width=595, height=842)
+    draw_table(page, BALANCE_SHEET, 50, 100, [200, 90, 90, 80], ruled=False)
+    doc.save(path)
+
+
+def make_statement(path):
+    """
+    A short annual statement: prose around a ruled table, a borderless table,
+    and a notes page without any table
+    """
+    doc = fitz.open()
+
+    page = doc.new_page(width=595, height=842)
+    y = paragraph(page, 50, "Consolidated balance sheet. All amounts in thousands of euros "
+                            "unless stated otherwise; prior year figures restated.")
+    y = draw_table(page, BALANCE_SHEET, 50, y + 10, [200, 90, 90, 80])
+    paragraph(page, y + 20, "The accompanying notes are an integral part of these statements.")
+
+    page = doc.new_page(width=595, height=842)
+    y = paragraph(page, 50, "Quarterly income statement.")
+    draw_table(page, INCOME_STATEMENT, 50, y + 10, [100, 120, 120, 100], ruled=False)
+
+    page = doc.new_page(width=595, height=842)
+    paragraph(page, 50, "Note 1. Accounting policies. The statements are prepared under IFRS "
+                        "as adopted by the EU, on a going concern basis.")
+    doc.save(path)
+
+
+FIXTURES = {
+    'tables_ruled_grid.pdf': make_ruled_grid,
+    'tables_rect_cells.pdf': make_rect_cells,
+    'tables_borderless.pdf': make_borderless,
+    'tables_statement.pdf': make_statement,
+}
+
+
+if __name__ == '__main__':
+    for name, make in FIXTURES.items():
+        make(os.path.join(FIXTURES_DIR, name))
+        print(f"Wrote {name}")
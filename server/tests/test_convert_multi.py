@@ -0,0 +1,67 @@
+import os
+import zipfile
+from collections import Counter
+
+import pytest
+
+fitz = pytest.importorskip('fitz')
+pdfplumber = pytest.importorskip('pdfplumber')
+openpyxl = pytest.importorskip('openpyxl')
+pytest.importorskip('ebooklib')
+PyPDF2 = pytest.importorskip('PyPDF2')
+
+import pdf_converter
+from conftest import FIXTURES_DIR
+
+PDF_PATH = os.path.join(FIXTURES_DIR, 'tables_statement.pdf')
+TARGETS = ['txt', 'html', 'epub', 'xlsx']
+
+
+def read_output(path):
+    """
+    What a conversion wrote, without the parts that change from run to run (EPUB ids and dates)
+    """
+    if path.endswith('.xlsx'):
+        workbook = openpyxl.load_workbook(path)
+        return {sheet.title: [list(row) for row in sheet.iter_rows(values_only=True)] for sheet in workbook}
+    if path.endswith('.epub'):
+        with zipfile.ZipFile(path) as archive:
+            return {name: archive.read(name) for name in archive.namelist() if name.endswith('.xhtml')}
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def standalone(target, output_path, options):
+    if target == 'xlsx':
+        return pdf_converter.pdf_to_excel(PDF_PATH, output_path, 'all', options)
+    return pdf_converter.MULTI_TARGETS[target](PDF_PATH, output_path, options, session=None)
+
+
+@pytest.mark.parametrize('text_engine', ['pdfplumber', 'pymupdf'])
+def test_multi_outputs_match_the_standalone_conversions(tmp_path, text_engine):
+    options = {'text_engine': text_engine, 'ocr': False}
+    assert pdf_converter.convert_multi(PDF_PATH, str(tmp_path / 'multi'), TARGETS, options)
+
+    for target in TARGETS:
+        output_path = str(tmp_path / f'single.{target}')
+        assert standalone(target, output_path, dict(options))
+        assert read_output(str(tmp_path / f'multi.{target}')) == read_output(output_path), target
+
+
+@pytest.mark.parametrize('text_engine', ['pdfplumber', 'pymupdf'])
+def test_multi_opens_each_library_once(tmp_path, monkeypatch, text_engine):
+    opened = Counter()
+
+    def counting(name, open_func):
+        def wrapper(*args, **kwargs):
+            opened[name] += 1
+            return open_func(*args, **kwargs)
+        return wrapper
+
+    monkeypatch.setattr(pdfplumber, 'open', counting('pdfplumber', pdfplumber.open))
+    monkeypatch.setattr(fitz, 'open', counting('fitz', fitz.open))
+    monkeypatch.setattr(PyPDF2, 'PdfReader', counting('pypdf2', PyPDF2.PdfReader))
+
+    options = {'text_engine': text_engine, 'ocr': False}
+    assert pdf_converter.convert_multi(PDF_PATH, str(tmp_path / 'multi'), TARGETS, options)
+    assert opened and all(count == 1 for count in opened.values()), opened
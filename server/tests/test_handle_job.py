@@ -0,0 +1,23 @@
+import pytest
+
+from pdf_converter import CONVERSION_TYPES, handle_job
+
+
+def test_unknown_conversion_type_is_reported_in_the_reply():
+    reply = handle_job({'id': 7, 'conversion_type': 'pdf-to-nothing'})
+    assert reply == {'id': 7, 'success': False, 'error': 'Unknown conversion type pdf-to-nothing'}
+
+
+def test_invalid_options_are_reported_in_the_reply():
+    reply = handle_job({'id': 8, 'conversion_type': 'pdf-to-text', 'options': '{not json'})
+    assert reply['success'] is False
+    assert reply['error'].startswith('Invalid options')
+
+
+@pytest.mark.parametrize('conversion_type', CONVERSION_TYPES)
+def test_known_conversion_types_are_dispatched(conversion_type, tmp_path):
+    # A missing input fails inside the conversion, not as an unknown type
+    reply = handle_job({'id': 9, 'conversion_type': conversion_type, 'pdf_path': str(tmp_path / 'missing.pdf'),
+                        'output_path': str(tmp_path / 'out'), 'input_paths': [str(tmp_path / 'missing.pdf')],
+                        'options': {'targets': 'txt'} if conversion_type == 'multi' else {}})
+    assert 'Unknown conversion type' not in reply.get('error', '') + reply.get('log', '')
@@ -0,0 +1,86 @@
+import multiprocessing
+import os
+
+import pytest
+
+from pdf_converter import OcrCache
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='uses fork and flock')
+
+PAGES = 40
+
+
+def cache_files(cache_dir, suffix):
+    return [os.path.join(root, name) for root, _, files in os.walk(cache_dir)
+            for name in files if name.endswith(suffix)]
+
+
+def recorded_size(cache_dir):
+    with open(os.path.join(cache_dir, '.size')) as f:
+        return int(f.read())
+
+
+def entries_size(cache_dir):
+    return sum(os.path.getsize(path) for path in cache_files(cache_dir, '.json'))
+
+
+def put_pages(cache_dir, kind):
+    cache = OcrCache(cache_dir, 1024 * 1024 * 1024)
+    for page in range(PAGES):
+        cache.put(f'{page:064x}', kind, f'{kind} of page {page} ' * 20)
+
+
+def test_concurrent_text_and_data_puts_merge(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=put_pages, args=(cache_dir, kind))
+               for kind in ('text', 'data', 'text', 'data')]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+        assert worker.exitcode == 0
+
+    cache = OcrCache(cache_dir, 1024 * 1024 * 1024)
+    for page in range(PAGES):
+        key = f'{page:064x}'
+        assert cache.get(key, 'text') == f'text of page {page} ' * 20
+        assert cache.get(key, 'data') == f'data of page {page} ' * 20
+    assert recorded_size(cache_dir) == entries_size(cache_dir)
+    assert not cache_files(cache_dir, '.tmp')
+
+
+def test_eviction_drops_least_recently_used_down_to_90_percent(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    cache = OcrCache(cache_dir, 10 ** 9)
+    for page in range(10):
+        key = f'{page:064x}'
+        cache.put(key, 'text', 'x' * 1000)
+        # Oldest first, and page 0 read most recently of all
+        os.utime(cache._path(key), (1000 + page, 1000 + page))
+    os.utime(cache._path(f'{0:064x}'), (5000, 5000))
+    entry_size = os.path.getsize(cache._path(f'{0:064x}'))
+
+    cache = OcrCache(cache_dir, entry_size * 8)
+    cache.evict()
+
+    assert entries_size(cache_dir) <= entry_size * 8 * 0.9
+    assert recorded_size(cache_dir) == entries_size(cache_dir)
+    kept = sorted(os.path.basename(path) for path in cache_files(cache_dir, '.json'))
+    # Pages 1-3 were the least recently used
+    assert kept == sorted(f'{page:064x}.json' for page in [0, 4, 5, 6, 7, 8, 9])
+
+
+def test_eviction_removes_temp_files_of_dead_puts(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    cache = OcrCache(cache_dir, 10 ** 9)
+    cache.put(f'{1:064x}', 'text', 'page one')
+    stale_path = os.path.join(os.path.dirname(cache._path(f'{1:064x}')), 'abc123.tmp')
+    with open(stale_path, 'w') as f:
+        f.write('{"text": "half written')
+
+    cache.evict()
+
+    assert not os.path.exists(stale_path)
+    assert cache.get(f'{1:064x}', 'text') == 'page one'
+    assert recorded_size(cache_dir) == entries_size(cache_dir)
@@ -0,0 +1,63 @@
+import shutil
+
+import pytest
+
+pytest.importorskip('fitz')
+pytest.importorskip('PIL')
+
+from conftest import make_scan_pdf, peak_rss_mb
+
+# Peak RSS allowed on top of the short document's run; keeping every page's
+# render around costs megabytes per page
+RSS_TOLERANCE_MB = 48
+
+SHORT_SCAN_PAGES = 20
+LONG_SCAN_PAGES = 400
+
+
+@pytest.fixture(scope='module')
+def scans(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('scans')
+    return (make_scan_pdf(str(directory / 'short.pdf'), SHORT_SCAN_PAGES),
+            make_scan_pdf(str(directory / 'long.pdf'), LONG_SCAN_PAGES))
+
+
+def render_peak_rss(path, pages, backend, lookahead):
+    return peak_rss_mb(
+        "import pdf_converter\n"
+        f"for page_num, image in pdf_converter.iter_rendered_pages({path!r}, range(1, {pages + 1}), dpi=150,\n"
+        f"        lookahead={lookahead}, render_settings={{'backend': {backend!r}}}):\n"
+        "    assert image is not None\n"
+        "    image.convert('L')\n"
+    )
+
+
+@pytest.mark.parametrize('backend, lookahead', [
+    ('pymupdf', 0),
+    pytest.param('poppler', 2, marks=pytest.mark.skipif(shutil.which('pdftoppm') is None,
+                                                         reason='needs poppler (pdftoppm)')),
+])
+def test_page_rendering_peak_rss_is_flat_in_page_count(scans, backend, lookahead):
+    short, long = scans
+    short_rss = render_peak_rss(short, SHORT_SCAN_PAGES, backend, lookahead)
+    long_rss = render_peak_rss(long, LONG_SCAN_PAGES, backend, lookahead)
+
+    assert long_rss <= short_rss + RSS_TOLERANCE_MB, (short_rss, long_rss)
+
+
+@pytest.mark.skipif(shutil.which('tesseract') is None, reason='needs tesseract')
+def test_ocr_pdf_peak_rss_is_flat_in_page_count(scans, tmp_path):
+    pytest.importorskip('pytesseract')
+
+    def ocr_peak_rss(path, output_path):
+        return peak_rss_mb(
+            "import pdf_converter\n"
+            f"assert pdf_converter.ocr_pdf({path!r}, {output_path!r},\n"
+            "                              {'dpi': 150, 'render_backend': 'pymupdf'})"
+        )
+
+    short, long = scans
+    short_rss = ocr_peak_rss(short, str(tmp_path / 'short_ocr.pdf'))
+    long_rss = ocr_peak_rss(long, str(tmp_path / 'long_ocr.pdf'))
+
+    assert long_rss <= short_rss + RSS_TOLERANCE_MB, (short_rss, long_rss)
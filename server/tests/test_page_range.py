@@ -0,0 +1,155 @@
+import pytest
+
+from pdf_converter import PageRange, parse_page_selection, validate_page_selection_for_svg
+
+
+# The two parsers PageRange replaced, as they were, to check it against
+
+def legacy_parse_page_selection(page_selection):
+    if not page_selection or page_selection.lower() == 'all':
+        return None
+
+    pages = set()
+    for part in page_selection.split(','):
+        part = part.strip()
+        if '-' in part:
+            try:
+                start, end = map(int, part.split('-'))
+                pages.update(range(start, end + 1))
+            except ValueError:
+                pass
+        else:
+            try:
+                pages.add(int(part))
+            except ValueError:
+                pass
+
+    return sorted(pages) if pages else None
+
+
+def legacy_validate_page_selection_for_svg(page_selection, total_pages):
+    if not page_selection or page_selection.lower() == 'all':
+        return None, None
+
+    pages = set()
+    for part in page_selection.split(','):
+        part = part.strip()
+        if '-' in part:
+            try:
+                start, end = map(int, part.split('-'))
+                if start < 1:
+                    return None, f"Invalid page range '{part}': page numbers must be 1 or greater"
+                if end > total_pages:
+                    return None, f"Invalid page range '{part}': page {end} exceeds total pages ({total_pages})"
+                if start > end:
+                    return None, f"Invalid page range '{part}': start page ({start}) is greater than end page ({end})"
+                pages.update(range(start, end + 1))
+            except ValueError:
+                return None, f"Invalid range format: '{part}'. Use format like '1-3'"
+        else:
+            try:
+                page_num = int(part)
+                if page_num < 1:
+                    return None, f"Invalid page number '{part}': page numbers must be 1 or greater"
+                if page_num > total_pages:
+                    return None, f"Invalid page number '{part}': page {page_num} exceeds total pages ({total_pages})"
+                pages.add(page_num)
+            except ValueError:
+                return None, f"Invalid page number: '{part}'. Use numbers only"
+
+    return sorted(pages) if pages else None, None
+
+
+SELECTIONS = [
+    'all',
+    'ALL',
+    '',
+    '1',
+    '1,3-5,7',
+    '7,1,3-5',
+    ' 2 , 4 - 6 ',
+    '3-5,4-8',
+    '1-3,4-6',
+    '5-3',
+    '2,2,2',
+    '1-10',
+    '9-12',
+    '12',
+    'a',
+    '1,x,3',
+    '1-b',
+    '1-2-3',
+    '-3',
+    ',',
+    '1,,2',
+]
+
+
+@pytest.mark.parametrize('selection', SELECTIONS)
+def test_lenient_parse_matches_legacy(selection):
+    page_range = parse_page_selection(selection)
+    pages = list(page_range) if page_range is not None else None
+    assert pages == legacy_parse_page_selection(selection)
+
+
+@pytest.mark.parametrize('selection', ['0', '0-2', '0,3'])
+def test_lenient_parse_drops_page_zero(selection):
+    # The old parser let page 0 through, and nothing downstream could use it
+    expected = [page for page in legacy_parse_page_selection(selection) if page >= 1] or None
+    page_range = parse_page_selection(selection)
+    assert (list(page_range) if page_range is not None else None) == expected
+
+
+@pytest.mark.parametrize('selection', SELECTIONS + ['0', '0-2', '3,0', '10', '11', '8-11', '3-1'])
+def test_strict_parse_matches_legacy_svg_validation(selection):
+    assert validate_page_selection_for_svg(selection, 10) == legacy_validate_page_selection_for_svg(selection, 10)
+
+
+def test_strict_parse_raises_with_the_user_facing_message():
+    with pytest.raises(ValueError, match=r"page 12 exceeds total pages \(10\)"):
+        PageRange.parse('3,12', 10, strict=True)
+    with pytest.raises(ValueError, match="start page"):
+        PageRange.parse('5-2', 10, strict=True)
+
+
+@pytest.mark.parametrize('en_dash, hyphen', [
+    ('3–5', '3-5'),
+    ('1,3–5,7', '1,3-5,7'),
+    ('2 – 4', '2 - 4'),
+])
+def test_en_dash_ranges(en_dash, hyphen):
+    assert PageRange.parse(en_dash) == PageRange.parse(hyphen)
+    assert PageRange.parse(en_dash, 10, strict=True) == PageRange.parse(hyphen, 10, strict=True)
+
+
+def test_intervals_are_merged():
+    assert PageRange.parse('1-3,4-6,10,8-9,20').intervals == [(1, 6), (8, 10), (20, 20)]
+    assert str(PageRange.parse('7,1,3-5')) == '1,3-5,7'
+    assert len(PageRange.parse('1-2000')) == 2000
+
+
+@pytest.mark.parametrize('selection, total_pages, expected', [
+    ('1-5', 10, [(1, 5)]),
+    ('1-5', 3, [(1, 3)]),
+    ('2,8-12', 9, [(2, 2), (8, 9)]),
+    ('8-12', 5, []),
+    ('1-100', 1, [(1, 1)]),
+])
+def test_clip(selection, total_pages, expected):
+    assert PageRange.parse(selection).clip(total_pages).intervals == expected
+
+
+@pytest.mark.parametrize('page_num, expected', [
+    (0, False),
+    (1, True),
+    (2, False),
+    (3, True),
+    (5, True),
+    (6, False),
+    (9, False),
+    (10, True),
+    (2000, True),
+    (2001, False),
+])
+def test_contains_at_interval_edges(page_num, expected):
+    assert (page_num in PageRange.parse('1,3-5,10-2000')) is expected
@@ -0,0 +1,52 @@
+import pytest
+
+fitz = pytest.importorskip('fitz')
+pdfplumber = pytest.importorskip('pdfplumber')
+
+from conftest import make_text_pdf, peak_rss_mb
+from pdf_converter import PdfPageSource
+
+# Peak RSS allowed on top of the 10-page run; holding every page's layout
+# objects costs gigabytes at 1000 pages
+RSS_TOLERANCE_MB = 32
+
+
+def test_pdfplumber_pages_match_pdf_pages(tmp_path):
+    # Mixed page sizes, so a wrong doctop offset shows on every later page
+    path = str(tmp_path / 'mixed.pdf')
+    doc = fitz.open()
+    for page_num, (width, height) in enumerate([(595, 842), (842, 595), (300, 400), (612, 1008), (595, 842)], 1):
+        page = doc.new_page(width=width, height=height)
+        page.insert_text((30, 50), f"Page {page_num} top\nsecond line", fontsize=10)
+        page.insert_text((30, height - 40), f"Page {page_num} bottom", fontsize=10)
+    doc.save(path)
+    doc.close()
+
+    with pdfplumber.open(path) as pdf, PdfPageSource(path) as source:
+        assert source.page_count == len(pdf.pages)
+        # Out of order, to go through the source's page cursor both ways
+        for page_num in [1, 3, 2, 5, 4]:
+            expected = pdf.pages[page_num - 1]
+            page = source.page(page_num)
+            assert page.page_number == expected.page_number
+            assert page.initial_doctop == expected.initial_doctop
+            assert page.extract_words() == expected.extract_words()
+            assert page.extract_text() == expected.extract_text()
+            source.release(page)
+
+
+def text_conversion_peak_rss(path, output_path):
+    return peak_rss_mb(
+        "import pdf_converter\n"
+        f"assert pdf_converter.pdf_to_text({path!r}, {output_path!r}, {{'ocr': False}})"
+    )
+
+
+def test_text_conversion_peak_rss_is_flat_in_page_count(tmp_path):
+    small = make_text_pdf(str(tmp_path / 'small.pdf'), 10, lines_per_page=10)
+    large = make_text_pdf(str(tmp_path / 'large.pdf'), 1000, lines_per_page=10)
+
+    small_rss = text_conversion_peak_rss(small, str(tmp_path / 'small.txt'))
+    large_rss = text_conversion_peak_rss(large, str(tmp_path / 'large.txt'))
+
+    assert large_rss <= small_rss + RSS_TOLERANCE_MB, (small_rss, large_rss)
@@ -0,0 +1,36 @@
+import pytest
+
+pytest.importorskip('fitz')
+pytest.importorskip('pdfplumber')
+pytest.importorskip('PyPDF2')
+
+from conftest import make_text_pdf
+from pdf_converter import handle_job
+
+
+def test_preview_converts_its_pages_once_and_replies_with_the_report(tmp_path):
+    pdf_path = make_text_pdf(str(tmp_path / 'long.pdf'), 20, lines_per_page=10)
+    reply = handle_job({'id': 1, 'conversion_type': 'pdf-to-text', 'pdf_path': pdf_path,
+                        'output_path': str(tmp_path / 'preview.txt'),
+                        'options': {'preview': 3, 'ocr': False}})
+
+    assert reply['success'], reply['log']
+    report = reply['preview']
+    assert report['preview_pages'] == [1, 2, 3]
+    assert report['total_pages'] == 20
+    assert report['per_page_measured']
+    assert report['estimated_full_time_at_preview_settings'] >= report['preview_time']
+    # No separate cold and warm runs: each preview page is converted once
+    assert reply['log'].count('Processing page') == 3
+
+
+def test_preview_report_without_page_timings_falls_back_to_the_average(tmp_path):
+    pdf_path = make_text_pdf(str(tmp_path / 'short.pdf'), 5, lines_per_page=10)
+    reply = handle_job({'id': 1, 'conversion_type': 'pdf-to-text', 'pdf_path': pdf_path,
+                        'output_path': str(tmp_path / 'preview.txt'),
+                        'options': {'preview': 1, 'ocr': False}})
+
+    assert reply['success'], reply['log']
+    report = reply['preview']
+    assert not report['per_page_measured']
+    assert report['per_page'] == report['first_page_time']
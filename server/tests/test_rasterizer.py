@@ -0,0 +1,69 @@
+import pytest
+
+import pdf_converter
+from pdf_converter import PageRasterizer
+
+
+class RecordingRasterizer(PageRasterizer):
+    """
+    A poppler PageRasterizer that records its render runs instead of launching pdftoppm
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__('unused.pdf', total_pages=20, backend='poppler', **kwargs)
+        self.runs = []
+
+    def _render_range(self, first_page, last_page, dpi):
+        self.runs.append((first_page, last_page))
+        return [f'page {page_num}' for page_num in range(first_page, last_page + 1)]
+
+
+def test_pages_render_one_at_a_time_without_read_ahead():
+    # OCR of pages without text: consecutive pages must not pull in the pages after them
+    rasterizer = RecordingRasterizer()
+    for page_num in (4, 5, 6):
+        assert rasterizer.render(page_num) == f'page {page_num}'
+    assert rasterizer.runs == [(4, 4), (5, 5), (6, 6)]
+
+
+def test_sequential_pages_render_in_growing_batches_with_read_ahead():
+    rasterizer = RecordingRasterizer(read_ahead=True, max_batch=4)
+    for page_num in range(1, 12):
+        assert rasterizer.render(page_num) == f'page {page_num}'
+    assert rasterizer.runs == [(1, 1), (2, 3), (4, 7), (8, 11)]
+
+
+@pytest.mark.parametrize('pages, runs', [
+    ([1, 2, 3], [(1, 1), (2, 3)]),
+    ([1, 5, 9], [(1, 1), (5, 5), (9, 9)]),
+])
+def test_read_ahead_only_batches_pages_read_in_order(pages, runs):
+    rasterizer = RecordingRasterizer(read_ahead=True)
+    for page_num in pages:
+        rasterizer.render(page_num)
+    assert rasterizer.runs == runs
+
+
+@pytest.mark.parametrize('pages, max_length, runs', [
+    ([1, 2, 3, 4, 5], 2, [[1, 2], [3, 4], [5]]),
+    ([1, 2, 5, 6, 7, 9], 3, [[1, 2], [5, 6, 7], [9]]),
+    ([3], 4, [[3]]),
+    ([], 2, []),
+])
+def test_page_runs(pages, max_length, runs):
+    assert list(pdf_converter.page_runs(pages, max_length)) == runs
+
+
+def test_rendered_pages_use_one_poppler_launch_per_lookahead_run(monkeypatch):
+    launches = []
+
+    def fake_render_pdf_pages(pdf_path, first_page, last_page, dpi=200, **kwargs):
+        launches.append((first_page, last_page))
+        return [f'page {page_num}' for page_num in range(first_page, last_page + 1)]
+
+    monkeypatch.setattr(pdf_converter, 'render_pdf_pages', fake_render_pdf_pages)
+    pages = list(pdf_converter.iter_rendered_pages('unused.pdf', [1, 2, 3, 4, 5, 8, 9], lookahead=2,
+                                                   render_settings={'backend': 'poppler'}))
+
+    assert pages == [(page_num, f'page {page_num}') for page_num in [1, 2, 3, 4, 5, 8, 9]]
+    assert launches == [(1, 2), (3, 4), (5, 5), (8, 9)]
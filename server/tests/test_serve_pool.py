@@ -0,0 +1,94 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import SERVER_DIR, make_text_pdf
+
+SCRIPT = os.path.join(SERVER_DIR, 'pdf_converter.py')
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'fork'), reason='the worker pool forks')
+
+
+def start_pool(socket_path, workers, max_jobs):
+    process = subprocess.Popen([sys.executable, SCRIPT, 'serve', '--socket', socket_path,
+                                '--workers', str(workers), '--max-jobs', str(max_jobs)],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        try:
+            with connect(socket_path):
+                return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise AssertionError(process.stderr.read().decode())
+
+
+class connect:
+    def __init__(self, socket_path):
+        self.conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.conn.connect(socket_path)
+        self.conn.settimeout(120)
+
+    def __enter__(self):
+        return self.conn, self.conn.makefile('rb')
+
+    def __exit__(self, *exc_info):
+        self.conn.close()
+
+
+def send(conn, *jobs):
+    conn.sendall(b''.join(json.dumps(job).encode('utf-8') + b'\n' for job in jobs))
+
+
+def read_replies(rfile, count):
+    replies = []
+    for _ in range(count):
+        line = rfile.readline()
+        assert line, f"connection closed after {len(replies)} replies"
+        replies.append(json.loads(line))
+    return replies
+
+
+def test_recycling_worker_answers_every_job_sent_on_its_connection(tmp_path):
+    socket_path = str(tmp_path / 'pool.sock')
+    process = start_pool(socket_path, workers=2, max_jobs=2)
+    try:
+        for _ in range(2):
+            with connect(socket_path) as (conn, rfile):
+                send(conn, *({'id': job_id, 'conversion_type': 'ping'} for job_id in range(5)))
+                replies = read_replies(rfile, 5)
+            assert [reply['id'] for reply in replies] == list(range(5))
+            assert all(reply['success'] for reply in replies)
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+def test_shutdown_lets_running_jobs_finish(tmp_path):
+    pytest.importorskip('pdfplumber')
+    pytest.importorskip('fitz')
+    pdf_path = make_text_pdf(str(tmp_path / 'long.pdf'), 150)
+    socket_path = str(tmp_path / 'pool.sock')
+    process = start_pool(socket_path, workers=2, max_jobs=100)
+    try:
+        with connect(socket_path) as (conn, rfile):
+            send(conn, {'id': 'convert', 'conversion_type': 'pdf-to-text', 'pdf_path': pdf_path,
+                        'output_path': str(tmp_path / 'long.txt'), 'options': {'ocr': False}})
+            # Let the conversion get going before the pool is told to stop
+            time.sleep(1)
+            with connect(socket_path) as (control, control_rfile):
+                send(control, {'id': 'stop', 'conversion_type': 'shutdown'})
+                assert read_replies(control_rfile, 1)[0]['success']
+
+            reply = read_replies(rfile, 1)[0]
+        assert reply['id'] == 'convert' and reply['success'], reply
+        assert process.wait(timeout=60) == 0
+    finally:
+        if process.poll() is None:
+            process.kill()
@@ -0,0 +1,65 @@
+import io
+import os
+import subprocess
+import sys
+import zipfile
+
+import pytest
+
+pytest.importorskip('fitz')
+pytest.importorskip('PyPDF2')
+
+from conftest import SERVER_DIR, make_text_pdf
+
+SCRIPT = os.path.join(SERVER_DIR, 'pdf_converter.py')
+
+
+def run_stdio(args, pdf_bytes, env=None):
+    return subprocess.run([sys.executable, SCRIPT, *args, '-', '-'], input=pdf_bytes, capture_output=True,
+                          env={**os.environ, **(env or {})}, timeout=300)
+
+
+@pytest.fixture(scope='module')
+def pdf_bytes(tmp_path_factory):
+    path = make_text_pdf(str(tmp_path_factory.mktemp('stdio') / 'input.pdf'), 3, lines_per_page=5)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def test_split_pdf_zip_streams_to_stdout(pdf_bytes):
+    result = run_stdio(['split-pdf', '--options', '{"split_mode": "ranges", "page_ranges": "1-2,3"}'], pdf_bytes)
+    assert result.returncode == 0, result.stderr
+    with zipfile.ZipFile(io.BytesIO(result.stdout)) as archive:
+        assert archive.namelist() == ['split_group_1.pdf', 'split_group_2.pdf']
+        assert archive.testzip() is None
+
+
+def test_failed_split_leaves_no_readable_zip(pdf_bytes):
+    # The first group is written before the second one fails to parse
+    result = run_stdio(['split-pdf', '--options', '{"split_mode": "ranges", "page_ranges": "1,x"}'], pdf_bytes)
+    assert result.returncode == 1
+    assert result.stdout
+    with pytest.raises(zipfile.BadZipFile):
+        zipfile.ZipFile(io.BytesIO(result.stdout))
+
+
+def test_text_streams_to_stdout(pdf_bytes):
+    result = run_stdio(['pdf-to-text'], pdf_bytes)
+    assert result.returncode == 0, result.stderr
+    assert b'Page 3 line 5' in result.stdout
+
+
+def test_stdin_over_the_limit_is_refused(pdf_bytes):
+    result = run_stdio(['pdf-to-text'], pdf_bytes, env={'PDF_CONVERTER_MAX_STDIN_MB': '0.001'})
+    assert result.returncode == 1
+    assert result.stdout == b''
+    assert b'PDF_CONVERTER_MAX_STDIN_MB' in result.stderr
+
+
+def test_stdin_pdf_is_named_stdin_in_titles(pdf_bytes):
+    pytest.importorskip('ebooklib')
+    result = run_stdio(['pdf-to-epub'], pdf_bytes)
+    assert result.returncode == 0, result.stderr
+    with zipfile.ZipFile(io.BytesIO(result.stdout)) as archive:
+        package = next(archive.read(name) for name in archive.namelist() if name.endswith('.opf'))
+    assert b'<dc:title>Converted from stdin.pdf</dc:title>' in package
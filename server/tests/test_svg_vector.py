@@ -0,0 +1,56 @@
+import re
+import xml.etree.ElementTree as ElementTree
+
+import pytest
+
+pytest.importorskip('fitz')
+pytest.importorskip('PyPDF2')
+
+from conftest import make_text_pdf
+from pdf_converter import pdf_to_svg
+
+SVG = '{http://www.w3.org/2000/svg}'
+WIDTH, HEIGHT = 800, 600
+
+
+def page_boxes(svg_path):
+    """
+    (top, bottom, width) of every page of an SVG document, in document units
+    """
+    boxes = []
+    for group in ElementTree.parse(svg_path).getroot().iter(f'{SVG}g'):
+        if group.get('class') != 'page':
+            continue
+        top = float(re.match(r'translate\(0, ([\d.]+)\)', group.get('transform')).group(1))
+        page = group.find(f'{SVG}svg')
+        # Unitless sizes: a 'pt' page would be a third larger than it is counted
+        width, height = float(page.get('width')), float(page.get('height'))
+        boxes.append((top, top + height, width))
+    return boxes
+
+
+def assert_pages_fit_without_overlap(boxes, pages):
+    assert len(boxes) == pages
+    for top, bottom, width in boxes:
+        assert width <= WIDTH and bottom - top <= HEIGHT
+    for (_, bottom, _), (next_top, _, _) in zip(boxes, boxes[1:]):
+        assert bottom <= next_top
+
+
+@pytest.fixture(scope='module')
+def pdf_path(tmp_path_factory):
+    return make_text_pdf(str(tmp_path_factory.mktemp('svg') / 'a4.pdf'), 3, lines_per_page=5)
+
+
+def test_single_vector_svg_pages_do_not_overlap(pdf_path, tmp_path):
+    output_path = str(tmp_path / 'out.svg')
+    assert pdf_to_svg(pdf_path, output_path, {'svg_type': 'vector', 'width': WIDTH, 'height': HEIGHT})
+    assert_pages_fit_without_overlap(page_boxes(output_path), 3)
+
+
+def test_grouped_vector_svg_pages_do_not_overlap(pdf_path, tmp_path):
+    output_path = str(tmp_path / 'out.svg')
+    assert pdf_to_svg(pdf_path, output_path, {'svg_type': 'vector', 'width': WIDTH, 'height': HEIGHT,
+                                              'output_mode': 'grouped', 'pages_per_svg': 2})
+    assert_pages_fit_without_overlap(page_boxes(str(tmp_path / 'out_group_1.svg')), 2)
+    assert_pages_fit_without_overlap(page_boxes(str(tmp_path / 'out_group_2.svg')), 1)
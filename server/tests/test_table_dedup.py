@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from pdf_converter import TableDeduplicator
+
+
+def is_duplicate_table(new_table, existing_tables, similarity_threshold=0.8):
+    """
+    The pairwise check TableDeduplicator replaced, kept as its oracle
+    """
+    if not existing_tables:
+        return False
+
+    for existing_table in existing_tables:
+        if len(new_table) == len(existing_table):
+            matching_rows = 0
+            for i, row in enumerate(new_table):
+                if i < len(existing_table) and row == existing_table[i]:
+                    matching_rows += 1
+
+            similarity = matching_rows / len(new_table) if new_table else 0
+            if similarity >= similarity_threshold:
+                return True
+
+    return False
+
+
+def random_tables(seed, count=300):
+    """
+    Tables drawn from a small pool of rows, so exact copies, near-duplicates
+    (a row or two changed) and same-shape strangers all come up
+    """
+    rng = random.Random(seed)
+    pool = [[f"r{i}", str(rng.randint(0, 3))] for i in range(12)]
+    tables = []
+    for _ in range(count):
+        if tables and rng.random() < 0.4:
+            table = [list(row) for row in rng.choice(tables)]
+            for _ in range(rng.randint(0, 2)):
+                if table:
+                    table[rng.randrange(len(table))] = list(rng.choice(pool))
+        else:
+            table = [list(rng.choice(pool)) for _ in range(rng.randint(1, 8))]
+        tables.append(table)
+    return tables
+
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('threshold', [0.5, 0.8, 1.0])
+def test_add_if_unique_matches_pairwise_check(seed, threshold):
+    deduplicator = TableDeduplicator(threshold)
+    kept = []
+    for table in random_tables(seed):
+        expected = not is_duplicate_table(table, kept, threshold)
+        assert deduplicator.add_if_unique(table) is expected
+        if expected:
+            kept.append(table)
+
+
+def test_exact_copy_and_near_duplicate():
+    deduplicator = TableDeduplicator()
+    table = [['a', '1'], ['b', '2'], ['c', '3'], ['d', '4'], ['e', '5']]
+    assert deduplicator.add_if_unique(table)
+    assert not deduplicator.add_if_unique([list(row) for row in table])
+    # 4 of 5 rows equal at the same position: a duplicate at 0.8
+    assert deduplicator.is_duplicate(table[:4] + [['x', '9']])
+    # Same rows shifted by one position: not a duplicate
+    assert not deduplicator.is_duplicate([['x', '9']] + table[:4])
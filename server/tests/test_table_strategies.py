@@ -0,0 +1,42 @@
+import glob
+import os
+
+import pytest
+
+pdfplumber = pytest.importorskip('pdfplumber')
+
+from conftest import FIXTURES_DIR
+from pdf_converter import choose_table_strategies, extract_pdf_tables
+
+TABLE_FIXTURES = sorted(glob.glob(os.path.join(FIXTURES_DIR, 'tables_*.pdf')))
+
+
+def test_table_fixtures_exist():
+    assert len(TABLE_FIXTURES) >= 4
+
+
+@pytest.mark.parametrize('path', TABLE_FIXTURES, ids=os.path.basename)
+def test_adaptive_strategy_extracts_the_same_tables(path):
+    assert extract_pdf_tables(path, table_strategy='all') == extract_pdf_tables(path, table_strategy='adaptive')
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('tables_ruled_grid.pdf', [['default', 'text_tolerant', 'text']]),
+    ('tables_rect_cells.pdf', [['default', 'text_tolerant', 'text']]),
+    ('tables_borderless.pdf', [['text_tolerant', 'text']]),
+    ('tables_statement.pdf', [['default', 'text_tolerant', 'text'], ['text_tolerant', 'text'],
+                              ['text_tolerant', 'text']]),
+])
+def test_adaptive_strategy_skips_passes(name, expected):
+    with pdfplumber.open(os.path.join(FIXTURES_DIR, name)) as pdf:
+        assert [choose_table_strategies(page) for page in pdf.pages] == expected
+
+
+def test_fixture_tables_are_found():
+    tables, text_data = extract_pdf_tables(os.path.join(FIXTURES_DIR, 'tables_statement.pdf'),
+                                           table_strategy='adaptive')
+    first_rows = [table['data'][0] for table in tables]
+    assert ['Item', '2023', '2022', 'Change'] in first_rows
+    assert ['Quarter', 'Revenue', 'Costs', 'Margin'] in first_rows
+    # Only the notes page has no table
+    assert [entry['Page'] for entry in text_data] == [3]
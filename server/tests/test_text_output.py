@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from pdf_converter import open_text_output
+
+
+def test_output_appears_only_once_complete(tmp_path):
+    output_path = str(tmp_path / 'out.txt')
+    with open_text_output(output_path) as f:
+        f.write('page 1\n')
+        f.flush()
+        assert not os.path.exists(output_path)
+    with open(output_path, encoding='utf-8') as f:
+        assert f.read() == 'page 1\n'
+
+
+def test_failed_output_leaves_no_file(tmp_path):
+    output_path = str(tmp_path / 'out.txt')
+    with pytest.raises(RuntimeError):
+        with open_text_output(output_path) as f:
+            f.write('page 1\n')
+            raise RuntimeError('conversion failed')
+    assert os.listdir(tmp_path) == []
+
+
+def test_streamed_output_is_readable_after_each_flush(tmp_path):
+    output_path = str(tmp_path / 'out.txt')
+    with open_text_output(output_path, stream=True) as f:
+        for page_num in (1, 2):
+            f.write(f'page {page_num}\n')
+            f.flush()
+            with open(output_path, encoding='utf-8') as reader:
+                assert reader.read().splitlines()[-1] == f'page {page_num}'
+    assert os.listdir(tmp_path) == ['out.txt']